@@ -0,0 +1,334 @@
+import argparse
+import os
+import tomllib
+
+import numpy as np
+import pandas as pd
+
+import func
+from cross_issuer import CROSS_FILE, IssuerSpreads, after_tax
+from curve import CURVE_FILE, CURVE_TENORS, SURFACE_FILE, curve_spreads, spread_surface
+from panel import load_panel
+import profiling
+from periods import ISSUERS, PERIODS, TENORS, detect_periods
+from regression import grouped_regression
+from spreads import pair_label
+from trading_calendar import is_trading_day, trading_days
+
+# 可生成的输出类型及默认保存目录
+OUTPUT_DIRS = {
+    'demo': 'spread_demo_2y',
+    'corr': 'spread_demo_corr',
+    'boxplots': 'spread_demo_boxplots',
+    'stats': 'spread_stats',
+    'html': 'spread_demo_html',
+    'curve': 'spread_curve',
+    'cross': 'spread_cross',
+}
+
+# 回归统计表的文件名（不含扩展名）
+STATS_FILE = 'regression_stats'
+
+
+def default_config():
+    """默认配置：四大主体 × 10Y/30Y × 全部时间段，生成全部图表和回归统计表"""
+    return {
+        'data_file': '利差分析四大行2年_final.csv',
+        'issuers': list(ISSUERS),
+        'tenors': {name: list(band) for name, band in TENORS.items()},
+        # 全曲线模式（outputs中的'curve'）使用的期限档位
+        'curve_tenors': {name: list(band) for name, band in CURVE_TENORS.items()},
+        'periods': [list(period) for period in PERIODS],
+        # HTML输出、全曲线和跨主体统计需显式开启
+        'outputs': [kind for kind in OUTPUT_DIRS if kind not in ('html', 'curve', 'cross')],
+        'output_dirs': dict(OUTPUT_DIRS),
+        'workers': None,
+        'preview': False,
+    }
+
+
+def load_config(path=None):
+    """
+    读取批量运行配置（TOML或YAML），未给出的字段使用默认值
+
+    参数:
+        path (str): 配置文件路径，为None时使用默认配置
+
+    返回:
+        dict: 配置
+    """
+    config = default_config()
+    if path is None:
+        return config
+
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit("读取YAML配置需要安装PyYAML，或改用TOML配置")
+        with open(path, 'r', encoding='utf-8') as f:
+            user_config = yaml.safe_load(f) or {}
+    else:
+        with open(path, 'rb') as f:
+            user_config = tomllib.load(f)
+
+    output_dirs = config['output_dirs']
+    output_dirs.update(user_config.pop('output_dirs', {}))
+    config.update(user_config)
+    config['output_dirs'] = output_dirs
+
+    # 时间段支持 [名称, 开始, 结束] 或 {name, start, end} 两种写法，"auto"表示按主体和期限自动定位
+    if config['periods'] != 'auto':
+        config['periods'] = [
+            (p['name'], p['start'], p['end']) if isinstance(p, dict) else tuple(p)
+            for p in config['periods']
+        ]
+    unknown = set(config['outputs']) - set(OUTPUT_DIRS)
+    if unknown:
+        raise SystemExit(f"未知的输出类型: {sorted(unknown)}，可选: {list(OUTPUT_DIRS)}")
+    return config
+
+
+@profiling.profiled()
+def select_all(config):
+    """
+    对 主体 × 期限 × 时间段 网格选取活跃券，结果供所有图表共用
+
+    返回:
+        dict: {(主体, 期限名称): (时间段列表, {时间段名称: 债券列表})}
+    """
+    data_file = config['data_file']
+    selections = {}
+    for issuer in config['issuers']:
+        for tenor, (min_maturity, max_maturity) in config['tenors'].items():
+            periods = config['periods']
+            if periods == 'auto':
+                periods = detect_periods(data_file, issuer, min_maturity, max_maturity,
+                                         **config.get('detect', {}))
+            # 全部时间段一次分组完成排名
+            bond_lists = func.select_bonds_by_period(data_file, periods, issuer, min_maturity, max_maturity)
+            selections[(issuer, tenor)] = (periods, bond_lists)
+    return selections
+
+
+@profiling.profiled()
+def regression_table(config, selections):
+    """
+    对 主体 × 期限 × 时间段 网格计算1-2、1-3的成交笔数比与价差回归，不绘图
+
+    各组样本拼接后由grouped_regression一次算出，结果与spread_corr图中标注的统计量一致。
+
+    返回:
+        pd.DataFrame: 每个 主体-期限-时间段-组合 一行
+    """
+    panel = load_panel(config['data_file'])
+    meta, xs, ys, groups = [], [], [], []
+    for (issuer, tenor), (periods, bond_lists) in selections.items():
+        for period_name, start_date, end_date in periods:
+            bond_list = bond_lists.get(period_name)
+            if not bond_list or len(bond_list) < 2:
+                continue
+            df = panel.select(start_date, end_date, bonds=bond_list)
+            df = df[is_trading_day(df['日期'], trading_days(start_date, end_date))]
+            if df.empty:
+                continue
+            yields = df.pivot(index='日期', columns='标的债券代码', values='到期收益率')
+            yields = yields.reindex(columns=bond_list).to_numpy(dtype=np.float64)
+            trades = df.pivot(index='日期', columns='标的债券代码', values='每日每券的成交笔数')
+            trades = trades.reindex(columns=bond_list).to_numpy(dtype=np.float64)
+            for j in range(1, min(3, len(bond_list))):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    xs.append(trades[:, 0] / trades[:, j])
+                ys.append((yields[:, 0] - yields[:, j]) * 100)
+                groups.append(np.full(len(yields), len(meta)))
+                meta.append({
+                    '主体': issuer, '期限': tenor, '时间段': period_name,
+                    '开始日期': start_date, '结束日期': end_date,
+                    '组合': pair_label(0, j), '债券A': bond_list[0], '债券B': bond_list[j],
+                })
+
+    table = pd.DataFrame(meta, columns=['主体', '期限', '时间段', '开始日期', '结束日期', '组合', '债券A', '债券B'])
+    if not meta:
+        return table
+    result = grouped_regression(np.concatenate(xs), np.concatenate(ys), np.concatenate(groups), len(meta))
+    for key, values in result.items():
+        table[key] = values
+    return table
+
+
+def write_table(table, base):
+    """写出统计表：CSV（Excel可直接打开），安装了pyarrow时另写一份Parquet"""
+    table.to_csv(base + '.csv', index=False, encoding='utf-8-sig')
+    try:
+        table.to_parquet(base + '.parquet', index=False)
+    except ImportError:
+        pass
+
+
+def common_periods(config):
+    """全曲线、跨主体统计需要各主体、各档位统一的时间段；自动定位的时间段因主体和期限而异，改用默认时间段"""
+    if config['periods'] == 'auto':
+        print("全曲线/跨主体统计不支持自动定位的时间段，改用默认时间段")
+        return PERIODS
+    return config['periods']
+
+
+def write_curve(config):
+    """全曲线模式：一次分组算出全部主体、期限档位和时间段的新老券利差，写出统计表和1-2利差曲面"""
+    periods = common_periods(config)
+    tenors = {name: tuple(band) for name, band in config['curve_tenors'].items()}
+    table = curve_spreads(config['data_file'], config['issuers'], periods, tenors)
+    base = os.path.join(config['output_dirs']['curve'], CURVE_FILE)
+    write_table(table, base)
+    surface = spread_surface(table, tenors=tenors, periods=periods)
+    surface.reset_index().to_csv(os.path.join(config['output_dirs']['curve'], SURFACE_FILE + '.csv'),
+                                 index=False, encoding='utf-8-sig')
+    print(f"全曲线利差统计已保存至: {base}.csv（{len(table)}行），曲面见{SURFACE_FILE}.csv")
+
+
+def write_cross(config):
+    """跨主体利差：各期限档位最活跃券之间的两两利差统计，税前、税后各写一张表"""
+    periods = common_periods(config)
+    tenors = {name: tuple(band) for name, band in config['curve_tenors'].items()}
+    for suffix, tax in (('', None), ('_after_tax', after_tax)):
+        engine = IssuerSpreads.from_panel(config['data_file'], config['issuers'], periods, tenors, tax)
+        table = engine.summary()
+        base = os.path.join(config['output_dirs']['cross'], CROSS_FILE + suffix)
+        write_table(table, base)
+        print(f"跨主体利差统计已保存至: {base}.csv（{len(table)}行）")
+
+
+@profiling.profiled()
+def run_batch(config):
+    """
+    按配置批量生成图表：数据只加载一次，活跃券只选取一次，绘图分发到进程池
+
+    outputs中的'stats'输出回归统计表，'curve'输出全部期限档位的新老券利差统计和 期限×时间段 曲面，
+    'cross'输出各档位主体两两之间的利差统计（税前、税后）；
+    只输出统计表时不加载任何绘图依赖。
+
+    返回:
+        list: 失败任务的 (描述, 异常) 列表
+    """
+    data_file = config['data_file']
+    outputs = config['outputs']
+    output_dirs = config['output_dirs']
+    for kind in outputs:
+        os.makedirs(output_dirs[kind], exist_ok=True)
+
+    load_panel(data_file)
+    failures = []
+    if 'curve' in outputs:
+        write_curve(config)
+    if 'cross' in outputs:
+        write_cross(config)
+    if not set(outputs) - {'curve', 'cross'}:
+        return failures
+
+    selections = select_all(config)
+    if 'stats' in outputs:
+        table = regression_table(config, selections)
+        base = os.path.join(output_dirs['stats'], STATS_FILE)
+        write_table(table, base)
+        print(f"回归统计表已保存至: {base}.csv（{len(table)}行）")
+    if not set(outputs) - {'stats', 'curve', 'cross'}:
+        return failures
+
+    # 图表模块按需导入，只做选券或统计时无需加载绘图依赖
+    from render import RenderTask, duplicate_paths, render_tasks
+    from spread_boxplots import prepare_spread_boxplots
+    from spread_corr import prepare_analysis
+    from spread_demo import prepare_spread_demo
+
+    tasks = []
+
+    def prepare(kinds, desc, fn, *args):
+        """计算一次绘图数据，供kinds中的每种输出共用"""
+        try:
+            payload = fn(*args)
+        except Exception as e:
+            print(f"任务失败 {desc}: {e}")
+            failures.append((desc, e))
+            return
+        if payload is not None:
+            for kind in kinds:
+                filename = payload['filename']
+                if kind == 'html':
+                    filename = os.path.splitext(filename)[0] + '.html'
+                tasks.append(RenderTask(kind, payload, os.path.join(output_dirs[kind], filename)))
+
+    # 在主进程中计算全部绘图数据，只把数组发送给绘图进程
+    for (issuer, tenor), (periods, bond_lists) in selections.items():
+        min_maturity, max_maturity = config['tenors'][tenor]
+        for period_name, start_date, end_date in periods:
+            bond_list = bond_lists.get(period_name)
+            if not bond_list:
+                print(f"警告：{issuer}-{tenor}-{period_name} 未找到符合条件的债券！")
+                continue
+            desc = f'{issuer}-{tenor}-{period_name}'
+            demo_kinds = [kind for kind in ('demo', 'html') if kind in outputs]
+            if demo_kinds:
+                prepare(demo_kinds, f'{desc} demo', prepare_spread_demo, data_file, issuer, min_maturity,
+                        max_maturity, period_name, start_date, end_date, bond_list)
+            if 'corr' in outputs:
+                prepare(['corr'], f'{desc} corr', prepare_analysis, data_file, issuer, min_maturity,
+                        max_maturity, period_name, start_date, end_date, bond_list)
+        if 'boxplots' in outputs and bond_lists:
+            prepare(['boxplots'], f'{issuer}-{tenor} boxplots', prepare_spread_boxplots, data_file, issuer,
+                    min_maturity, max_maturity, periods, bond_lists)
+
+    # 保存路径重复说明文件名缺少区分字段，直接报错而不是让后完成的图覆盖先完成的
+    duplicates = duplicate_paths(tasks)
+    if duplicates:
+        raise ValueError(f"以下图表的保存路径重复，会相互覆盖: {duplicates}")
+
+    with profiling.span('render_tasks'):
+        failures.extend(render_tasks(tasks, config.get('workers'), config.get('preview', False)))
+
+    print(f"批量运行完成，共{len(tasks)}张图，失败任务 {len(failures)} 个")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按配置批量生成利差分析图表')
+    parser.add_argument('config', nargs='?', help='TOML/YAML配置文件，缺省时使用默认网格')
+    parser.add_argument('--data-file', help='覆盖配置中的数据文件')
+    parser.add_argument('--issuer', action='append', help='只运行指定主体（可重复）')
+    parser.add_argument('--tenor', action='append', help='只运行指定期限档位（可重复）')
+    parser.add_argument('--outputs', nargs='+', choices=list(OUTPUT_DIRS), help='只生成指定类型的输出（stats为回归统计表，curve为全曲线利差统计，cross为跨主体利差统计，均不绘图）')
+    parser.add_argument('--workers', type=int, help='绘图进程数，默认为CPU核数')
+    parser.add_argument('--preview', action='store_true', help='快速预览模式：低分辨率，复用图形模板')
+    parser.add_argument('--profile', metavar='TRACE', help='记录各阶段耗时，写出JSON trace并打印汇总表')
+    parser.add_argument('--profile-memory', action='store_true', help='剖析时同时统计峰值内存（较慢）')
+    parser.add_argument('--cprofile', action='store_true', help='剖析时另存cProfile结果（trace同名.prof）')
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.data_file:
+        config['data_file'] = args.data_file
+    if args.issuer:
+        config['issuers'] = args.issuer
+    if args.tenor:
+        # 配置中未列出的档位可取periods.TENORS或全曲线档位的默认区间
+        bands = {**CURVE_TENORS, **TENORS, **config['tenors']}
+        unknown = [name for name in args.tenor if name not in bands]
+        if unknown:
+            parser.error(f"未知的期限档位: {unknown}，可选: {list(bands)}")
+        config['tenors'] = {name: bands[name] for name in args.tenor}
+    if args.outputs:
+        config['outputs'] = args.outputs
+    if args.workers:
+        config['workers'] = args.workers
+    if args.preview:
+        config['preview'] = True
+
+    if args.profile:
+        profiling.enable(trace_memory=args.profile_memory, cprofile=args.cprofile)
+    failures = run_batch(config)
+    if args.profile:
+        profiling.report(args.profile)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,410 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import func
+import panel
+from batch import regression_table
+from bond_matrix import BondMatrix
+from periods import ISSUERS, TENORS
+from spreads import default_pairs
+from trading_calendar import trading_days
+
+# 数据规模预设：主体数、每个期限档位的债券数、年数（current约等于现有四大主体2年的数据量）
+SCALES = {
+    'current': {'issuers': 4, 'bonds_per_tenor': 4, 'years': 2},
+    '10x': {'issuers': 8, 'bonds_per_tenor': 10, 'years': 4},
+    '100x': {'issuers': 40, 'bonds_per_tenor': 16, 'years': 5},
+}
+
+# 合成数据的截止日期
+END_DATE = '2025-12-31'
+
+# 各阶段：名称 -> 说明（按执行顺序，后面的阶段依赖前面的结果）
+STAGES = {
+    'load_csv': '冷启动加载：解析CSV并写列式缓存',
+    'load_cache': '热加载：读取内存映射缓存',
+    'select_bond': '逐 主体×期限×时间段 选取活跃券',
+    'spreads': '构建行情矩阵并计算默认利差组合',
+    'regression': '成交笔数比与价差的分组回归',
+    'boxplot_stats': '箱型图分位数统计',
+    'render': '绘制图表',
+}
+
+# 合成数据和基线默认放在（不纳入版本管理的）缓存目录下
+DATA_DIR = os.path.join(panel.CACHE_DIR, 'benchmark')
+
+# 基线文件及回归判定：比基线慢（或峰值内存高）超过容差，且绝对差超过噪声下限
+BASELINE_FILE = os.path.join(DATA_DIR, 'baseline.json')
+TOLERANCE = 0.2
+NOISE_SECONDS = 0.05
+NOISE_MB = 1.0
+
+
+def issuer_names(n):
+    """合成主体名称：前四个沿用真实主体，其余编号"""
+    return [ISSUERS[k] if k < len(ISSUERS) else f'合成主体{k + 1:03d}' for k in range(n)]
+
+
+def synthetic_periods(start_date, end_date):
+    """按半年划分时间段，格式同periods.PERIODS"""
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    periods = []
+    for year in range(start.year, end.year + 1):
+        for half, (lo, hi) in enumerate([('01-01', '06-30'), ('07-01', '12-31')], 1):
+            lo, hi = max(pd.Timestamp(f'{year}-{lo}'), start), min(pd.Timestamp(f'{year}-{hi}'), end)
+            if lo <= hi:
+                periods.append((f'{year}H{half}', lo.strftime('%Y-%m-%d'), hi.strftime('%Y-%m-%d')))
+    return periods
+
+
+def generate_panel(data_dir, issuers=4, bonds_per_tenor=4, years=2, missing_rate=0.05, seed=0,
+                   end_date=END_DATE):
+    """
+    生成与真实数据同列名的合成行情CSV，以及各期限的中债估值文件
+
+    每个期限档位有一条市场收益率曲线（随机游走），各主体在其上加固定利差；债券在区间内
+    陆续发行，剩余期限逐日递减，新券成交更活跃、收益率略低。每行按missing_rate随机缺失。
+    同一组参数的数据只生成一次，之后直接复用。
+
+    参数:
+        data_dir (str): 存放合成数据的目录（每组参数一个子目录）
+        issuers (int): 主体数
+        bonds_per_tenor (int): 每个主体、每个期限档位的债券数
+        years (int): 覆盖年数（截止于end_date）
+        missing_rate (float): 行缺失比例
+        seed (int): 随机种子
+
+    返回:
+        dict: {'data_file', 'benchmark_files': {期限: 文件}, 'issuers', 'start_date', 'end_date', 'rows'}
+    """
+    name = f'synthetic-{issuers}i-{bonds_per_tenor}b-{years}y-m{missing_rate:g}-s{seed}'
+    out_dir = os.path.join(data_dir, name)
+    data_file = os.path.join(out_dir, 'panel.csv')
+    start_date = (pd.Timestamp(end_date) - pd.DateOffset(years=years) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    days = trading_days(start_date, end_date)
+    dates = days.astype('datetime64[D]')
+    benchmark_files = {tenor: os.path.join(out_dir, f'{int(hi)}Y中债估值.xlsx') for tenor, (_, hi) in TENORS.items()}
+    info = {'data_file': data_file, 'benchmark_files': benchmark_files, 'issuers': issuer_names(issuers),
+            'start_date': start_date, 'end_date': end_date}
+
+    meta_file = os.path.join(out_dir, 'meta.json')
+    if os.path.exists(meta_file):
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            info['rows'] = json.load(f)['rows']
+        return info
+
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    n_days = len(days)
+    issuer_spreads = np.concatenate([[0.0], rng.uniform(0.05, 0.15, issuers - 1)])[:issuers]
+    columns = {key: [] for key in ('日期', '标的债券代码', '债务主体', '剩余期限', '到期收益率',
+                                   '每日每券的成交笔数', '单券借贷余额（百万元）')}
+    code = 0
+    for tenor, (lo, hi) in TENORS.items():
+        # 市场曲线：期限溢价 + 随机游走，同时作为该期限的中债估值
+        market = 1.8 + 0.02 * hi + np.cumsum(rng.normal(0, 0.003, n_days))
+        pd.DataFrame({'日期': dates.astype('datetime64[ns]'), 'YTM值': market.round(4)}).to_excel(
+            benchmark_files[tenor], header=False, index=False)
+        # 发行日均匀分布在 [开始前1年, 截止前约1个月]，任一时刻都有数只券处于期限档位内
+        offsets = np.linspace(-365, years * 365 - 30, bonds_per_tenor).astype(np.int64)
+        for k, issuer in enumerate(info['issuers']):
+            curve = market + issuer_spreads[k]
+            for offset in offsets:
+                issue = days[0] + offset
+                active = np.flatnonzero(days >= issue)
+                keep = active[rng.random(len(active)) >= missing_rate]
+                age = (days[keep] - issue) / 365
+                columns['日期'].append(dates[keep])
+                columns['标的债券代码'].append(np.full(len(keep), f'{200000 + code:06d}.IB'))
+                columns['债务主体'].append(np.full(len(keep), issuer))
+                columns['剩余期限'].append((hi - age).round(3))
+                columns['到期收益率'].append(curve[keep] + 0.01 * age + rng.normal(0, 0.005)
+                                        + rng.normal(0, 0.003, len(keep)))
+                columns['每日每券的成交笔数'].append(rng.poisson(5 + 55 * np.exp(-age / 0.6)) + 1)
+                columns['单券借贷余额（百万元）'].append(rng.uniform(0, 5000, len(keep)))
+                code += 1
+
+    df = pd.DataFrame({key: np.concatenate(values) for key, values in columns.items()})
+    df.to_csv(data_file, index=False)
+    info['rows'] = len(df)
+    with open(meta_file, 'w', encoding='utf-8') as f:
+        json.dump({'rows': len(df), 'start_date': start_date, 'end_date': end_date}, f)
+    return info
+
+
+def clear_panel_cache(data_file):
+    """清除进程内面板和磁盘列式缓存，使下次加载重新解析CSV"""
+    panel._panels.pop(data_file, None)
+    base, meta_path = panel._cache_paths(data_file)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    shutil.rmtree(base + '.npy', ignore_errors=True)
+
+
+def measure(fn, repeat=1, setup=None, memory=True):
+    """
+    运行一个阶段repeat次，返回 (耗时中位数, 峰值内存MB, 处理量)
+
+    阶段内的打印输出被丢弃。tracemalloc会使耗时成倍增加，因此计时在不跟踪内存的情况下进行，
+    memory为True时另跑一次只统计峰值内存。
+    """
+    def run(trace):
+        if setup is not None:
+            setup()
+        if trace:
+            tracemalloc.start()
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            items = fn()
+        elapsed = time.perf_counter() - t
+        peak = None
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+        return elapsed, peak, items
+
+    times = []
+    for _ in range(repeat):
+        elapsed, _, items = run(False)
+        times.append(elapsed)
+    peak = run(True)[1] if memory else None
+    return statistics.median(times), peak, items
+
+
+def run_benchmark(info, stages=None, repeat=1, render_limit=2, preview=False, memory=True):
+    """
+    依次计时各阶段
+
+    参数:
+        info (dict): generate_panel的结果
+        stages (list): 需要报告的阶段，默认全部（未选中的前置阶段仍会执行，但不计时）
+        render_limit (int): render阶段绘制的 主体×期限×时间段 数（每个绘制三联图和回归图）
+        preview (bool): render阶段是否使用快速预览模式
+        memory (bool): 是否另跑一次统计各阶段的峰值内存（render阶段除外）
+
+    返回:
+        list: [{'stage', 'seconds', 'peak_mb', 'items', 'unit'}, ...]
+    """
+    stages = list(STAGES) if stages is None else stages
+    data_file, rows = info['data_file'], info['rows']
+    periods = synthetic_periods(info['start_date'], info['end_date'])
+    state = {}
+
+    def load():
+        panel.load_panel(data_file)
+        return rows
+
+    def select():
+        selections = {}
+        for issuer in info['issuers']:
+            for tenor, (lo, hi) in TENORS.items():
+                bond_lists = {}
+                for period_name, start_date, end_date in periods:
+                    bond_list = func.select_bond(data_file, start_date, end_date, issuer, lo, hi)
+                    if bond_list:
+                        bond_lists[period_name] = bond_list
+                selections[(issuer, tenor)] = (periods, bond_lists)
+        state['selections'] = selections
+        return rows
+
+    def cells():
+        for (issuer, tenor), (_, bond_lists) in state['selections'].items():
+            for period_name, start_date, end_date in periods:
+                if len(bond_lists.get(period_name) or []) >= 2:
+                    yield issuer, tenor, period_name, start_date, end_date, bond_lists[period_name]
+
+    def spreads():
+        bond_panel = panel.load_panel(data_file)
+        for _, _, _, start_date, end_date, bond_list in cells():
+            df = bond_panel.select(start_date, end_date, bonds=bond_list)
+            matrix = BondMatrix.from_frame(df, bond_list, trading_days(start_date, end_date))
+            for i, j in default_pairs(len(bond_list)):
+                matrix.spread(i, j)
+        return rows
+
+    def regression():
+        config = {'data_file': data_file, 'tenors': TENORS}
+        regression_table(config, state['selections'])
+        return rows
+
+    def import_plotting():
+        # 绘图模块（含matplotlib）的导入不计入阶段耗时
+        import spread_boxplots
+        import spread_corr
+        import spread_demo
+
+    def boxplot_stats():
+        from spread_boxplots import prepare_spread_boxplots
+
+        for (issuer, tenor), (_, bond_lists) in state['selections'].items():
+            lo, hi = TENORS[tenor]
+            prepare_spread_boxplots(data_file, issuer, lo, hi, periods, bond_lists)
+        return rows
+
+    def prepare_render():
+        from render import RenderTask
+        from spread_corr import prepare_analysis
+        from spread_demo import prepare_spread_demo
+
+        state['render_dir'] = tempfile.mkdtemp(prefix='bench-render-')
+        tasks = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for issuer, tenor, period_name, start_date, end_date, bond_list in list(cells())[:render_limit]:
+                lo, hi = TENORS[tenor]
+                args = (data_file, issuer, lo, hi, period_name, start_date, end_date, bond_list)
+                payloads = [('demo', prepare_spread_demo(*args, benchmark_file=info['benchmark_files'][tenor])),
+                            ('corr', prepare_analysis(*args))]
+                for kind, payload in payloads:
+                    if payload is not None:
+                        save_path = os.path.join(state['render_dir'], f'{kind}-{len(tasks)}.png')
+                        tasks.append(RenderTask(kind, payload, save_path))
+        state['tasks'] = tasks
+
+    def render():
+        from render import render_task
+
+        for task in state['tasks']:
+            render_task(task, preview=preview)
+        return len(state['tasks'])
+
+    plan = [
+        ('load_csv', load, lambda: clear_panel_cache(data_file), 'rows'),
+        ('load_cache', load, lambda: panel._panels.pop(data_file, None), 'rows'),
+        ('select_bond', select, None, 'rows'),
+        ('spreads', spreads, None, 'rows'),
+        ('regression', regression, None, 'rows'),
+        ('boxplot_stats', boxplot_stats, import_plotting, 'rows'),
+        ('render', render, prepare_render, 'charts'),
+    ]
+    # 只执行到最后一个选中阶段
+    last = max(list(STAGES).index(name) for name in stages)
+    results = []
+    try:
+        for name, fn, setup, unit in plan[:last + 1]:
+            if name not in stages:
+                if setup is not None:
+                    setup()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fn()
+                continue
+            if name == 'render':
+                # 绘图耗时与数据规模无关，且在tracemalloc下极慢，只计时一次
+                seconds, peak_mb, items = measure(fn, 1, setup, memory=False)
+            else:
+                seconds, peak_mb, items = measure(fn, repeat, setup, memory)
+            results.append({'stage': name, 'seconds': seconds, 'peak_mb': peak_mb, 'items': items, 'unit': unit})
+    finally:
+        if 'render_dir' in state:
+            shutil.rmtree(state['render_dir'], ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    与基线比较，返回各阶段的回归说明
+
+    返回:
+        dict: {阶段: [说明, ...]}，只包含有回归的阶段
+    """
+    regressions = {}
+    for result in results:
+        base = baseline.get(result['stage'])
+        if base is None:
+            continue
+        notes = []
+        seconds, base_seconds = result['seconds'], base['seconds']
+        if seconds > base_seconds * (1 + tolerance) and seconds - base_seconds > NOISE_SECONDS:
+            notes.append(f'耗时 {base_seconds:.3f}s -> {seconds:.3f}s')
+        peak, base_peak = result['peak_mb'], base.get('peak_mb')
+        if peak is not None and base_peak is not None \
+                and peak > base_peak * (1 + tolerance) and peak - base_peak > NOISE_MB:
+            notes.append(f'峰值内存 {base_peak:.1f}MB -> {peak:.1f}MB')
+        if notes:
+            regressions[result['stage']] = notes
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='在合成数据上对各处理阶段计时，并与基线比较')
+    parser.add_argument('--scale', choices=list(SCALES), default='current', help='数据规模预设')
+    parser.add_argument('--issuers', type=int, help='覆盖预设的主体数')
+    parser.add_argument('--bonds-per-tenor', type=int, help='覆盖预设的每期限档位债券数')
+    parser.add_argument('--years', type=int, help='覆盖预设的年数')
+    parser.add_argument('--missing-rate', type=float, default=0.05, help='行缺失比例')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='合成数据目录（同参数的数据会复用）')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), help='只报告指定阶段')
+    parser.add_argument('--repeat', type=int, default=3, help='每个阶段的测量次数（取中位数，render阶段只测一次）')
+    parser.add_argument('--render-limit', type=int, default=2, help='render阶段绘制的时间段数')
+    parser.add_argument('--preview', action='store_true', help='render阶段使用快速预览模式')
+    parser.add_argument('--no-memory', action='store_true', help='不统计峰值内存（省去每个阶段额外的一次运行）')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果写为基线')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='判定回归的相对容差')
+    parser.add_argument('--json', help='另将结果写入JSON文件')
+    args = parser.parse_args(argv)
+
+    params = dict(SCALES[args.scale])
+    for key in params:
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    params.update(missing_rate=args.missing_rate, seed=args.seed)
+
+    t = time.perf_counter()
+    info = generate_panel(args.data_dir, **params)
+    print(f"数据: {info['data_file']}（{info['rows']:,}行，准备用时 {time.perf_counter() - t:.1f}s）")
+
+    results = run_benchmark(info, args.stages, args.repeat, args.render_limit, args.preview, not args.no_memory)
+
+    # 基线按数据参数和测量方式分别保存
+    settings = {**params, 'render_limit': args.render_limit, 'preview': args.preview}
+    key = os.path.basename(os.path.dirname(info['data_file']))
+    key += '-preview' if args.preview else ''
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+    baseline = baselines.get(key, {})
+    if baseline and baseline.get('settings') != settings:
+        print("基线的测量参数与本次不同，不做比较")
+        baseline = {}
+    regressions = compare(results, baseline.get('stages', {}), args.tolerance)
+
+    for result in results:
+        seconds, items = result['seconds'], result['items']
+        rate = items / seconds if seconds > 0 else float('inf')
+        rate = f'{rate:>12,.0f} 行/秒' if result['unit'] == 'rows' else f'{rate:>12.2f} 图/秒'
+        memory = f"{result['peak_mb']:8.1f}MB" if result['peak_mb'] is not None else '       -  '
+        note = f"  回归: {'，'.join(regressions[result['stage']])}" if result['stage'] in regressions else ''
+        print(f"{result['stage']:<14} {seconds:8.3f}s  峰值内存 {memory}  {rate}{note}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'settings': settings, 'rows': info['rows'], 'results': results},
+                      f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        stages = baseline.get('stages', {})
+        stages.update({r['stage']: {'seconds': r['seconds'], 'peak_mb': r['peak_mb']} for r in results})
+        baselines[key] = {'settings': settings, 'rows': info['rows'], 'stages': stages}
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存至: {args.baseline}（{key}）")
+    elif regressions:
+        print(f"共{len(regressions)}个阶段较基线变慢或内存升高（容差{args.tolerance:.0%}）")
+    return 1 if regressions and not args.save_baseline else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
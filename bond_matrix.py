@@ -0,0 +1,106 @@
+import numpy as np
+
+from profiling import profiled
+from trading_calendar import to_index
+
+# 矩阵中保存的字段：属性名 -> 行情列名
+FIELDS = {
+    'ytm': '到期收益率',
+    'trades': '每日每券的成交笔数',
+    'balance': '单券借贷余额（百万元）',
+}
+
+
+class BondMatrix:
+    """
+    紧凑的 交易日×债券 行情矩阵
+
+    收益率、成交笔数和借贷余额各为一个float32稠密矩阵（列优先存储，取单券序列为零拷贝视图），
+    每只债券的有无数据按交易日压缩为位图。利差等计算直接在矩阵上做数组运算，
+    无需为每只债券保留带DatetimeIndex的Series再逐次对齐。
+
+    参数:
+        days (np.ndarray): 交易日序数（int64，见trading_calendar），即行轴
+        bonds (list): 债券代码（列顺序即排名顺序）
+        ytm, trades, balance (np.ndarray): 交易日×债券 的float32矩阵，缺失为NaN
+        mask (np.ndarray): 有数据位图，形状 (债券数, ceil(交易日数/8))
+    """
+
+    __slots__ = ('days', 'bonds', 'ytm', 'trades', 'balance', 'mask', '_columns')
+
+    def __init__(self, days, bonds, ytm, trades, balance, mask):
+        self.days = days
+        self.bonds = tuple(bonds)
+        self.ytm = ytm
+        self.trades = trades
+        self.balance = balance
+        self.mask = mask
+        self._columns = {bond: k for k, bond in enumerate(self.bonds)}
+
+    @classmethod
+    @profiled('bond_matrix')
+    def from_frame(cls, df, bonds, days):
+        """
+        由行情数据（BondPanel.select的结果）直接散列到矩阵，不经过pivot
+
+        参数:
+            df (pd.DataFrame): 含 日期、标的债券代码 和FIELDS各列的数据
+            bonds (list): 债券代码（列顺序）
+            days (np.ndarray): 交易日序数，不在其中的日期被丢弃
+
+        返回:
+            BondMatrix
+        """
+        rows = to_index(df['日期'], days)
+        cols = df['标的债券代码'].astype(object).map({bond: k for k, bond in enumerate(bonds)})
+        cols = cols.to_numpy(dtype=np.float64)
+        keep = (rows >= 0) & ~np.isnan(cols)
+        rows, cols = rows[keep], cols[keep].astype(np.int64)
+
+        shape = (len(days), len(bonds))
+        arrays = {}
+        for name, column in FIELDS.items():
+            matrix = np.full(shape, np.nan, dtype=np.float32, order='F')
+            matrix[rows, cols] = df[column].to_numpy(dtype=np.float32)[keep]
+            arrays[name] = matrix
+        observed = np.zeros((len(bonds), len(days)), dtype=bool)
+        observed[cols, rows] = True
+        return cls(days, bonds, mask=np.packbits(observed, axis=1), **arrays)
+
+    @property
+    def nbytes(self):
+        """矩阵和位图占用的字节数"""
+        return sum(a.nbytes for a in (self.days, self.ytm, self.trades, self.balance, self.mask))
+
+    def observed(self, bond=None):
+        """
+        有数据的交易日
+
+        参数:
+            bond: 债券代码，为None时返回全部债券
+
+        返回:
+            np.ndarray: 布尔数组，形状 (交易日数,) 或 (交易日数, 债券数)
+        """
+        n = len(self.days)
+        if bond is None:
+            return np.unpackbits(self.mask, axis=1, count=n).astype(bool).T
+        return np.unpackbits(self.mask[self._columns[bond]], count=n).astype(bool)
+
+    def column(self, field, bond):
+        """取单券的某字段序列（零拷贝视图）"""
+        return getattr(self, field)[:, self._columns[bond]]
+
+    def spread(self, i, j):
+        """
+        排名i、j两券的利差(bps)
+
+        与两条Series相减的对齐方式一致：保留任一券有数据的交易日，单侧缺失处为NaN。
+
+        返回:
+            tuple: (交易日下标, 利差)
+        """
+        observed = self.observed()
+        x = np.flatnonzero(observed[:, i] | observed[:, j])
+        ytm = self.ytm[x]
+        return x, (ytm[:, i].astype(np.float64) - ytm[:, j].astype(np.float64)) * 100
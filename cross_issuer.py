@@ -0,0 +1,229 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from curve import CURVE_TENORS, curve_rows, period_index, rank_bonds
+from panel import load_panel
+from periods import ISSUERS, PERIODS
+from profiling import profiled
+from quantiles import QUANTILES, spread_quantiles, stack_series
+from trading_calendar import to_index, trading_days
+
+# 利息所得税率：国债利息免征企业所得税，政策性金融债利息按25%缴纳（两者均免征增值税）
+ISSUER_TAX_RATES = {
+    '中华人民共和国财政部': 0.0,
+    '中国农业发展银行': 0.25,
+    '国家开发银行': 0.25,
+    '中国进出口银行': 0.25,
+}
+
+# 输出文件名（不含扩展名）
+CROSS_FILE = 'cross_issuer_spreads'
+
+
+def after_tax(yields, issuers, rates=ISSUER_TAX_RATES):
+    """
+    税后收益率 = 收益率 × (1 - 利息所得税率)，可直接作为IssuerSpreads.from_panel的tax参数
+
+    参数:
+        yields (np.ndarray): 最后一维为主体的收益率数组
+        issuers (list): 与最后一维对应的主体名称
+        rates (dict): 主体 -> 税率，未列出的主体按免税处理
+
+    返回:
+        np.ndarray: 调整后的收益率
+    """
+    rate = np.array([rates.get(issuer, 0.0) for issuer in issuers])
+    return yields * (1 - rate)
+
+
+class IssuerSpreads:
+    """
+    跨主体利差引擎：每个期限档位、每个时间段取各主体的最活跃券，在共同的交易日网格上
+    一次算出全部主体两两之间的利差（bps）
+
+    参数:
+        days (np.ndarray): 交易日序数（int64，见trading_calendar），即行轴
+        issuers (list): 主体名称
+        tenors (list): 期限档位名称
+        periods (list): 时间段列表
+        bonds (np.ndarray): 时间段×档位×主体 的最活跃券代码，无数据为None
+        yields (np.ndarray): 交易日×档位×主体 的收益率（给出tax时为调整后的收益率），缺失为NaN
+    """
+
+    def __init__(self, days, issuers, tenors, periods, bonds, yields):
+        self.days = days
+        self.issuers = list(issuers)
+        self.tenors = list(tenors)
+        self.periods = list(periods)
+        self.bonds = bonds
+        self.yields = yields
+        # 全部主体对(a, b)，a < b；spreads[t, k, p] = (y_a - y_b) * 100，任一侧缺失即为NaN
+        self.pair_index = np.array(np.triu_indices(len(self.issuers), 1)).T
+        a, b = self.pair_index.T
+        self.spreads = (yields[:, :, a] - yields[:, :, b]) * 100
+
+    @classmethod
+    @profiled('issuer_spreads')
+    def from_panel(cls, data_file, issuers=ISSUERS, periods=PERIODS, tenors=CURVE_TENORS, tax=None,
+                   exchange='SSE'):
+        """
+        由行情数据构建跨主体利差
+
+        最活跃券的选取与curve模式（及func.select_bonds_by_period）一致；所选券在时间段内的
+        全部行情按交易日历映射到共同网格，不要求每天都在档位内。
+
+        参数:
+            data_file (str): 数据文件路径
+            issuers (list): 参与比较的主体（顺序即输出中主体A/主体B的顺序）
+            periods (list): 时间段列表，时间段之间不能重叠
+            tenors (dict): 期限档位
+            tax: 税务调整，为None时比较税前收益率；可传after_tax或签名相同的函数
+                 (收益率数组, 主体列表) -> 调整后的收益率数组
+            exchange (str): 交易日历
+
+        返回:
+            IssuerSpreads
+        """
+        starts = pd.to_datetime([start for _, start, _ in periods])
+        ends = pd.to_datetime([end for _, _, end in periods])
+        days = trading_days(starts.min().strftime('%Y-%m-%d'), ends.max().strftime('%Y-%m-%d'), exchange)
+        df = load_panel(data_file).select(starts.min(), ends.max())
+        df = df[df['债务主体'].isin(issuers)]
+
+        shape = (len(periods), len(tenors), len(issuers))
+        rows = curve_rows(df, periods, tenors)
+        top = rank_bonds(rows, top_n=1)
+
+        # 类别编码 -> 主体在issuers中的位置
+        position = {issuer: k for k, issuer in enumerate(issuers)}
+        issuer_pos = np.array([position.get(name, -1) for name in df['债务主体'].cat.categories], dtype=np.int64)
+        bond_names = np.asarray(df['标的债券代码'].cat.categories, dtype=object)
+
+        # 时间段×档位×主体 -> 最活跃券的类别编码
+        lookup = np.full(shape, -1, dtype=np.int64)
+        lookup[top['period'].to_numpy(), top['bucket'].to_numpy(),
+               issuer_pos[top['issuer'].to_numpy()]] = top['bond'].to_numpy()
+        bonds = np.where(lookup >= 0, bond_names[np.maximum(lookup, 0)], None)
+
+        # 只为入选券建 交易日×债券 收益率矩阵，末列全为NaN，供无数据的格子引用
+        selected = np.unique(lookup[lookup >= 0])
+        column = np.full(len(bond_names) + 1, len(selected), dtype=np.int64)
+        column[selected] = np.arange(len(selected))
+        member = rows[np.isin(rows['bond'].to_numpy(), selected)]
+        t = to_index(member['date'], days)
+        keep = t >= 0
+        matrix = np.full((len(days), len(selected) + 1), np.nan)
+        matrix[t[keep], column[member['bond'].to_numpy()[keep]]] = member['ytm'].to_numpy()[keep]
+
+        # 每个交易日按所属时间段查出各档位、各主体的最活跃券，一次索引得到 交易日×档位×主体 的收益率
+        day_period = period_index(days.astype('datetime64[D]'), periods)
+        codes = np.where((day_period >= 0)[:, None, None], lookup[np.maximum(day_period, 0)], -1)
+        yields = matrix[np.arange(len(days))[:, None, None], column[codes]]
+        if tax is not None:
+            yields = tax(yields, list(issuers))
+        return cls(days, issuers, list(tenors), periods, bonds, yields)
+
+    def _pair(self, issuer_a, issuer_b):
+        """主体对在spreads中的列及符号"""
+        a, b = self.issuers.index(issuer_a), self.issuers.index(issuer_b)
+        if a == b:
+            raise ValueError(f"主体相同: {issuer_a}")
+        p = np.flatnonzero((self.pair_index[:, 0] == min(a, b)) & (self.pair_index[:, 1] == max(a, b)))[0]
+        return p, (1.0 if a < b else -1.0)
+
+    def pair(self, tenor, issuer_a, issuer_b):
+        """
+        取某档位两主体的利差序列 (y_a - y_b) * 100，只保留两者均有数据的交易日
+
+        返回:
+            pd.Series: 以日期为索引的利差(bps)
+        """
+        p, sign = self._pair(issuer_a, issuer_b)
+        values = self.spreads[:, self.tenors.index(tenor), p] * sign
+        present = ~np.isnan(values)
+        return pd.Series(values[present], index=pd.to_datetime(self.days[present].astype('datetime64[D]')))
+
+    def frame(self, tenor):
+        """
+        某档位全部主体对的利差，列为'主体A-主体B'，行为共同交易日网格
+
+        返回:
+            pd.DataFrame
+        """
+        labels = [f'{self.issuers[a]}-{self.issuers[b]}' for a, b in self.pair_index]
+        return pd.DataFrame(self.spreads[:, self.tenors.index(tenor), :], columns=labels,
+                            index=pd.to_datetime(self.days.astype('datetime64[D]')))
+
+    def summary(self, quantiles=QUANTILES):
+        """
+        全部 档位×时间段×主体对 的利差统计，由quantiles.spread_quantiles一次算出
+
+        返回:
+            pd.DataFrame: 每个 期限-时间段-主体对 一行（无共同数据的组合不出现）
+        """
+        n_tenors, n_pairs = len(self.tenors), len(self.pair_index)
+        day_period = period_index(self.days.astype('datetime64[D]'), self.periods)
+        blocks = [self.spreads[day_period == k].reshape(-1, n_tenors * n_pairs) for k in range(len(self.periods))]
+        stats = spread_quantiles(stack_series(blocks), quantiles)
+
+        # 结果各项形状为 (时间段, 档位×主体对)，展开为长表
+        period, cell = np.nonzero(stats['count'] > 0)
+        tenor, pair = np.divmod(cell, n_pairs)
+        # 按 档位、时间段、主体对 排列
+        order = np.lexsort((pair, period, tenor))
+        period, cell, tenor, pair = period[order], cell[order], tenor[order], pair[order]
+        a, b = self.pair_index[pair].T
+        table = pd.DataFrame({
+            '期限': [self.tenors[k] for k in tenor],
+            '时间段': [self.periods[k][0] for k in period],
+            '开始日期': [self.periods[k][1] for k in period],
+            '结束日期': [self.periods[k][2] for k in period],
+            '主体A': [self.issuers[k] for k in a],
+            '主体B': [self.issuers[k] for k in b],
+            '债券A': self.bonds[period, tenor, a],
+            '债券B': self.bonds[period, tenor, b],
+            'mean': stats['mean'][period, cell],
+        })
+        for k, q in enumerate(quantiles):
+            table['median' if q == 50 else f'q{q}'] = stats['quantiles'][period, k, cell]
+        table['min'] = stats['min'][period, cell]
+        table['max'] = stats['max'][period, cell]
+        table['count'] = stats['count'][period, cell]
+        return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='跨主体利差：各期限档位最活跃券之间的两两利差')
+    parser.add_argument('data_file', nargs='?', default='利差分析四大行2年_final.csv', help='数据文件')
+    parser.add_argument('--issuer', action='append', help='参与比较的主体（可重复），默认为四大主体')
+    parser.add_argument('--tenor', action='append', help='只输出指定期限档位（可重复）')
+    parser.add_argument('--after-tax', action='store_true', help='按利息所得税率比较税后收益率')
+    parser.add_argument('--output-dir', default='spread_cross', help='输出目录')
+    args = parser.parse_args(argv)
+
+    from batch import write_table
+
+    tenors = CURVE_TENORS
+    if args.tenor:
+        tenors = {name: CURVE_TENORS[name] for name in args.tenor}
+    engine = IssuerSpreads.from_panel(args.data_file, args.issuer or ISSUERS, PERIODS, tenors,
+                                      tax=after_tax if args.after_tax else None)
+    table = engine.summary()
+    os.makedirs(args.output_dir, exist_ok=True)
+    base = os.path.join(args.output_dir, CROSS_FILE + ('_after_tax' if args.after_tax else ''))
+    write_table(table, base)
+
+    surface = table.pivot_table(index=['主体A', '主体B', '期限'], columns='时间段', values='mean', sort=False)
+    surface = surface.reindex(columns=[name for name, _, _ in PERIODS if name in surface.columns])
+    with pd.option_context('display.width', 200, 'display.float_format', '{:.2f}'.format):
+        print(f"跨主体利差均值（bps，{'税后' if args.after_tax else '税前'}）:")
+        print(surface)
+    print(f"跨主体利差统计已保存至: {base}.csv（{len(table)}行）")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,233 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from panel import load_panel
+from periods import ISSUERS, PERIODS
+from profiling import profiled
+from spreads import pair_label
+
+# 全曲线期限档位：名称 -> (剩余期限下限, 剩余期限上限)，10Y、30Y与periods.TENORS一致，档位之间不能重叠
+CURVE_TENORS = {
+    '1Y': (0.5, 1.0),
+    '3Y': (2.0, 3.0),
+    '5Y': (4.0, 5.0),
+    '7Y': (6.0, 7.0),
+    '10Y': (8.0, 10.0),
+    '20Y': (18.0, 20.0),
+    '30Y': (28.0, 30.0),
+}
+
+# 输出文件名（不含扩展名）：逐组合统计表、期限×时间段利差曲面
+CURVE_FILE = 'curve_spreads'
+SURFACE_FILE = 'curve_surface'
+
+# 统计表的标识列
+KEY_COLUMNS = ['主体', '期限', '时间段', '开始日期', '结束日期', '组合', '债券A', '债券B']
+
+
+def tenor_buckets(maturity, tenors=CURVE_TENORS):
+    """
+    用一次np.digitize把剩余期限分入期限档位（区间两端均包含，与select_bond的过滤一致）
+
+    参数:
+        maturity: 剩余期限(年)
+        tenors (dict): 期限档位，见CURVE_TENORS
+
+    返回:
+        np.ndarray: 档位下标（按tenors的顺序），不在任何档位内为-1
+    """
+    lows = np.array([band[0] for band in tenors.values()], dtype=np.float64)
+    highs = np.array([band[1] for band in tenors.values()], dtype=np.float64)
+    order = np.argsort(lows, kind='stable')
+    maturity = np.asarray(maturity, dtype=np.float64)
+    # 下限不超过剩余期限的最后一个档位，再检查是否超过其上限
+    pos = np.digitize(maturity, lows[order]) - 1
+    inside = pos >= 0
+    inside[inside] = maturity[inside] <= highs[order][pos[inside]]
+    return np.where(inside, order[np.maximum(pos, 0)], -1)
+
+
+def period_index(dates, periods):
+    """
+    按开始日期二分查找每个日期所属的时间段（与func.select_bonds_by_period一致）
+
+    返回:
+        np.ndarray: 时间段下标，落在时间段间隙中为-1
+    """
+    starts = pd.to_datetime([start for _, start, _ in periods]).values
+    ends = pd.to_datetime([end for _, _, end in periods]).values
+    order = np.argsort(starts, kind='stable')
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    pos = np.searchsorted(starts[order], dates, side='right') - 1
+    valid = pos >= 0
+    valid[valid] = dates[valid] <= ends[order][pos[valid]]
+    return np.where(valid, order[np.maximum(pos, 0)], -1)
+
+
+def curve_rows(df, periods, tenors=CURVE_TENORS):
+    """
+    将行情整理为分组用的编码表：主体和债券取类别编码，日期分入时间段、剩余期限分入档位
+
+    参数:
+        df (pd.DataFrame): 面板数据（主体、债券代码为category列）
+        periods (list): 时间段列表
+        tenors (dict): 期限档位
+
+    返回:
+        pd.DataFrame: issuer, bond, bond_order（债券代码的字典序名次）, period, bucket, date, ytm, trades 列，
+                      不在任何时间段内的行已剔除；不在任何档位内的行bucket为-1
+    """
+    codes = df['标的债券代码'].cat.codes.to_numpy()
+    # 类别编码不一定按代码排序，排名并列时按代码的字典序
+    names = np.asarray(df['标的债券代码'].cat.categories, dtype=str)
+    name_order = np.empty(len(names), dtype=np.int64)
+    name_order[np.argsort(names, kind='stable')] = np.arange(len(names))
+    rows = pd.DataFrame({
+        'issuer': df['债务主体'].cat.codes.to_numpy(),
+        'bond': codes,
+        'bond_order': name_order[codes],
+        'period': period_index(df['日期'], periods),
+        'bucket': tenor_buckets(df['剩余期限'], tenors),
+        'date': df['日期'].to_numpy(),
+        'ytm': df['到期收益率'].to_numpy(dtype=np.float64),
+        'trades': df['每日每券的成交笔数'].to_numpy(dtype=np.float64),
+    })
+    return rows[rows['period'] >= 0]
+
+
+def rank_bonds(rows, top_n=5):
+    """
+    在每个(主体, 档位, 时间段)内按平均成交笔数降序排名（并列时按债券代码的字典序），与select_bond一致
+
+    参数:
+        rows (pd.DataFrame): curve_rows的结果，只有档位内的行参与排名
+        top_n (int): 每组保留的债券数
+
+    返回:
+        pd.DataFrame: issuer, bucket, period, bond, bond_order, trades（平均成交笔数）, rank（从0开始）
+    """
+    group = ['issuer', 'bucket', 'period']
+    activity = rows[rows['bucket'] >= 0].groupby(group + ['bond', 'bond_order'], sort=True)['trades'].mean()
+    activity = activity.reset_index().sort_values(group + ['trades', 'bond_order'],
+                                                  ascending=[True, True, True, False, True], kind='stable')
+    activity['rank'] = activity.groupby(group, sort=False).cumcount()
+    return activity[activity['rank'] < top_n]
+
+
+@profiled()
+def curve_spreads(data_file, issuers=None, periods=PERIODS, tenors=CURVE_TENORS, top_n=5):
+    """
+    全曲线模式：一次分组得到全部 主体×期限档位×时间段 的活跃券排名及新老券利差统计
+
+    每行按剩余期限分入档位、按日期分入时间段，在(主体, 档位, 时间段)内按平均成交笔数排名
+    （结果与逐档位调用func.select_bonds_by_period一致）；最活跃券为新券，其余为老券，
+    利差为 新券收益率 - 老券收益率 (bps)，取两券在该时间段内均有数据的交易日。
+
+    参数:
+        data_file (str): 数据文件路径
+        issuers (list): 发债主体，为None时使用数据中的全部主体
+        periods (list): 时间段列表，时间段之间不能重叠
+        tenors (dict): 期限档位
+        top_n (int): 每组参与统计的债券数（新券 + top_n-1只老券）
+
+    返回:
+        pd.DataFrame: 每个 主体-期限-时间段-组合 一行，含利差的mean/median/std/min/max/count
+    """
+    columns = KEY_COLUMNS + ['mean', 'median', 'std', 'min', 'max', 'count']
+    starts = pd.to_datetime([start for _, start, _ in periods])
+    ends = pd.to_datetime([end for _, _, end in periods])
+    df = load_panel(data_file).select(starts.min(), ends.max())
+    if issuers is not None:
+        df = df[df['债务主体'].isin(issuers)]
+    if df.empty or not periods:
+        return pd.DataFrame(columns=columns)
+
+    rows = curve_rows(df, periods, tenors)
+    group = ['issuer', 'bucket', 'period']
+    top = rank_bonds(rows, top_n)
+
+    # 入选债券在时间段内的全部行情（与按债券列表筛选一致，不再限制剩余期限）
+    members = rows[['issuer', 'period', 'bond', 'date', 'ytm']].merge(
+        top[group + ['bond', 'rank']], on=['issuer', 'period', 'bond'])
+    on_the_run = members[members['rank'] == 0][group + ['date', 'bond', 'ytm']]
+    off_the_run = members[members['rank'] > 0].merge(on_the_run, on=group + ['date'], suffixes=('', '_otr'))
+    off_the_run['spread'] = (off_the_run['ytm_otr'] - off_the_run['ytm']) * 100
+
+    stats = off_the_run.groupby(group + ['rank', 'bond_otr', 'bond'], sort=True)['spread'].agg(
+        ['mean', 'median', 'std', 'min', 'max', 'count']).reset_index()
+    if stats.empty:
+        return pd.DataFrame(columns=columns)
+
+    issuer_names = df['债务主体'].cat.categories
+    bond_names = df['标的债券代码'].cat.categories
+    tenor_names = list(tenors)
+    table = pd.DataFrame({
+        '主体': issuer_names[stats['issuer']],
+        '期限': [tenor_names[k] for k in stats['bucket']],
+        '时间段': [periods[k][0] for k in stats['period']],
+        '开始日期': [periods[k][1] for k in stats['period']],
+        '结束日期': [periods[k][2] for k in stats['period']],
+        '组合': [pair_label(0, j) for j in stats['rank']],
+        '债券A': bond_names[stats['bond_otr']],
+        '债券B': bond_names[stats['bond']],
+    })
+    for key in ['mean', 'median', 'std', 'min', 'max', 'count']:
+        table[key] = stats[key].to_numpy()
+    return table
+
+
+def spread_surface(table, pair='1-2', value='mean', tenors=CURVE_TENORS, periods=PERIODS):
+    """
+    将curve_spreads的结果整理为紧凑的 期限×时间段 利差曲面
+
+    参数:
+        table (pd.DataFrame): curve_spreads的结果
+        pair (str): 组合标签，默认为新券对次新券'1-2'
+        value (str): 统计量列
+
+    返回:
+        pd.DataFrame: 行为(主体, 期限)，列为时间段，按档位和时间段的原有顺序排列
+    """
+    selected = table[table['组合'] == pair]
+    surface = selected.pivot_table(index=['主体', '期限'], columns='时间段', values=value, aggfunc='first',
+                                   sort=False)
+    issuer_order = {name: k for k, name in enumerate(ISSUERS)}
+    tenor_order = {name: k for k, name in enumerate(tenors)}
+    surface = surface.sort_index(key=lambda index: index.map(
+        tenor_order if index.name == '期限' else lambda name: issuer_order.get(name, len(issuer_order))))
+    surface = surface.reindex(columns=[name for name, _, _ in periods if name in surface.columns])
+    surface.columns.name = None
+    return surface
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='全曲线模式：一次计算全部期限档位、全部时间段的新老券利差')
+    parser.add_argument('data_file', nargs='?', default='利差分析四大行2年_final.csv', help='数据文件')
+    parser.add_argument('--issuer', action='append', help='只统计指定主体（可重复），默认全部')
+    parser.add_argument('--top-n', type=int, default=5, help='每组参与统计的债券数')
+    parser.add_argument('--pair', default='1-2', help='曲面使用的组合')
+    parser.add_argument('--value', default='mean', choices=['mean', 'median', 'std', 'min', 'max', 'count'],
+                        help='曲面使用的统计量')
+    parser.add_argument('--output-dir', default='spread_curve', help='输出目录')
+    args = parser.parse_args(argv)
+
+    from batch import write_table
+
+    table = curve_spreads(args.data_file, args.issuer, top_n=args.top_n)
+    surface = spread_surface(table, args.pair, args.value)
+    os.makedirs(args.output_dir, exist_ok=True)
+    write_table(table, os.path.join(args.output_dir, CURVE_FILE))
+    surface.reset_index().to_csv(os.path.join(args.output_dir, SURFACE_FILE + '.csv'), index=False,
+                                 encoding='utf-8-sig')
+    with pd.option_context('display.width', 200, 'display.float_format', '{:.2f}'.format):
+        print(f"{args.pair}利差（bps，{args.value}）:")
+        print(surface)
+    print(f"全曲线统计表已保存至: {args.output_dir}（{len(table)}行）")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
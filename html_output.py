@@ -0,0 +1,289 @@
+import html
+import json
+
+import numpy as np
+
+from profiling import profiled
+
+# 每条序列降采样后的最多点数
+MAX_POINTS = 800
+
+# 与matplotlib默认色板一致
+COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+          '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+# 画布尺寸（像素）
+WIDTH = 1100
+PANEL_HEIGHT = 280
+MARGIN = {'left': 70, 'right': 230, 'top': 30, 'bottom': 40}
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets降采样：保留折线形状的同时把点数降到threshold
+
+    参数:
+        x (np.ndarray): 横坐标（递增）
+        y (np.ndarray): 纵坐标，不含NaN
+        threshold (int): 目标点数（至少3）
+
+    返回:
+        np.ndarray: 保留点的下标
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # 首尾两点固定，中间n-2个点均分到threshold-2个桶
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for k in range(threshold - 2):
+        lo, hi = edges[k], max(edges[k + 1], edges[k] + 1)
+        # 下一个桶的均值点（最后一个桶取终点）
+        if k + 2 < len(edges):
+            nlo, nhi = edges[k + 1], max(edges[k + 2], edges[k + 1] + 1)
+            cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        # 选出与上一个保留点、下一个桶均值点构成三角形面积最大的点
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[k + 1] = a
+    return selected
+
+
+def downsample(x, y, max_points=MAX_POINTS):
+    """
+    对含NaN断点的序列降采样：按有效段分别做LTTB，段间保留NaN断点
+
+    各段按长度分配总点数，返回的点数（含NaN断点）不超过max_points；
+    断点过多时只保留最长的若干段
+
+    返回:
+        tuple: (x, y)，断点处y为NaN
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.isfinite(y)
+    if valid.sum() <= max_points:
+        return x, y
+    # 连续有效段的起止位置
+    change = np.flatnonzero(np.diff(np.r_[0, valid.astype(np.int8), 0]))
+    starts, stops = change[::2], change[1::2]
+    lengths = stops - starts
+    # 每段至少1个点，段间各占1个NaN断点：最多保留(max_points+1)//2段，按长度取最长的
+    n_keep = min(len(starts), (max_points + 1) // 2)
+    kept = np.sort(np.argsort(-lengths, kind='stable')[:n_keep])
+    # 扣除断点后的点数：每段先分1个点，余下的按段长比例向下取整
+    points = max_points - (n_keep - 1)
+    budgets = 1 + (points - n_keep) * lengths[kept] // lengths[kept].sum()
+    xs, ys = [], []
+    for k, budget in zip(kept, budgets):
+        seg_x, seg_y = x[starts[k]:stops[k]], y[starts[k]:stops[k]]
+        if budget < 3:
+            # LTTB至少需要3个点，不足时保留首尾
+            keep = np.unique([0, len(seg_x) - 1])[:budget]
+        else:
+            keep = lttb(seg_x, seg_y, int(budget))
+        xs.extend([seg_x[keep], [np.nan]])
+        ys.extend([seg_y[keep], [np.nan]])
+    return np.concatenate(xs[:-1]), np.concatenate(ys[:-1])
+
+
+class _Panel:
+    """一个SVG坐标区：负责数据坐标到像素坐标的换算和元素输出"""
+
+    def __init__(self, top, x_range, series, right_series=None):
+        self.top = top
+        self.x0, self.x1 = x_range
+        self.y0, self.y1 = self._range(series)
+        self.r0, self.r1 = self._range(right_series) if right_series else (0.0, 1.0)
+        self.left = MARGIN['left']
+        self.width = WIDTH - MARGIN['left'] - MARGIN['right']
+        self.height = PANEL_HEIGHT - MARGIN['top'] - MARGIN['bottom']
+        self.parts = []
+
+    @staticmethod
+    def _range(series):
+        values = [y[np.isfinite(y)] for _, y in series]
+        values = np.concatenate(values) if values else np.array([])
+        if values.size == 0:
+            return 0.0, 1.0
+        lo, hi = float(values.min()), float(values.max())
+        pad = (hi - lo) * 0.05 or 1.0
+        return lo - pad, hi + pad
+
+    def px(self, x):
+        return self.left + (x - self.x0) / max(self.x1 - self.x0, 1e-12) * self.width
+
+    def py(self, y, right=False):
+        lo, hi = (self.r0, self.r1) if right else (self.y0, self.y1)
+        return self.top + MARGIN['top'] + (hi - y) / (hi - lo) * self.height
+
+    def path(self, x, y, color, label, width=1.5, dash=None, right=False):
+        """折线，NaN处断开；<title>在浏览器中悬停显示图例名"""
+        commands, pen_down = [], False
+        for xv, yv in zip(self.px(x), self.py(y, right)):
+            if not np.isfinite(yv):
+                pen_down = False
+                continue
+            commands.append(f"{'L' if pen_down else 'M'}{xv:.1f} {yv:.1f}")
+            pen_down = True
+        dash_attr = f' stroke-dasharray="{dash}"' if dash else ''
+        self.parts.append(
+            f'<path d="{" ".join(commands)}" fill="none" stroke="{color}" stroke-width="{width}"{dash_attr}>'
+            f'<title>{html.escape(label)}</title></path>'
+        )
+
+    def frame(self, ylabel, tick_positions, tick_labels, right_label=None, zero_line=False):
+        """坐标框、网格、刻度和轴标题"""
+        top, bottom = self.top + MARGIN['top'], self.top + MARGIN['top'] + self.height
+        right = self.left + self.width
+        p = self.parts
+        p.append(f'<rect x="{self.left}" y="{top}" width="{self.width}" height="{self.height}" '
+                 f'fill="none" stroke="#333"/>')
+        for value in np.linspace(self.y0, self.y1, 6)[1:-1]:
+            y = self.py(value)
+            p.append(f'<line x1="{self.left}" y1="{y:.1f}" x2="{right}" y2="{y:.1f}" stroke="#ddd" '
+                     f'stroke-dasharray="4 3"/>')
+            p.append(f'<text x="{self.left - 6}" y="{y + 4:.1f}" text-anchor="end">{value:.2f}</text>')
+        if right_label:
+            for value in np.linspace(self.r0, self.r1, 6)[1:-1]:
+                y = self.py(value, right=True)
+                p.append(f'<text x="{right + 6}" y="{y + 4:.1f}" fill="purple">{value:.2f}</text>')
+            p.append(f'<text transform="translate({right + 55},{(top + bottom) / 2:.1f}) rotate(90)" '
+                     f'text-anchor="middle" fill="purple">{html.escape(right_label)}</text>')
+        for position, label in zip(tick_positions, tick_labels):
+            x = self.px(position)
+            p.append(f'<line x1="{x:.1f}" y1="{top}" x2="{x:.1f}" y2="{bottom}" stroke="#eee"/>')
+            p.append(f'<text x="{x:.1f}" y="{bottom + 16}" text-anchor="middle">{html.escape(label)}</text>')
+        if zero_line and self.y0 < 0 < self.y1:
+            y = self.py(0)
+            p.append(f'<line x1="{self.left}" y1="{y:.1f}" x2="{right}" y2="{y:.1f}" stroke="red" '
+                     f'stroke-dasharray="6 3" stroke-width="0.8"/>')
+        p.append(f'<text transform="translate({self.left - 50},{(top + bottom) / 2:.1f}) rotate(-90)" '
+                 f'text-anchor="middle">{html.escape(ylabel)}</text>')
+
+    def legend(self, title, entries, offset=20):
+        """图例放在坐标框右侧offset像素处（有右轴时需让出刻度位置）"""
+        x = self.left + self.width + offset
+        y = self.top + MARGIN['top'] + 10
+        self.parts.append(f'<text x="{x}" y="{y}" font-weight="bold">{html.escape(title)}</text>')
+        for k, (label, color, dash) in enumerate(entries):
+            yy = y + 18 * (k + 1)
+            dash_attr = f' stroke-dasharray="{dash}"' if dash else ''
+            self.parts.append(f'<line x1="{x}" y1="{yy - 4}" x2="{x + 24}" y2="{yy - 4}" stroke="{color}" '
+                              f'stroke-width="2"{dash_attr}/>')
+            self.parts.append(f'<text x="{x + 30}" y="{yy}">{html.escape(label)}</text>')
+
+    def svg(self):
+        return '\n'.join(self.parts)
+
+
+def _ticks(n_days, tick_labels, max_ticks=12):
+    """从每5个交易日一个的刻度中均匀取不超过max_ticks个"""
+    positions = np.arange(0, n_days, 5)[:len(tick_labels)]
+    step = max(1, int(np.ceil(len(positions) / max_ticks)))
+    return positions[::step], tick_labels[::step]
+
+
+def demo_bundle(payload, max_points=MAX_POINTS):
+    """
+    将prepare_spread_demo的结果降采样为可序列化的数据包
+
+    返回:
+        dict: 标题、刻度和各组序列（x为交易日下标，y中的null表示断点）
+    """
+    def series(x, y):
+        x, y = downsample(x, y, max_points)
+        return {'x': [None if np.isnan(v) else int(v) for v in x],
+                'y': [None if np.isnan(v) else round(float(v), 4) for v in y]}
+
+    ytm_x, ytm_y, ytm_label = payload['benchmark']
+    return {
+        'title': payload['title'],
+        'n_days': payload['n_days'],
+        'tick_labels': list(payload['tick_labels']),
+        'benchmark': {'label': ytm_label, **series(ytm_x, ytm_y)},
+        'spreads': [{'label': label, **series(x, y)} for label, x, y in payload['spreads']],
+        'total_loan': {'label': '总借贷余额', **series(*payload['total_loan'])},
+        'loans': [{'label': label, 'rank': i, **series(x, y)} for i, label, x, y in payload['loans']],
+        'trades': [{'label': label, 'rank': i, **series(x, y)} for i, label, x, y in payload['trades']],
+    }
+
+
+def _arrays(item):
+    x = np.array([np.nan if v is None else v for v in item['x']], dtype=np.float64)
+    y = np.array([np.nan if v is None else v for v in item['y']], dtype=np.float64)
+    return x, y
+
+
+def render_demo_html(bundle):
+    """由demo_bundle的数据包生成自包含的HTML（内嵌SVG和JSON，不依赖任何外部资源）"""
+    x_range = (-0.5, max(bundle['n_days'], 1) - 0.5)
+    positions, labels = _ticks(bundle['n_days'], bundle['tick_labels'])
+    colors = {item['label']: COLORS[k % len(COLORS)] for k, item in enumerate(bundle['spreads'])}
+
+    # 子图1：利差 + 右轴中债YTM
+    spreads = [_arrays(item) for item in bundle['spreads']]
+    benchmark = _arrays(bundle['benchmark'])
+    p1 = _Panel(0, x_range, spreads, [benchmark])
+    p1.frame('利差(bps)', positions, labels, right_label='中债YTM(%)', zero_line=True)
+    for item, (x, y) in zip(bundle['spreads'], spreads):
+        p1.path(x, y, colors[item['label']], item['label'])
+    p1.path(*benchmark, 'purple', bundle['benchmark']['label'], width=2, dash='2 3', right=True)
+    p1.legend('债券利差', [(item['label'], colors[item['label']], None) for item in bundle['spreads']]
+              + [(bundle['benchmark']['label'], 'purple', '2 3')], offset=90)
+
+    # 子图2：借贷余额
+    loans = [_arrays(item) for item in bundle['loans']]
+    total = _arrays(bundle['total_loan'])
+    p2 = _Panel(PANEL_HEIGHT, x_range, loans + [total])
+    p2.frame('借贷余额(亿元)', positions, labels)
+    for k, (item, (x, y)) in enumerate(zip(bundle['loans'], loans)):
+        p2.path(x, y, COLORS[k % len(COLORS)], item['label'], width=1.2)
+    p2.path(*total, 'black', '总借贷余额', width=2)
+    p2.legend('债券代码', [(item['label'], COLORS[k % len(COLORS)], None) for k, item in enumerate(bundle['loans'])]
+              + [('总借贷余额', 'black', None)])
+
+    # 子图3：成交笔数
+    trades = [_arrays(item) for item in bundle['trades']]
+    p3 = _Panel(2 * PANEL_HEIGHT, x_range, trades)
+    p3.frame('成交笔数', positions, labels)
+    widths = [2.0, 1.5, 1.5, 1.2, 1.2]
+    for k, (item, (x, y)) in enumerate(zip(bundle['trades'], trades)):
+        rank = item['rank']
+        p3.path(x, y, COLORS[k % len(COLORS)], item['label'], width=widths[rank] if rank < len(widths) else 1.0)
+    p3.legend('债券代码', [(item['label'], COLORS[k % len(COLORS)], None) for k, item in enumerate(bundle['trades'])])
+
+    title = html.escape(bundle['title'])
+    height = 3 * PANEL_HEIGHT
+    data = json.dumps(bundle, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    return (
+        '<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n<meta charset="utf-8">\n'
+        f'<title>{title}</title>\n'
+        '<style>body{font-family:"SimHei","Microsoft YaHei","PingFang SC",sans-serif;margin:16px}'
+        'svg text{font-size:11px}</style>\n</head>\n<body>\n'
+        f'<h3>{title}</h3>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{height}" '
+        f'viewBox="0 0 {WIDTH} {height}">\n{p1.svg()}\n{p2.svg()}\n{p3.svg()}\n</svg>\n'
+        f'<script type="application/json" id="chart-data">{data}</script>\n'
+        '</body>\n</html>\n'
+    )
+
+
+@profiled('draw_html')
+def draw_spread_demo_html(payload, save_path, preview=False, max_points=MAX_POINTS):
+    """
+    将三联分析图输出为自包含的HTML（内嵌SVG和降采样后的JSON数据），可离线打开
+
+    参数:
+        payload: prepare_spread_demo返回的绘图数据
+        save_path: 保存路径（.html）
+        preview: 与其它绘图函数的接口保持一致，HTML输出不区分预览
+        max_points: 每条序列降采样后的最多点数
+    """
+    with open(save_path, 'w', encoding='utf-8') as f:
+        f.write(render_demo_html(demo_bundle(payload, max_points)))
+    print(f"HTML图表已保存至: {save_path}")
@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from panel import BondPanel, clean_frame, concat_frames, read_frame, write_frame
+from profiling import profiled
+from quantiles import QUANTILES, QuantileSketch
+from regression import SufficientStats
+from spreads import SpreadMatrix, default_pairs, pair_label
+
+# 增量数据目录
+STATE_DIR = '.bond_state'
+
+# 滚动平均成交笔数的窗口：行情数据中最近的20个交易日（债券当天无行情则该日不计入均值）
+ROLLING_WINDOW = 20
+
+
+class IncrementalStore:
+    """
+    按交易日增量追加的行情存储
+
+    行情数据按追加批次保存为多个分段文件，每次追加只写入新数据；跟踪的债券组合同时维护
+    利差序列分段、累计/滚动平均成交笔数、各利差组合的分位数草图和1-2、1-3回归的充分统计量，
+    因此每日刷新的耗时只与新增数据量有关。同一交易日的数据需在一次追加中给全。
+
+    参数:
+        state_dir (str): 数据目录
+    """
+
+    def __init__(self, state_dir=STATE_DIR):
+        self.state_dir = state_dir
+        self.state_path = os.path.join(state_dir, 'state.json')
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        else:
+            self.state = {'last_date': None, 'segments': [], 'tracked': {}, 'next_segment': 0}
+
+    def _save_state(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def _write_segment(self, df, prefix):
+        """写入一个分段文件，返回分段描述"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        name = f"{prefix}-{self.state['next_segment']:06d}"
+        self.state['next_segment'] += 1
+        fmt = write_frame(df, os.path.join(self.state_dir, name))
+        return {'name': name, 'format': fmt, 'rows': len(df)}
+
+    def _segment_file(self, segment):
+        ext = '.parquet' if segment['format'] == 'parquet' else '.pkl'
+        return os.path.join(self.state_dir, segment['name'] + ext)
+
+    def _read_segments(self, segments):
+        return [read_frame(os.path.join(self.state_dir, seg['name']), seg['format']) for seg in segments]
+
+    # ========== 行情数据 ==========
+    @profiled('incremental_append')
+    def append(self, raw_df):
+        """
+        追加新数据：只保留晚于已有最后交易日的行，写入新分段并更新所有跟踪组合
+
+        参数:
+            raw_df (pd.DataFrame): 原始行情数据（日期列需已解析）
+
+        返回:
+            int: 实际追加的行数
+        """
+        df = clean_frame(raw_df)
+        last_date = self.state['last_date']
+        if last_date is not None:
+            df = df[df['日期'] > pd.Timestamp(last_date)].reset_index(drop=True)
+        if df.empty:
+            print("没有新的交易日数据")
+            return 0
+
+        segment = self._write_segment(df, 'panel')
+        segment['first'] = df['日期'].min().strftime('%Y-%m-%d')
+        segment['last'] = df['日期'].max().strftime('%Y-%m-%d')
+        self.state['segments'].append(segment)
+        self.state['last_date'] = segment['last']
+
+        for name, item in self.state['tracked'].items():
+            self._update_tracked(item, df)
+        self._save_state()
+        print(f"已追加{len(df)}行，{segment['first']}至{segment['last']}")
+        return len(df)
+
+    def append_csv(self, data_path):
+        """追加一个CSV文件中的新数据"""
+        return self.append(pd.read_csv(data_path, parse_dates=['日期']))
+
+    def load_frame(self):
+        """合并全部分段，返回清洗后的数据"""
+        frames = self._read_segments(self.state['segments'])
+        if not frames:
+            raise ValueError(f"{self.state_dir}中还没有行情数据，请先追加数据")
+        return concat_frames(frames)
+
+    def load_panel(self):
+        """返回由全部分段构成的BondPanel"""
+        return BondPanel(self.load_frame())
+
+    @profiled('incremental_compact')
+    def compact(self):
+        """将全部行情分段合并为一个文件"""
+        segments = self.state['segments']
+        if len(segments) <= 1:
+            return
+        df = self.load_frame()
+        segment = self._write_segment(df, 'panel')
+        segment['first'] = segments[0]['first']
+        segment['last'] = segments[-1]['last']
+        self.state['segments'] = [segment]
+        self._save_state()
+        for seg in segments:
+            os.remove(self._segment_file(seg))
+
+    # ========== 跟踪的债券组合 ==========
+    def track(self, name, issuer, min_maturity, max_maturity, bond_list):
+        """
+        新增一个跟踪组合，并用已有历史初始化其派生结果
+
+        参数:
+            name (str): 组合名称
+            issuer (str): 债务主体名称
+            min_maturity (float): 剩余期限下限(年)
+            max_maturity (float): 剩余期限上限(年)
+            bond_list (list): 按活跃度排序的债券列表
+        """
+        item = {
+            'issuer': issuer,
+            'min_maturity': min_maturity,
+            'max_maturity': max_maturity,
+            'bonds': list(bond_list),
+            'activity': {bond: {'sum': 0.0, 'count': 0, 'recent': []} for bond in bond_list},
+            'recent_days': [],
+            'regression': {pair_label(0, j): SufficientStats().to_dict()
+                           for j in range(1, min(3, len(bond_list)))},
+            'quantiles': {},
+            'spread_segments': [],
+        }
+        if self.state['segments']:
+            self._update_tracked(item, self.load_frame())
+        self.state['tracked'][name] = item
+        self._save_state()
+
+    def _update_tracked(self, item, new_rows):
+        """
+        用新增行更新一个跟踪组合的利差、成交笔数均值和回归统计量
+
+        与批量运行、图表的取数方式一致：按主体和债券列表筛选，不按剩余期限过滤
+        （债券剩余期限移出档位后仍继续跟踪）
+        """
+        bonds = item['bonds']
+
+        # 滚动窗口按交易日计：取全部新增行情（任意债券）出现的日期，窗口外的取值随之剔除
+        days = np.unique(new_rows['日期'].to_numpy()).astype('datetime64[D]').astype(str).tolist()
+        item['recent_days'] = (item.get('recent_days', []) + days)[-ROLLING_WINDOW:]
+        cutoff = item['recent_days'][0] if item['recent_days'] else ''
+        for activity in item['activity'].values():
+            # 旧版状态中的recent为不带日期的取值，无法按日期裁剪，直接丢弃
+            activity['recent'] = [entry for entry in activity['recent']
+                                  if isinstance(entry, list) and entry[0] >= cutoff]
+
+        mask = new_rows['标的债券代码'].isin(bonds).to_numpy() & (new_rows['债务主体'] == item['issuer']).to_numpy()
+        rows = new_rows[mask]
+        if rows.empty:
+            return
+
+        # 利差序列：只计算新增交易日并写入新分段
+        matrix = SpreadMatrix.from_frame(rows, bonds)
+        spreads = matrix.frame(default_pairs(len(bonds))).reset_index()
+        item['spread_segments'].append(self._write_segment(spreads, 'spreads'))
+
+        # 利差分位数：草图合并新增样本，无需读取历史利差
+        sketches = item.setdefault('quantiles', {})
+        for label in spreads.columns.drop('日期'):
+            sketch = QuantileSketch.from_dict(sketches[label]) if label in sketches else QuantileSketch()
+            sketches[label] = sketch.update(spreads[label].to_numpy()).to_dict()
+
+        # 成交笔数：累计和、计数，以及最近ROLLING_WINDOW个交易日内的 [日期, 取值]
+        trades = rows.pivot(index='日期', columns='标的债券代码', values='每日每券的成交笔数')
+        trades = trades.reindex(index=matrix.dates, columns=bonds).to_numpy(dtype=np.float64)
+        labels = matrix.dates.strftime('%Y-%m-%d')
+        for k, bond in enumerate(bonds):
+            column = trades[:, k]
+            present = ~np.isnan(column)
+            activity = item['activity'][bond]
+            activity['sum'] += float(column[present].sum())
+            activity['count'] += int(present.sum())
+            activity['recent'] += [[day, float(value)] for day, value in zip(labels[present], column[present])
+                                   if day >= cutoff]
+
+        # 回归充分统计量：x=成交笔数比，y=价差(bps)
+        for label, data in item['regression'].items():
+            j = int(label.split('-')[1]) - 1
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = trades[:, 0] / trades[:, j]
+            stats = SufficientStats.from_dict(data).update(ratio, matrix.tensor[:, 0, j])
+            item['regression'][label] = stats.to_dict()
+
+    def spreads(self, name):
+        """返回跟踪组合的完整利差序列（日期×组合，bps）"""
+        frames = self._read_segments(self.state['tracked'][name]['spread_segments'])
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True).set_index('日期')
+
+    def summary(self, name):
+        """
+        跟踪组合的当前结果
+
+        返回:
+            dict: {'activity': 各券累计平均成交笔数和最近ROLLING_WINDOW个交易日的平均成交笔数（按累计均值降序）, 'regression': {组合: 回归结果},
+                   'quantiles': 各利差组合的样本数、均值和QUANTILES分位数(bps)}
+        """
+        item = self.state['tracked'][name]
+        activity = []
+        for bond, data in item['activity'].items():
+            mean = data['sum'] / data['count'] if data['count'] else np.nan
+            rolling = float(np.mean([value for _, value in data['recent']])) if data['recent'] else np.nan
+            activity.append({'债券代码': bond, '平均成交笔数': mean, '滚动平均成交笔数': rolling})
+        activity.sort(key=lambda row: -np.nan_to_num(row['平均成交笔数'], nan=-np.inf))
+        regression = {label: SufficientStats.from_dict(data).result()
+                      for label, data in item['regression'].items()}
+        quantiles = []
+        for label, data in item.get('quantiles', {}).items():
+            sketch = QuantileSketch.from_dict(data)
+            row = {'组合': label, '样本数': sketch.n, '均值': sketch.mean}
+            row.update({f'{q}%': value for q, value in zip(QUANTILES, sketch.quantiles())})
+            quantiles.append(row)
+        return {'activity': activity, 'regression': regression, 'quantiles': quantiles}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='行情数据增量追加与派生结果更新')
+    parser.add_argument('--state-dir', default=STATE_DIR, help='增量数据目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('append', help='追加CSV中晚于已有最后交易日的数据（首次运行即为初始化）')
+    p.add_argument('data_file')
+
+    p = sub.add_parser('track', help='新增跟踪的债券组合')
+    p.add_argument('name')
+    p.add_argument('--issuer', required=True)
+    p.add_argument('--min-maturity', type=float, required=True)
+    p.add_argument('--max-maturity', type=float, required=True)
+    p.add_argument('--bonds', nargs='+', required=True, help='按活跃度排序的债券代码')
+
+    p = sub.add_parser('show', help='显示跟踪组合的当前结果')
+    p.add_argument('name')
+
+    sub.add_parser('compact', help='合并行情分段')
+    args = parser.parse_args(argv)
+
+    store = IncrementalStore(args.state_dir)
+    if args.command == 'append':
+        store.append_csv(args.data_file)
+    elif args.command == 'track':
+        store.track(args.name, args.issuer, args.min_maturity, args.max_maturity, args.bonds)
+    elif args.command == 'show':
+        result = store.summary(args.name)
+        print(pd.DataFrame(result['activity']).to_string(index=False))
+        for label, reg in result['regression'].items():
+            print(f"{label}: y = {reg['slope']:.2f}x + {reg['intercept']:.2f}, "
+                  f"R方 = {reg['rsquared']:.2f}, Pearson r = {reg['r']:.2f}, n = {reg['n']}")
+        if result['quantiles']:
+            print(pd.DataFrame(result['quantiles']).to_string(index=False, float_format='%.2f'))
+    elif args.command == 'compact':
+        store.compact()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from profiling import profiled, span
+
+# 磁盘缓存目录（位于数据文件同级目录下）
+CACHE_DIR = '.bond_cache'
+
+# 缓存中的列类型：代码和主体用category，收益率和成交笔数用float32
+CATEGORY_COLUMNS = ['标的债券代码', '债务主体']
+FLOAT32_COLUMNS = ['到期收益率', '每日每券的成交笔数']
+
+# 面板行顺序：每只债券的数据连续且按日期排列
+SORT_COLUMNS = ['债务主体', '标的债券代码', '日期']
+
+# 每只债券每个交易日只保留一行行情
+KEY_COLUMNS = ['日期', '标的债券代码']
+
+# 各脚本用到的全部列，读取CSV时只解析这些列
+ANALYSIS_COLUMNS = ['日期', '标的债券代码', '债务主体', '剩余期限', '到期收益率',
+                    '每日每券的成交笔数', '单券借贷余额（百万元）']
+
+# 缓存格式版本，读取方式或列类型变化时递增以触发重建
+CACHE_VERSION = 4
+
+
+def clean_frame(df, sort=True):
+    """
+    清洗原始行情数据并压缩列类型（与func.select_bond原有清洗逻辑一致）
+
+    参数:
+        df (pd.DataFrame): 已读取的原始行情数据（日期列需已解析）
+        sort (bool): 是否按SORT_COLUMNS排序
+
+    返回:
+        pd.DataFrame: 清洗后的数据
+    """
+    df = df.dropna(subset=['标的债券代码', '债务主体', '剩余期限', '每日每券的成交笔数'])
+    df = df.assign(剩余期限=pd.to_numeric(df['剩余期限'], errors='coerce'))
+    df = df.dropna(subset=['剩余期限'])
+    # 日期缺失的行不会落入任何日期窗口，建索引前剔除
+    df = df.dropna(subset=['日期'])
+    # 同一债券同一天的重复行情以最后一行为准，保证后续按 日期×债券 透视不会出错
+    df = df.drop_duplicates(subset=KEY_COLUMNS, keep='last')
+    dtypes = {col: 'category' for col in CATEGORY_COLUMNS}
+    dtypes.update({col: 'float32' for col in FLOAT32_COLUMNS if col in df.columns})
+    df = df.astype(dtypes)
+    if not sort:
+        return df.reset_index(drop=True)
+    return df.sort_values(SORT_COLUMNS, kind='stable').reset_index(drop=True)
+
+
+def iter_csv_chunks(data_path, columns=ANALYSIS_COLUMNS, issuers=None, start_date=None, end_date=None,
+                    min_maturity=None, max_maturity=None, chunksize=200_000):
+    """
+    分块读取CSV：只解析需要的列，每块清洗后立即按条件过滤，逐块返回压缩类型后的数据
+
+    参数:
+        data_path (str): CSV文件路径
+        columns (list): 需要的列，文件中不存在的列忽略
+        issuers (list): 只保留这些债务主体
+        start_date (str): 开始日期
+        end_date (str): 结束日期
+        min_maturity (float): 剩余期限下限(年)
+        max_maturity (float): 剩余期限上限(年)
+        chunksize (int): 每块行数
+
+    返回:
+        生成器，每次返回一块清洗、过滤后的pd.DataFrame（未排序）
+    """
+    wanted = set(columns)
+    reader = pd.read_csv(data_path, usecols=lambda col: col in wanted, parse_dates=['日期'],
+                         dtype={'标的债券代码': str, '债务主体': str}, chunksize=chunksize)
+    for chunk in reader:
+        if issuers is not None:
+            chunk = chunk[chunk['债务主体'].isin(issuers)]
+        if start_date is not None:
+            chunk = chunk[chunk['日期'] >= pd.to_datetime(start_date)]
+        if end_date is not None:
+            chunk = chunk[chunk['日期'] <= pd.to_datetime(end_date)]
+        chunk = clean_frame(chunk, sort=False)
+        if min_maturity is not None:
+            chunk = chunk[chunk['剩余期限'] >= min_maturity]
+        if max_maturity is not None:
+            chunk = chunk[chunk['剩余期限'] <= max_maturity]
+        if not chunk.empty:
+            yield chunk
+
+
+def concat_frames(frames):
+    """合并清洗后的数据块，category列取并集（避免退化为object列）"""
+    frames = list(frames)
+    if not frames:
+        return None
+    categories = {col: union_categoricals([frame[col] for frame in frames], sort_categories=True)
+                  for col in CATEGORY_COLUMNS}
+    df = pd.concat([frame.drop(columns=CATEGORY_COLUMNS) for frame in frames], ignore_index=True)
+    for col in CATEGORY_COLUMNS:
+        df[col] = categories[col]
+    return df
+
+
+@profiled('read_csv')
+def read_csv_filtered(data_path, columns=ANALYSIS_COLUMNS, chunksize=200_000, **filters):
+    """
+    分块读取并过滤CSV，峰值内存取决于过滤后的结果而非源文件大小
+
+    参数:
+        data_path (str): CSV文件路径
+        columns (list): 需要的列
+        chunksize (int): 每块行数
+        **filters: issuers、start_date、end_date、min_maturity、max_maturity，见iter_csv_chunks
+
+    返回:
+        pd.DataFrame: 清洗、过滤并排序后的数据，可直接构建BondPanel
+    """
+    df = concat_frames(iter_csv_chunks(data_path, columns, chunksize=chunksize, **filters))
+    if df is None:
+        return clean_frame(pd.read_csv(data_path, usecols=lambda col: col in set(columns),
+                                       parse_dates=['日期'], nrows=0))
+    # 重复行可能分在不同的块中，合并后再按文件顺序去重一次
+    df = df.drop_duplicates(subset=KEY_COLUMNS, keep='last')
+    df = df[[col for col in columns if col in df.columns]]
+    return df.sort_values(SORT_COLUMNS, kind='stable').reset_index(drop=True)
+
+
+def _is_sorted(df):
+    """判断数据是否已按SORT_COLUMNS排列（逐行比较相邻键，O(n)）"""
+    if len(df) < 2:
+        return True
+    d_issuer = np.diff(df['债务主体'].cat.codes.to_numpy().astype(np.int64))
+    d_bond = np.diff(df['标的债券代码'].cat.codes.to_numpy().astype(np.int64))
+    d_date = np.diff(df['日期'].to_numpy().astype(np.int64))
+    ordered = (d_issuer > 0) | ((d_issuer == 0) & ((d_bond > 0) | ((d_bond == 0) & (d_date >= 0))))
+    return bool(ordered.all())
+
+
+def split_by_bond(df):
+    """
+    将按债券排列的数据（BondPanel.select的结果）拆分为每只债券的连续切片
+
+    返回:
+        dict: {债券代码: pd.DataFrame}
+    """
+    codes = df['标的债券代码'].to_numpy()
+    if len(codes) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    stops = np.r_[starts[1:], len(codes)]
+    return {codes[a]: df.iloc[a:b] for a, b in zip(starts, stops)}
+
+
+class BondPanel:
+    """
+    债券行情面板：数据只加载一次，清洗后的数据常驻内存，按条件返回筛选视图
+
+    参数:
+        df (pd.DataFrame): 经clean_frame清洗后的行情数据
+    """
+
+    def __init__(self, df):
+        if not _is_sorted(df):
+            df = df.sort_values(SORT_COLUMNS, kind='stable').reset_index(drop=True)
+        self.df = df
+        self._build_index()
+
+    def _build_index(self):
+        """
+        建立(债务主体, 标的债券代码, 日期)索引
+
+        数据按索引顺序排列后，每只债券的数据是一段连续的行（债券块），同一主体的债券块也相邻。
+        以 块序号*日期跨度+日期序数 作为单调递增的复合键，任意债券的日期窗口都可以通过
+        一次二分查找定位为连续切片。
+        """
+        df = self.df
+        issuer_codes = df['债务主体'].cat.codes.to_numpy()
+        bond_codes = df['标的债券代码'].cat.codes.to_numpy()
+        days = df['日期'].to_numpy().astype('datetime64[D]').astype(np.int64)
+
+        new_block = np.ones(len(df), dtype=bool)
+        new_block[1:] = (bond_codes[1:] != bond_codes[:-1]) | (issuer_codes[1:] != issuer_codes[:-1])
+        starts = np.flatnonzero(new_block)
+
+        self._day0 = int(days.min()) if len(days) else 0
+        self._day_span = int(days.max()) - self._day0 + 1 if len(days) else 1
+        block_ids = np.cumsum(new_block) - 1
+        self._keys = block_ids * self._day_span + (days - self._day0)
+
+        # 债券 -> 块序号列表；主体 -> [首块, 末块+1)
+        self._bond_blocks = {}
+        for block, code in enumerate(df['标的债券代码'].to_numpy()[starts]):
+            self._bond_blocks.setdefault(code, []).append(block)
+        self._issuer_blocks = {}
+        block_issuers = df['债务主体'].to_numpy()[starts]
+        for block, issuer in enumerate(block_issuers):
+            first, _ = self._issuer_blocks.get(issuer, (block, block))
+            self._issuer_blocks[issuer] = (first, block + 1)
+        self._n_blocks = len(starts)
+
+    def _day_ordinal(self, date, default, lower, upper):
+        """日期转为相对首日的序数，并截断到[lower, upper]，保证复合键不越过所在债券块"""
+        if date is None:
+            return default
+        day = pd.Timestamp(date).to_datetime64().astype('datetime64[D]').astype(np.int64)
+        return int(np.clip(day - self._day0, lower, upper))
+
+    def _positions(self, blocks, start_date, end_date):
+        """在给定债券块内按日期窗口二分查找，返回所有命中行的位置"""
+        blocks = np.asarray(blocks, dtype=np.int64)
+        if blocks.size == 0:
+            return np.empty(0, dtype=np.int64)
+        lo_day = self._day_ordinal(start_date, 0, 0, self._day_span)
+        hi_day = self._day_ordinal(end_date, self._day_span - 1, -1, self._day_span - 1)
+        base = blocks * self._day_span
+        lo = np.searchsorted(self._keys, base + lo_day, side='left')
+        hi = np.searchsorted(self._keys, base + hi_day, side='right')
+        lengths = np.maximum(hi - lo, 0)
+        # 将多个[lo, hi)区间展开为行位置
+        offsets = np.repeat(lo - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return offsets + np.arange(lengths.sum())
+
+    def bond(self, bond, start_date=None, end_date=None):
+        """返回单只债券在日期窗口内的连续切片"""
+        return self.df.iloc[self._positions(self._bond_blocks.get(bond, []), start_date, end_date)]
+
+    @classmethod
+    def from_csv(cls, data_path, **filters):
+        """分块读取CSV并构建面板，filters见iter_csv_chunks"""
+        return cls(read_csv_filtered(data_path, **filters))
+
+    @profiled('panel_select')
+    def select(self, start_date=None, end_date=None, issuer=None,
+               min_maturity=None, max_maturity=None, bonds=None):
+        """
+        按日期、债务主体、剩余期限和债券代码筛选数据，未指定的条件不参与过滤
+
+        返回:
+            pd.DataFrame: 筛选后的数据（按主体、债券、日期排序）
+        """
+        # 先按主体和债券确定候选债券块，再在块内二分查找日期窗口
+        if issuer is not None:
+            first, stop = self._issuer_blocks.get(issuer, (0, 0))
+            blocks = np.arange(first, stop)
+        else:
+            blocks = np.arange(self._n_blocks)
+        if bonds is not None:
+            wanted = [b for bond in pd.unique(np.asarray(bonds, dtype=object))
+                      for b in self._bond_blocks.get(bond, [])]
+            blocks = np.intersect1d(blocks, wanted)
+
+        df = self.df.iloc[self._positions(blocks, start_date, end_date)]
+
+        # 剩余期限随时间变化，只能在命中行上逐行过滤
+        if min_maturity is not None or max_maturity is not None:
+            maturity = df['剩余期限'].to_numpy()
+            mask = np.ones(len(df), dtype=bool)
+            if min_maturity is not None:
+                mask &= maturity >= min_maturity
+            if max_maturity is not None:
+                mask &= maturity <= max_maturity
+            df = df[mask]
+        return df
+
+
+def _file_digest(path):
+    """计算文件内容的SHA-256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+# 最近一次load_panel的数据文件，供交易日历等不随数据文件变化的缓存定位目录
+_last_data_path = None
+
+
+def cache_dir(data_path=None):
+    """
+    数据文件同级的缓存目录（绝对路径）
+
+    参数:
+        data_path (str): 数据文件路径，为None时取最近一次load_panel的数据文件，尚未加载数据时为当前目录
+    """
+    data_path = data_path or _last_data_path
+    base = os.path.dirname(os.path.abspath(data_path)) if data_path else os.getcwd()
+    return os.path.join(base, CACHE_DIR)
+
+
+def _cache_paths(data_path):
+    """返回(缓存数据文件不含扩展名, 元信息文件)路径"""
+    abs_path = os.path.abspath(data_path)
+    stem = os.path.splitext(os.path.basename(abs_path))[0]
+    tag = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()[:8]
+    base = os.path.join(cache_dir(abs_path), f'{stem}-{tag}')
+    return base, base + '.json'
+
+
+def write_frame(df, base):
+    """将数据写到base路径（不含扩展名）：优先写Parquet（需要pyarrow），否则退回pickle，返回所用格式"""
+    try:
+        df.to_parquet(base + '.parquet', index=False)
+        return 'parquet'
+    except ImportError:
+        df.to_pickle(base + '.pkl')
+        return 'pickle'
+
+
+def write_arrays(df, base):
+    """
+    将数据按列写为可内存映射的.npy文件（目录base + '.npy'）
+
+    category列拆为整数编码和取值表（字典编码），日期列保存为datetime64，其余列原样保存；
+    列的元信息写在columns.json中。先写临时目录再整体替换，读者不会看到写了一半的文件。
+    """
+    target = base + '.npy'
+    tmp_dir = f'{target}.tmp-{os.getpid()}'
+    os.makedirs(tmp_dir, exist_ok=True)
+    columns = []
+    for k, column in enumerate(df.columns):
+        series = df[column]
+        info = {'name': column, 'file': f'{k}.npy'}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            info['categories'] = series.cat.categories.tolist()
+            values = series.cat.codes.to_numpy()
+        else:
+            values = series.to_numpy()
+        np.save(os.path.join(tmp_dir, info['file']), np.ascontiguousarray(values), allow_pickle=False)
+        columns.append(info)
+    with open(os.path.join(tmp_dir, 'columns.json'), 'w', encoding='utf-8') as f:
+        json.dump({'rows': len(df), 'columns': columns}, f, ensure_ascii=False)
+
+    if os.path.exists(target):
+        old_dir = f'{target}.old-{os.getpid()}'
+        os.replace(target, old_dir)
+        os.replace(tmp_dir, target)
+        for name in os.listdir(old_dir):
+            os.remove(os.path.join(old_dir, name))
+        os.rmdir(old_dir)
+    else:
+        os.replace(tmp_dir, target)
+    return 'npy'
+
+
+@profiled('read_cache')
+def read_arrays(base, mmap=True):
+    """
+    读取write_arrays写出的数据
+
+    mmap为True时各列以只读方式内存映射，DataFrame直接引用映射的页面：多个进程或多次运行
+    读取同一缓存时共享操作系统的页缓存，而不是各自持有一份副本。
+    """
+    target = base + '.npy'
+    with open(os.path.join(target, 'columns.json'), 'r', encoding='utf-8') as f:
+        layout = json.load(f)
+    data = {}
+    for info in layout['columns']:
+        values = np.load(os.path.join(target, info['file']), mmap_mode='r' if mmap else None,
+                         allow_pickle=False)
+        if 'categories' in info:
+            values = pd.Categorical.from_codes(values, pd.Index(info['categories'], dtype=object),
+                                               validate=False)
+        data[info['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def read_frame(base, fmt):
+    """读取write_frame（或write_arrays）写出的数据"""
+    if fmt == 'npy':
+        return read_arrays(base)
+    if fmt == 'parquet':
+        return pd.read_parquet(base + '.parquet')
+    return pd.read_pickle(base + '.pkl')
+
+
+@profiled('load_data')
+def load_cached_frame(data_path):
+    """
+    读取清洗后的行情数据，优先使用磁盘上的列式缓存
+
+    源文件大小和修改时间未变时直接读缓存；时间变化但内容哈希相同时只刷新元信息；
+    否则重新解析CSV并重建缓存。缓存为按列的.npy文件（见write_arrays），读取时内存映射。
+
+    参数:
+        data_path (str): CSV文件路径
+
+    返回:
+        pd.DataFrame: 清洗后的数据
+    """
+    stat = os.stat(data_path)
+    base, meta_path = _cache_paths(data_path)
+
+    meta = None
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+
+    digest = None
+    if meta is not None:
+        unchanged = meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns
+        if meta.get('version') != CACHE_VERSION:
+            unchanged = False
+        elif not unchanged:
+            digest = _file_digest(data_path)
+            unchanged = meta['sha256'] == digest
+        if unchanged:
+            try:
+                df = read_frame(base, meta['format'])
+            except (OSError, ValueError, ImportError):
+                df = None
+            if df is not None:
+                if meta['mtime_ns'] != stat.st_mtime_ns:
+                    meta.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                    with open(meta_path, 'w', encoding='utf-8') as f:
+                        json.dump(meta, f)
+                return df
+
+    # 缓存缺失或已过期：重新解析CSV
+    df = read_csv_filtered(data_path)
+    try:
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        fmt = write_arrays(df, base)
+        # 清理旧版本留下的其它格式缓存
+        for ext in ('.parquet', '.pkl'):
+            if os.path.exists(base + ext):
+                os.remove(base + ext)
+        meta = {
+            'source': os.path.abspath(data_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': digest or _file_digest(data_path),
+            'format': fmt,
+            'version': CACHE_VERSION,
+        }
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    except OSError as e:
+        print(f"写入缓存失败，本次直接使用CSV数据: {e}")
+    return df
+
+
+# 进程内缓存：同一文件只加载一次
+_panels = {}
+
+
+def load_panel(data_path, use_cache=True):
+    """
+    获取数据文件对应的面板（进程内缓存，首次调用时加载数据）
+
+    参数:
+        data_path (str): CSV文件路径
+        use_cache (bool): 是否使用磁盘列式缓存
+
+    返回:
+        BondPanel
+    """
+    global _last_data_path
+    _last_data_path = os.path.abspath(data_path)
+    panel = _panels.get(data_path)
+    if panel is None:
+        if use_cache:
+            panel = BondPanel(load_cached_frame(data_path))
+        else:
+            panel = BondPanel.from_csv(data_path)
+        _panels[data_path] = panel
+    return panel
@@ -0,0 +1,136 @@
+import numpy as np
+
+from panel import load_panel
+from profiling import profiled
+
+# 四大发债主体
+ISSUERS = [
+    '中华人民共和国财政部',
+    '中国农业发展银行',
+    '国家开发银行',
+    '中国进出口银行',
+]
+
+# 期限档位：名称 -> (剩余期限下限, 剩余期限上限)
+TENORS = {
+    '10Y': (8.0, 10.0),
+    '30Y': (28.0, 30.0),
+}
+
+# 手动定位活跃券切换得到的时间段：(名称, 开始日期, 结束日期)
+PERIODS = [
+    ('2024S1', '2024-01-01', '2024-05-15'),
+    ('2024S2', '2024-05-16', '2024-07-25'),
+    ('2024S3', '2024-07-26', '2024-09-23'),
+    ('2024S4', '2024-09-24', '2025-01-16'),
+    ('2025S1', '2025-01-17', '2025-04-28'),
+    ('2025S2', '2025-04-29', '2025-08-06'),
+]
+
+
+@profiled(issuer='issuer')
+def detect_periods(data_path, issuer, min_maturity, max_maturity, start_date=None, end_date=None,
+                   window=10, hysteresis=15):
+    """
+    根据每日成交笔数排名自动定位活跃券切换日期，替代手工划分的时间段
+
+    每个交易日按成交笔数对债券排名，取window日滚动平均排名最靠前的债券为当日最活跃券；
+    最活跃券连续保持不少于hysteresis个交易日才视为一次切换，更短的变化归入前一段。
+
+    参数:
+        data_path (str): CSV文件路径
+        issuer (str): 债务主体名称
+        min_maturity (float): 剩余期限下限(年)
+        max_maturity (float): 剩余期限上限(年)
+        start_date (str): 开始日期，默认为数据首日
+        end_date (str): 结束日期，默认为数据末日
+        window (int): 滚动平均排名的窗口（交易日）
+        hysteresis (int): 切换生效所需的最少连续交易日
+
+    返回:
+        list: [(名称, 开始日期, 结束日期), ...]，格式同PERIODS，名称如'2024S1'
+    """
+    df = load_panel(data_path).select(start_date, end_date, issuer, min_maturity, max_maturity)
+    if df.empty:
+        return []
+
+    # 日期×债券 成交笔数矩阵，逐日排名后做滚动平均
+    trades = df.pivot_table(index='日期', columns='标的债券代码', values='每日每券的成交笔数',
+                            aggfunc='last', observed=True)
+    ranks = trades.rank(axis=1, ascending=False, method='min')
+    smooth = ranks.rolling(window, min_periods=1).mean().to_numpy()
+    smooth = np.where(np.isnan(smooth), np.inf, smooth)
+    leader = smooth.argmin(axis=1)
+    dates = trades.index
+
+    # 游程编码：每段最活跃券不变的连续交易日
+    leader, run_starts, run_lengths = _runs(leader)
+    stable = run_lengths >= hysteresis
+    if not stable.any():
+        stable[np.argmax(run_lengths)] = True
+
+    # 未持续的短段沿用之前（开头则沿用之后）的稳定最活跃券，再合并相邻同券段
+    run_ids = np.where(stable, np.arange(len(run_starts)), -1)
+    filled = np.maximum.accumulate(run_ids)
+    first_stable = np.flatnonzero(stable)[0]
+    filled[filled < 0] = first_stable
+    daily = np.repeat(leader[filled], run_lengths)
+    _, starts, lengths = _runs(daily)
+
+    periods = []
+    counts = {}
+    for start, length in zip(starts, lengths):
+        year = dates[start].year
+        counts[year] = counts.get(year, 0) + 1
+        periods.append((f'{year}S{counts[year]}',
+                        dates[start].strftime('%Y-%m-%d'),
+                        dates[start + length - 1].strftime('%Y-%m-%d')))
+    return periods
+
+
+def _runs(values):
+    """游程编码，返回(每段取值, 每段起点, 每段长度)"""
+    values = np.asarray(values)
+    change = np.ones(len(values), dtype=bool)
+    change[1:] = values[1:] != values[:-1]
+    starts = np.flatnonzero(change)
+    lengths = np.diff(np.append(starts, len(values)))
+    return values[starts], starts, lengths
+
+
+def detect_all_periods(data_path, issuers=None, tenors=None, **kwargs):
+    """
+    对多个主体和期限档位批量定位活跃券切换
+
+    返回:
+        dict: {(主体, 期限名称): 时间段列表}
+    """
+    issuers = ISSUERS if issuers is None else issuers
+    tenors = TENORS if tenors is None else tenors
+    return {
+        (issuer, tenor): detect_periods(data_path, issuer, min_maturity, max_maturity, **kwargs)
+        for issuer in issuers
+        for tenor, (min_maturity, max_maturity) in tenors.items()
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='自动定位各主体、各期限的活跃券切换时间段')
+    parser.add_argument('data_file', nargs='?', default='利差分析四大行2年_final.csv')
+    parser.add_argument('--window', type=int, default=10, help='滚动平均排名窗口（交易日）')
+    parser.add_argument('--hysteresis', type=int, default=15, help='切换生效所需的最少连续交易日')
+    parser.add_argument('--output', help='保存为JSON文件')
+    args = parser.parse_args()
+
+    detected = detect_all_periods(args.data_file, window=args.window, hysteresis=args.hysteresis)
+    for (issuer, tenor), periods in detected.items():
+        print(f"{issuer}-{tenor}:")
+        for period in periods:
+            print(f"    {period}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump([{'issuer': issuer, 'tenor': tenor, 'periods': periods}
+                       for (issuer, tenor), periods in detected.items()], f, ensure_ascii=False, indent=2)
@@ -0,0 +1,24 @@
+# 快速预览模式：低分辨率、线条栅格化、不做tight bbox的二次排版，图形模板在进程内复用
+PREVIEW_DPI = 72
+
+# 出版模式的保存参数（与原脚本一致）
+PUBLISH_DPI = 300
+
+
+def savefig_kwargs(preview=False):
+    """返回savefig的参数：预览模式下降低分辨率并跳过bbox_inches='tight'的二次排版"""
+    if preview:
+        return {'dpi': PREVIEW_DPI}
+    return {'dpi': PUBLISH_DPI, 'bbox_inches': 'tight'}
+
+
+# 进程内的图形模板：{模板类: 实例}
+_templates = {}
+
+
+def get_template(cls):
+    """取（必要时创建）进程内唯一的模板实例，画布和坐标轴只建一次"""
+    template = _templates.get(cls)
+    if template is None:
+        template = _templates[cls] = cls()
+    return template
@@ -0,0 +1,271 @@
+import atexit
+import contextlib
+import functools
+import inspect
+import json
+import os
+import time
+import tracemalloc
+
+# 环境变量：设为trace文件路径即开启剖析，脚本退出时写出trace并打印汇总；
+# SPREAD_PROFILE_OPTIONS可含 memory（tracemalloc峰值内存）、cprofile（另存.prof文件）
+PROFILE_ENV = 'SPREAD_PROFILE'
+OPTIONS_ENV = 'SPREAD_PROFILE_OPTIONS'
+
+# 汇总表默认的分组字段
+SUMMARY_KEYS = ('name', 'issuer', 'period', 'file')
+
+# 关闭时span直接返回的空上下文（可重复使用）
+_NULL = contextlib.nullcontext()
+
+_enabled = False
+_trace_memory = False
+_profiler = None
+_origin = 0.0
+_records = []
+_stack = []
+
+
+def enabled():
+    """是否正在记录"""
+    return _enabled
+
+
+def enable(trace_memory=False, cprofile=False):
+    """
+    开始记录（清空之前的记录）
+
+    参数:
+        trace_memory (bool): 用tracemalloc统计每个区段的峰值内存（会明显拖慢运行）
+        cprofile (bool): 同时用cProfile记录函数级耗时
+    """
+    global _enabled, _trace_memory, _profiler, _origin
+    reset()
+    _enabled = True
+    _trace_memory = trace_memory
+    _origin = time.perf_counter()
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if cprofile:
+        import cProfile
+
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def options():
+    """当前的记录选项，未开启时为None（传给工作进程，使其按同样方式记录）"""
+    if not _enabled:
+        return None
+    return {'trace_memory': _trace_memory}
+
+
+def disable():
+    """停止记录，已有记录保留"""
+    global _enabled
+    _enabled = False
+    if _profiler is not None:
+        _profiler.disable()
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def reset():
+    """清空记录"""
+    global _profiler
+    _records.clear()
+    _stack.clear()
+    _profiler = None
+
+
+def records():
+    """已记录的区段列表"""
+    return list(_records)
+
+
+def extend(items):
+    """并入其它进程记录的区段（如绘图工作进程）"""
+    if _enabled:
+        _records.extend(items)
+
+
+class _Span:
+    """一个计时区段；嵌套时标签沿父区段继承"""
+
+    __slots__ = ('name', 'tags', 'start', 'child_seconds', 'child_peak', 'base_memory')
+
+    def __init__(self, name, tags):
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        parent = _stack[-1] if _stack else None
+        if parent is not None:
+            self.tags = {**parent.tags, **self.tags}
+        self.child_seconds = 0.0
+        if _trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # 把进入前的峰值交给父区段，再从当前占用重新统计
+            if parent is not None:
+                parent.child_peak = max(parent.child_peak, peak)
+            tracemalloc.reset_peak()
+            self.child_peak = current
+            self.base_memory = current
+        _stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        _stack.pop()
+        parent = _stack[-1] if _stack else None
+        record = {
+            'name': self.name,
+            **self.tags,
+            'start': self.start - _origin,
+            'seconds': seconds,
+            'self_seconds': seconds - self.child_seconds,
+            'depth': len(_stack),
+            'pid': os.getpid(),
+        }
+        if _trace_memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            record['peak_mb'] = (peak - self.base_memory) / 2 ** 20
+            if parent is not None:
+                parent.child_peak = max(parent.child_peak, peak)
+            tracemalloc.reset_peak()
+        if parent is not None:
+            parent.child_seconds += seconds
+        _records.append(record)
+        return False
+
+
+def span(name, **tags):
+    """
+    计时区段（上下文管理器），未开启剖析时为空操作
+
+    用法:
+        with span('select_bond', issuer=issuer, period=season):
+            ...
+
+    参数:
+        name (str): 阶段名
+        tags: 附加标签（如issuer、period），写入trace并可用于汇总分组
+    """
+    if not _enabled:
+        return _NULL
+    return _Span(name, tags)
+
+
+def profiled(name=None, **tags):
+    """
+    计时装饰器，未开启剖析时直接调用原函数
+
+    参数:
+        name (str): 阶段名，默认为函数名
+        tags: 标签名 -> 被装饰函数的参数名，如 profiled(issuer='issuer', period='season')
+    """
+    def decorator(fn):
+        label = name or fn.__name__
+        signature = inspect.signature(fn) if tags else None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            values = {}
+            if signature is not None:
+                bound = signature.bind_partial(*args, **kwargs).arguments
+                values = {tag: bound[param] for tag, param in tags.items() if bound.get(param) is not None}
+            with _Span(label, values):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def summary(keys=SUMMARY_KEYS):
+    """
+    按keys分组汇总已记录的区段
+
+    返回:
+        pd.DataFrame: 次数、总耗时、自身耗时（不含子区段）、平均耗时，以及峰值内存（开启时）
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(_records)
+    if df.empty:
+        return df
+    keys = [key for key in keys if key in df.columns]
+    df[keys] = df[keys].fillna('')
+    agg = {'次数': ('seconds', 'size'), '总耗时(s)': ('seconds', 'sum'), '自身耗时(s)': ('self_seconds', 'sum')}
+    if 'peak_mb' in df.columns:
+        agg['峰值内存(MB)'] = ('peak_mb', 'max')
+    table = df.groupby(keys, sort=False).agg(**agg).reset_index()
+    table.insert(len(keys) + 2, '平均耗时(s)', table['总耗时(s)'] / table['次数'])
+    return table.sort_values('自身耗时(s)', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def write_trace(path):
+    """
+    写出本次运行的JSON trace；开启了cProfile时另存同名.prof文件（可用pstats或snakeviz查看）
+
+    返回:
+        str: trace文件路径
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    trace = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'pid': os.getpid(),
+        'trace_memory': _trace_memory,
+        'spans': _records,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(trace, f, ensure_ascii=False, indent=1, default=str)
+    if _profiler is not None:
+        _profiler.dump_stats(os.path.splitext(path)[0] + '.prof')
+    return path
+
+
+def report(path=None, keys=SUMMARY_KEYS, top=20):
+    """
+    停止记录，写出trace（给出path时）并打印汇总表：先按阶段汇总，再按keys列出自身耗时最多的top项
+
+    返回:
+        pd.DataFrame: 按keys分组的汇总表
+    """
+    disable()
+    if path:
+        print(f"剖析trace已保存至: {write_trace(path)}")
+    table = summary(keys)
+    if table.empty:
+        print("没有记录到任何区段")
+        return table
+    import pandas as pd
+
+    with pd.option_context('display.width', 200, 'display.float_format', '{:.3f}'.format):
+        print("\n各阶段汇总:")
+        print(summary(('name',)).to_string(index=False))
+        print(f"\n自身耗时最多的{min(top, len(table))}项:")
+        print(table.head(top).to_string(index=False))
+    return table
+
+
+def _from_env():
+    """按环境变量开启剖析，并在进程退出时输出（只在主进程中，工作进程的记录由调用方并入）"""
+    path = os.environ.get(PROFILE_ENV)
+    if not path:
+        return
+    import multiprocessing
+
+    if multiprocessing.parent_process() is not None:
+        return
+    options = {item.strip() for item in os.environ.get(OPTIONS_ENV, '').split(',')}
+    enable(trace_memory='memory' in options, cprofile='cprofile' in options)
+    atexit.register(report, path)
+
+
+_from_env()
@@ -0,0 +1,217 @@
+import math
+import warnings
+
+import numpy as np
+
+from profiling import profiled
+
+# 箱型图使用的分位点：须线10%/90%，箱体25%/75%，中线50%
+QUANTILES = (10, 25, 50, 75, 90)
+
+
+def stack_series(blocks):
+    """
+    将多个 日期×组合 的二维数组补NaN后堆叠为 时间段×日期×组合 的三维数组
+
+    参数:
+        blocks (list): 二维数组列表，各数组的行数、列数可以不同
+
+    返回:
+        np.ndarray: 三维数组，缺失处为NaN
+    """
+    n_dates = max((block.shape[0] for block in blocks), default=0)
+    n_pairs = max((block.shape[1] for block in blocks), default=0)
+    values = np.full((len(blocks), n_dates, n_pairs), np.nan)
+    for k, block in enumerate(blocks):
+        values[k, :block.shape[0], :block.shape[1]] = block
+    return values
+
+
+@profiled()
+def spread_quantiles(values, quantiles=QUANTILES):
+    """
+    一次算出全部时间段、全部利差组合的分位数、均值、极值和箱型图须线
+
+    参数:
+        values (np.ndarray): 时间段×日期×组合 的利差(bps)，缺失为NaN
+        quantiles (tuple): 分位点（百分数），须包含10和90
+
+    返回:
+        dict: 各项形状为 (时间段, 组合)；'quantiles'为 (时间段, 分位点, 组合)。
+              whislo/whishi与matplotlib箱型图一致，为落在10%/90%分位以内的最远样本；
+              没有样本（如stack_series([])的结果）时统计量为NaN，count为0
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        n_periods, n_pairs = values.shape[0], values.shape[2]
+        empty = np.full((n_periods, n_pairs), np.nan)
+        return {
+            'quantiles': np.full((n_periods, len(quantiles), n_pairs), np.nan),
+            'mean': empty, 'min': empty.copy(), 'max': empty.copy(),
+            'count': np.zeros((n_periods, n_pairs), dtype=np.int64),
+            'whislo': empty.copy(), 'whishi': empty.copy(),
+        }
+    with warnings.catch_warnings():
+        # 补齐用的全NaN列不产生结果，忽略其警告
+        warnings.simplefilter('ignore', RuntimeWarning)
+        q = np.nanpercentile(values, quantiles, axis=1).transpose(1, 0, 2)
+        lo = q[:, quantiles.index(10)][:, None, :]
+        hi = q[:, quantiles.index(90)][:, None, :]
+        result = {
+            'quantiles': q,
+            'mean': np.nanmean(values, axis=1),
+            'min': np.nanmin(values, axis=1),
+            'max': np.nanmax(values, axis=1),
+            'count': np.sum(~np.isnan(values), axis=1),
+            'whislo': np.nanmin(np.where(values >= lo, values, np.nan), axis=1),
+            'whishi': np.nanmax(np.where(values <= hi, values, np.nan), axis=1),
+        }
+    return result
+
+
+def bxp_stats(stats, period, labels, quantiles=QUANTILES):
+    """
+    取一个时间段的统计量，整理为matplotlib Axes.bxp所需的列表
+
+    参数:
+        stats (dict): spread_quantiles的结果
+        period (int): 时间段下标
+        labels (list): 该时间段各组合的标签（按列顺序）
+
+    返回:
+        list: [{'label', 'mean', 'med', 'q1', 'q3', 'whislo', 'whishi', 'fliers'}, ...]
+    """
+    q = stats['quantiles'][period]
+    q1, med, q3 = (q[quantiles.index(p)] for p in (25, 50, 75))
+    boxes = []
+    for k, label in enumerate(labels):
+        boxes.append({
+            'label': label,
+            'mean': float(stats['mean'][period, k]),
+            'med': float(med[k]),
+            'q1': float(q1[k]),
+            'q3': float(q3[k]),
+            # 与matplotlib一致：须线不跨过箱体
+            'whislo': float(min(stats['whislo'][period, k], q1[k])),
+            'whishi': float(max(stats['whishi'][period, k], q3[k])),
+            'fliers': [],
+        })
+    return boxes
+
+
+class QuantileSketch:
+    """
+    可合并的近似分位数草图（KLL）
+
+    样本先进入第0层，某层满后排序并隔一取一提升到上一层（权重翻倍），内存随样本数对数增长；
+    样本数未超过第0层容量时结果与np.percentile完全一致。均值、计数和极值精确维护。
+    草图可序列化、相互合并，增量追加时无需保留历史样本。
+
+    参数:
+        k (int): 最高层容量，越大越精确（相对秩误差约为 2.5/k^0.94，k=200时约1.7%）
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.compactors = [[]]
+        self.n = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._toggle = 0
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            items = self.compactors[level]
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                items.sort()
+                # 奇数个时保留最后一个样本，其余隔一取一提升；起点交替以消除偏差
+                keep = items[-1:] if len(items) % 2 else []
+                paired = items[:len(items) - len(keep)]
+                self.compactors[level + 1].extend(paired[self._toggle::2])
+                self._toggle ^= 1
+                self.compactors[level] = keep
+            level += 1
+
+    def update(self, values):
+        """追加一批样本，NaN/inf被跳过"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return self
+        self.n += int(values.size)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        # 分批进入第0层，每批不超过其容量
+        items = values.tolist()
+        step = self._capacity(0)
+        for start in range(0, len(items), step):
+            self.compactors[0].extend(items[start:start + step])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """合并另一个草图"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.n if self.n else np.nan
+
+    def quantiles(self, quantiles=QUANTILES):
+        """
+        估计分位数
+
+        参数:
+            quantiles (tuple): 分位点（百分数）
+
+        返回:
+            np.ndarray: 分位数，无样本时为NaN
+        """
+        if self.n == 0:
+            return np.full(len(quantiles), np.nan)
+        if len(self.compactors) == 1:
+            return np.percentile(self.compactors[0], quantiles)
+        values = np.concatenate([np.asarray(items, dtype=np.float64) for items in self.compactors])
+        weights = np.concatenate([np.full(len(items), 2.0 ** level)
+                                  for level, items in enumerate(self.compactors)])
+        order = np.argsort(values, kind='stable')
+        values, weights = values[order], weights[order]
+        # 加权秩取中点后线性插值，端点为精确的最小/最大值
+        ranks = (np.cumsum(weights) - weights / 2) / weights.sum()
+        xp = np.concatenate([[0.0], ranks, [1.0]])
+        fp = np.concatenate([[self.min], values, [self.max]])
+        return np.interp(np.asarray(quantiles, dtype=np.float64) / 100, xp, fp)
+
+    def to_dict(self):
+        return {'k': self.k, 'compactors': self.compactors, 'n': self.n, 'total': self.total,
+                'min': self.min if self.n else None, 'max': self.max if self.n else None,
+                'toggle': self._toggle}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'])
+        sketch.compactors = [list(items) for items in data['compactors']]
+        sketch.n = data['n']
+        sketch.total = data['total']
+        sketch.min = math.inf if data['min'] is None else data['min']
+        sketch.max = -math.inf if data['max'] is None else data['max']
+        sketch._toggle = data['toggle']
+        return sketch
@@ -0,0 +1,210 @@
+import numpy as np
+
+from profiling import profiled
+
+
+class SufficientStats:
+    """
+    一元线性回归 y = a + b·x 的充分统计量（n, Σx, Σy, Σx², Σy², Σxy）
+
+    统计量可逐批累加、相互合并，新增数据时无需保留历史样本即可得到回归结果。
+    """
+
+    FIELDS = ('n', 'sx', 'sy', 'sxx', 'syy', 'sxy')
+
+    def __init__(self, n=0, sx=0.0, sy=0.0, sxx=0.0, syy=0.0, sxy=0.0):
+        self.n = n
+        self.sx = sx
+        self.sy = sy
+        self.sxx = sxx
+        self.syy = syy
+        self.sxy = sxy
+
+    def update(self, x, y):
+        """累加一批样本，x、y中任一为NaN/inf的样本被跳过"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        valid = np.isfinite(x) & np.isfinite(y)
+        x, y = x[valid], y[valid]
+        self.n += int(x.size)
+        self.sx += float(x.sum())
+        self.sy += float(y.sum())
+        self.sxx += float((x * x).sum())
+        self.syy += float((y * y).sum())
+        self.sxy += float((x * y).sum())
+        return self
+
+    def merge(self, other):
+        """合并另一组统计量"""
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        return self
+
+    def result(self):
+        """
+        计算回归结果
+
+        返回:
+            dict: n, slope, intercept, rsquared, r；样本不足或x无变化时数值为NaN
+        """
+        n = self.n
+        cov = self.sxy - self.sx * self.sy / n if n else np.nan
+        var_x = self.sxx - self.sx ** 2 / n if n else np.nan
+        var_y = self.syy - self.sy ** 2 / n if n else np.nan
+        if n < 2 or not var_x > 0:
+            return {'n': n, 'slope': np.nan, 'intercept': np.nan, 'rsquared': np.nan, 'r': np.nan}
+        slope = cov / var_x
+        intercept = (self.sy - slope * self.sx) / n
+        r = cov / np.sqrt(var_x * var_y) if var_y > 0 else np.nan
+        return {'n': n, 'slope': slope, 'intercept': intercept, 'rsquared': r * r, 'r': r}
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.FIELDS})
+
+
+def _window_sums(x, y, window):
+    """
+    按窗口计算 n, Σx, Σy, Σx², Σy², Σxy（每列为一个组合，NaN样本不计入）
+
+    window为None时为扩张窗口。x、y先减去各列均值再累加，避免长序列上方差相减的精度损失。
+    """
+    valid = np.isfinite(x) & np.isfinite(y)
+    with np.errstate(invalid='ignore'):
+        mx = np.nanmean(np.where(valid, x, np.nan), axis=0)
+        my = np.nanmean(np.where(valid, y, np.nan), axis=0)
+    mx = np.nan_to_num(mx)
+    my = np.nan_to_num(my)
+    xc = np.where(valid, x - mx, 0.0)
+    yc = np.where(valid, y - my, 0.0)
+
+    terms = np.stack([valid.astype(np.float64), xc, yc, xc * xc, yc * yc, xc * yc])
+    sums = np.cumsum(terms, axis=1)
+    if window is not None:
+        # 窗口和 = 当前累计和 - window个样本之前的累计和
+        sums[:, window:] -= sums[:, :-window].copy()
+    return sums, mx, my
+
+
+def _results_from_sums(sums, mx, my, min_periods):
+    """由中心化后的窗口和计算回归结果，并还原截距"""
+    n, sx, sy, sxx, syy, sxy = sums
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        slope = cov / var_x
+        intercept = (sy - slope * sx) / n + my - slope * mx
+        r = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+
+    # 浮点误差下的零方差按无效处理
+    scale = np.maximum(np.abs(sxx), 1.0) * 1e-12
+    bad = (n < min_periods) | (var_x <= scale)
+    slope = np.where(bad, np.nan, slope)
+    intercept = np.where(bad, np.nan, intercept)
+    r = np.where(bad | (var_y <= np.maximum(np.abs(syy), 1.0) * 1e-12), np.nan, r)
+    return {'n': n.astype(np.int64), 'slope': slope, 'intercept': intercept, 'rsquared': r * r, 'r': r,
+            'pvalue': regression_pvalues(r, n)}
+
+
+def regression_pvalues(r, n):
+    """
+    一元回归斜率（等价于Pearson r）的双侧p值，t = r·√((n-2)/(1-r²))，自由度n-2
+
+    参数:
+        r (np.ndarray): 相关系数
+        n (np.ndarray): 样本数
+
+    返回:
+        np.ndarray: p值，n<3或r为NaN时为NaN
+    """
+    from scipy.special import stdtr
+
+    r = np.asarray(r, dtype=np.float64)
+    df = np.asarray(n, dtype=np.float64) - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt(df / (1.0 - r * r))
+        p = 2 * stdtr(df, -np.abs(t))
+    return np.where(df > 0, p, np.nan)
+
+
+@profiled()
+def rolling_regression(x, y, window, min_periods=None):
+    """
+    滚动窗口回归 y = a + b·x，所有窗口、所有组合一次算出
+
+    参数:
+        x (np.ndarray): 自变量，形状 (T,) 或 (T, 组合数)
+        y (np.ndarray): 因变量，形状同x
+        window (int): 窗口长度（样本行数，窗口内的NaN样本不计入）
+        min_periods (int): 窗口内至少需要的有效样本数，默认为3
+
+    返回:
+        dict: n, slope, intercept, rsquared, r, pvalue，形状同x；第t行对应以t结尾的窗口
+    """
+    if window < 2:
+        raise ValueError(f"窗口长度至少为2，当前为{window}")
+    x, y, squeeze = _as_columns(x, y)
+    sums, mx, my = _window_sums(x, y, window)
+    result = _results_from_sums(sums, mx, my, 3 if min_periods is None else min_periods)
+    return _squeeze(result, squeeze)
+
+
+@profiled()
+def expanding_regression(x, y, min_periods=3):
+    """
+    扩张窗口回归：第t行使用从起点到t的全部样本，参数和返回值同rolling_regression
+    """
+    x, y, squeeze = _as_columns(x, y)
+    sums, mx, my = _window_sums(x, y, None)
+    return _squeeze(_results_from_sums(sums, mx, my, min_periods), squeeze)
+
+
+@profiled()
+def grouped_regression(x, y, groups, n_groups, min_periods=3):
+    """
+    分组回归：样本按组号拼接成一维数组，一次算出每组的回归结果
+
+    参数:
+        x (np.ndarray): 自变量，一维
+        y (np.ndarray): 因变量，一维
+        groups (np.ndarray): 每个样本的组号（0 ~ n_groups-1）
+        n_groups (int): 组数
+        min_periods (int): 每组至少需要的有效样本数
+
+    返回:
+        dict: n, slope, intercept, rsquared, r, pvalue，每项为长度n_groups的数组
+    """
+    x, y, _ = _as_columns(x, y)
+    x, y = x[:, 0], y[:, 0]
+    groups = np.asarray(groups, dtype=np.int64)
+    valid = np.isfinite(x) & np.isfinite(y)
+    x, y, groups = x[valid], y[valid], groups[valid]
+
+    n = np.bincount(groups, minlength=n_groups).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mx = np.nan_to_num(np.bincount(groups, x, n_groups) / n)
+        my = np.nan_to_num(np.bincount(groups, y, n_groups) / n)
+    # 先减去组内均值再求和，避免方差相减的精度损失
+    xc = x - mx[groups]
+    yc = y - my[groups]
+    sums = np.stack([n] + [np.bincount(groups, w, n_groups) for w in (xc, yc, xc * xc, yc * yc, xc * yc)])
+    return _results_from_sums(sums, mx, my, min_periods)
+
+
+def _as_columns(x, y):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.shape != y.shape:
+        raise ValueError(f"x与y形状不一致: {x.shape} vs {y.shape}")
+    squeeze = x.ndim == 1
+    if squeeze:
+        x, y = x[:, None], y[:, None]
+    return x, y, squeeze
+
+
+def _squeeze(result, squeeze):
+    return {key: value[:, 0] for key, value in result.items()} if squeeze else result
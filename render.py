@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import profiling
+
+# 一个绘图任务：图表类型、预先计算好的绘图数据（只含数组和标签）、保存路径
+RenderTask = namedtuple('RenderTask', ['kind', 'payload', 'save_path'])
+
+
+def duplicate_paths(tasks):
+    """
+    找出保存路径重复的任务（并行绘制时后完成的会覆盖先完成的，结果取决于时序）
+
+    返回:
+        list: 重复出现的保存路径，按首次出现的顺序
+    """
+    seen, duplicates = set(), []
+    for task in tasks:
+        path = os.path.normcase(os.path.abspath(task.save_path))
+        if path in seen and task.save_path not in duplicates:
+            duplicates.append(task.save_path)
+        seen.add(path)
+    return duplicates
+
+
+def _drawer(kind):
+    """按图表类型取绘图函数（在工作进程内按需导入）"""
+    if kind == 'demo':
+        from spread_demo import draw_spread_demo
+        return draw_spread_demo
+    if kind == 'corr':
+        from spread_corr import draw_relationship
+        return draw_relationship
+    if kind == 'html':
+        from html_output import draw_spread_demo_html
+        return draw_spread_demo_html
+    if kind == 'boxplots':
+        from spread_boxplots import draw_spread_boxplots
+        return draw_spread_boxplots
+    raise ValueError(f"未知的图表类型: {kind}")
+
+
+def _init_worker():
+    """工作进程初始化：固定使用Agg后端"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def render_task(task, preview=False):
+    """绘制单个任务，返回保存路径"""
+    with profiling.span('render', kind=task.kind, file=os.path.basename(task.save_path)):
+        _drawer(task.kind)(task.payload, task.save_path, preview=preview)
+    return task.save_path
+
+
+def _render_in_worker(task, preview, profile_options):
+    """工作进程内绘制单个任务；主进程开启剖析时返回该任务的剖析记录"""
+    if profile_options is None:
+        render_task(task, preview)
+        return None
+    profiling.enable(**profile_options)
+    try:
+        render_task(task, preview)
+        return profiling.records()
+    finally:
+        profiling.disable()
+
+
+def render_tasks(tasks, workers=None, preview=False):
+    """
+    用进程池并行绘制图表，每个任务一张图
+
+    参数:
+        tasks (list): RenderTask列表，保存路径由调用方确定
+        workers (int): 工作进程数，默认为CPU核数；为1时在当前进程内顺序绘制
+        preview (bool): 快速预览模式（低分辨率，复用图形模板）
+
+    返回:
+        list: 失败任务的 (保存路径, 异常) 列表
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(tasks)))
+
+    failures = []
+    if workers == 1:
+        for task in tasks:
+            try:
+                render_task(task, preview)
+            except Exception as e:
+                print(f"绘图失败 {task.save_path}: {e}")
+                failures.append((task.save_path, e))
+        return failures
+
+    # spawn启动的工作进程不继承父进程的绘图状态
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker) as pool:
+        profile_options = profiling.options()
+        futures = {pool.submit(_render_in_worker, task, preview, profile_options): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                profiling.extend(future.result() or [])
+            except Exception as e:
+                print(f"绘图失败 {task.save_path}: {e}")
+                failures.append((task.save_path, e))
+    return failures
@@ -0,0 +1,427 @@
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import func
+from curve import CURVE_TENORS
+from panel import load_panel
+from periods import PERIODS, TENORS
+from profiling import profiled
+from quantiles import QUANTILES, spread_quantiles
+from regression import grouped_regression
+from spreads import SpreadMatrix, default_pairs, pair_label
+from trading_calendar import is_trading_day, trading_days
+
+# 默认监听地址（只监听本机）
+HOST = '127.0.0.1'
+PORT = 8765
+
+# 常驻内存的窗口结果数（每个 主体×期限档位×时间窗口 一项）
+CACHE_SIZE = 256
+
+# 请求头的最大长度，超过即断开
+MAX_HEADER_BYTES = 16 * 1024
+
+
+class LRUCache:
+    """
+    最近最少使用缓存：超过maxsize时淘汰最久未访问的一项
+
+    参数:
+        maxsize (int): 最多保留的项数
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key):
+        """取缓存项并标记为最近使用，不存在时抛出KeyError"""
+        try:
+            value = self.items[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        self.items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+
+def _floats(values):
+    """数组转为JSON列表，NaN/inf写为null"""
+    return [float(v) if math.isfinite(v) else None for v in np.asarray(values, dtype=np.float64).ravel()]
+
+
+@profiled('service_window', issuer='issuer')
+def compute_window(data_file, issuer, min_maturity, max_maturity, start_date, end_date, top_n=5):
+    """
+    计算一个 主体×期限档位×时间窗口 的全部派生结果，结果常驻缓存供各查询共用
+
+    活跃券排名由func.select_bonds_by_period给出；利差、分位数和1-2、1-3回归与批量运行
+    （batch.regression_table、spread_boxplots）的口径一致，只保留交易日数据。
+
+    返回:
+        dict: bonds（按活跃度排序）, trades（窗口内平均成交笔数）, dates, pairs（排名对）, spreads（日期×组合，bps）,
+              stats（spread_quantiles的结果）, regression（grouped_regression的结果，1-2、1-3）；
+              窗口内无数据时返回None
+    """
+    window = [('window', start_date, end_date)]
+    bond_list = func.select_bonds_by_period(data_file, window, issuer, min_maturity, max_maturity,
+                                            top_n).get('window')
+    if not bond_list:
+        return None
+
+    df = load_panel(data_file).select(start_date, end_date, bonds=bond_list)
+    df = df[is_trading_day(df['日期'], trading_days(start_date, end_date))]
+    if df.empty:
+        return None
+    matrix = SpreadMatrix.from_frame(df, bond_list)
+    trades = df.pivot(index='日期', columns='标的债券代码', values='每日每券的成交笔数')
+    trades = trades.reindex(index=matrix.dates, columns=bond_list).to_numpy(dtype=np.float64)
+
+    pairs = default_pairs(len(bond_list))
+    spreads = np.stack([matrix.tensor[:, i, j] for i, j in pairs], axis=1) if pairs else \
+        np.empty((len(matrix.dates), 0))
+    stats = spread_quantiles(spreads[None], QUANTILES)
+
+    # 1-2、1-3：成交笔数比对利差的回归
+    xs, ys, groups = [], [], []
+    for k, j in enumerate(range(1, min(3, len(bond_list)))):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xs.append(trades[:, 0] / trades[:, j])
+        ys.append(spreads[:, k])
+        groups.append(np.full(len(spreads), k))
+    regression = {}
+    if xs:
+        regression = grouped_regression(np.concatenate(xs), np.concatenate(ys), np.concatenate(groups), len(xs))
+
+    with np.errstate(invalid='ignore'):
+        mean_trades = np.nanmean(trades, axis=0)
+    return {
+        'bonds': bond_list,
+        'trades': mean_trades,
+        'dates': matrix.dates,
+        'pairs': pairs,
+        'spreads': spreads,
+        'stats': stats,
+        'regression': regression,
+    }
+
+
+class SpreadService:
+    """
+    利差查询服务：面板和各窗口的派生结果常驻内存，按 (主体, 期限档位, 时间窗口) 做LRU缓存
+
+    计算放在单个工作线程中串行执行（面板的索引在首次使用时构建，不支持并发），事件循环只负责
+    收发请求，缓存命中时无需等待其它计算；相同查询并发到达时只计算一次，其余请求等待同一结果。
+
+    参数:
+        data_file (str): 数据文件路径
+        cache_size (int): 常驻的窗口结果数
+        top_n (int): 每个窗口参与统计的债券数
+    """
+
+    def __init__(self, data_file, cache_size=CACHE_SIZE, top_n=5):
+        self.data_file = data_file
+        self.top_n = top_n
+        self.cache = LRUCache(cache_size)
+        self.pending = {}
+        self.coalesced = 0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spread-service')
+
+    async def warm(self):
+        """预先加载面板（首次启动时同时建立磁盘缓存）"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, load_panel, self.data_file)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, key, future):
+        """计算完成：结果写入缓存（无数据的窗口同样缓存），出错时不缓存，下次请求重新计算"""
+        self.pending.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+
+    async def window(self, key):
+        """
+        取窗口结果：先查缓存，再并入同一查询正在进行的计算，都没有时提交新的计算
+
+        参数:
+            key (tuple): (主体, 剩余期限下限, 剩余期限上限, 开始日期, 结束日期)
+        """
+        try:
+            return self.cache.get(key)
+        except KeyError:
+            pass
+        future = self.pending.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, compute_window, self.data_file, *key, self.top_n)
+            future.add_done_callback(lambda done: self._finish(key, done))
+            self.pending[key] = future
+        # 单个请求断开不影响其它等待同一结果的请求
+        return await asyncio.shield(future)
+
+    def health(self, query):
+        return {
+            'status': 'ok',
+            'data_file': self.data_file,
+            'cache': {
+                'size': len(self.cache), 'maxsize': self.cache.maxsize,
+                'hits': self.cache.hits, 'misses': self.cache.misses,
+                'coalesced': self.coalesced, 'pending': len(self.pending),
+            },
+        }
+
+    async def rankings(self, query):
+        key, result = await self._lookup(query)
+        return {
+            **self._describe(key),
+            'bonds': [{'rank': k + 1, 'bond': bond, 'trades': trades}
+                      for k, (bond, trades) in enumerate(zip(result['bonds'], _floats(result['trades'])))],
+        }
+
+    async def spreads(self, query):
+        """各利差组合的分位数统计；series=1时附带逐日利差"""
+        key, result = await self._lookup(query)
+        stats = result['stats']
+        pairs = []
+        for k, (i, j) in enumerate(result['pairs']):
+            item = {
+                'pair': pair_label(i, j), 'bond_a': result['bonds'][i], 'bond_b': result['bonds'][j],
+                'mean': _floats(stats['mean'][0, k])[0],
+                'min': _floats(stats['min'][0, k])[0],
+                'max': _floats(stats['max'][0, k])[0],
+                'count': int(stats['count'][0, k]),
+            }
+            for n, q in enumerate(QUANTILES):
+                item['median' if q == 50 else f'q{q}'] = _floats(stats['quantiles'][0, n, k])[0]
+            if query.get('series') in ('1', 'true'):
+                item['series'] = _floats(result['spreads'][:, k])
+            pairs.append(item)
+        body = {**self._describe(key), 'pairs': pairs}
+        if query.get('series') in ('1', 'true'):
+            body['dates'] = [day.strftime('%Y-%m-%d') for day in result['dates']]
+        return body
+
+    async def regression(self, query):
+        """1-2、1-3的成交笔数比与利差回归"""
+        key, result = await self._lookup(query)
+        regression = result['regression']
+        rows = []
+        for k in range(len(next(iter(regression.values()), []))):
+            row = {'pair': pair_label(0, k + 1), 'bond_a': result['bonds'][0], 'bond_b': result['bonds'][k + 1]}
+            for name, values in regression.items():
+                row[name] = _floats(values[k])[0]
+            rows.append(row)
+        return {**self._describe(key), 'regression': rows}
+
+    async def _lookup(self, query):
+        key = window_key(query)
+        result = await self.window(key)
+        if result is None:
+            raise LookupError("没有找到符合条件的债券数据")
+        return key, result
+
+    @staticmethod
+    def _describe(key):
+        issuer, min_maturity, max_maturity, start_date, end_date = key
+        return {'issuer': issuer, 'min_maturity': min_maturity, 'max_maturity': max_maturity,
+                'start_date': start_date, 'end_date': end_date}
+
+
+def window_key(query):
+    """
+    由查询参数得到缓存键 (主体, 剩余期限下限, 剩余期限上限, 开始日期, 结束日期)
+
+    期限档位可给tenor（TENORS或CURVE_TENORS中的名称）或min_maturity、max_maturity；
+    时间窗口可给period（PERIODS中的名称）或start、end（YYYY-MM-DD）。
+    """
+    issuer = query.get('issuer')
+    if not issuer:
+        raise ValueError("缺少参数: issuer")
+
+    tenor = query.get('tenor')
+    if tenor is not None:
+        band = TENORS.get(tenor) or CURVE_TENORS.get(tenor)
+        if band is None:
+            raise ValueError(f"未知的期限档位: {tenor}，可选: {list({**TENORS, **CURVE_TENORS})}")
+        min_maturity, max_maturity = band
+    else:
+        try:
+            min_maturity, max_maturity = float(query['min_maturity']), float(query['max_maturity'])
+        except KeyError:
+            raise ValueError("缺少参数: tenor 或 min_maturity/max_maturity")
+
+    period = query.get('period')
+    if period is not None:
+        window = next(((start, end) for name, start, end in PERIODS if name == period), None)
+        if window is None:
+            raise ValueError(f"未知的时间段: {period}，可选: {[name for name, _, _ in PERIODS]}")
+        start_date, end_date = window
+    else:
+        try:
+            start_date, end_date = query['start'], query['end']
+        except KeyError:
+            raise ValueError("缺少参数: period 或 start/end")
+        # 统一日期写法，避免同一窗口占用多个缓存项
+        start_date, end_date = (time.strftime('%Y-%m-%d', time.strptime(d, '%Y-%m-%d'))
+                                for d in (start_date, end_date))
+    return issuer, float(min_maturity), float(max_maturity), start_date, end_date
+
+
+async def _read_request(reader):
+    """读取一个HTTP请求，返回 (方法, 路径, 查询参数, 是否保持连接)，连接已关闭时返回None"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    if len(head) > MAX_HEADER_BYTES:
+        raise ValueError("请求头过长")
+    lines = head.decode('latin-1').split('\r\n')
+    method, target, version = lines[0].split(' ', 2)
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    # 不接受请求体
+    length = int(headers.get('content-length', 0))
+    if length:
+        await reader.readexactly(length)
+    # 请求头按latin-1解码；curl等客户端会直接发送未转义的UTF-8查询参数，先还原为UTF-8
+    url = urlsplit(target.encode('latin-1').decode('utf-8', 'replace'))
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    return method, url.path, query, keep_alive
+
+
+def _response(status, body, keep_alive):
+    payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+    head = (f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            f'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(payload)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    return head.encode('latin-1') + payload
+
+
+def make_handler(service):
+    """生成asyncio.start_server使用的连接处理函数（支持HTTP/1.1长连接）"""
+    routes = {
+        '/health': service.health,
+        '/rankings': service.rankings,
+        '/spreads': service.spreads,
+        '/regression': service.regression,
+    }
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except (ValueError, asyncio.LimitOverrunError):
+                    writer.write(_response(HTTPStatus.BAD_REQUEST, {'error': '无法解析请求'}, False))
+                    break
+                method, path, query, keep_alive = request
+                started = time.perf_counter()
+                route = routes.get(path.rstrip('/') or '/')
+                try:
+                    if method != 'GET':
+                        status, body = HTTPStatus.METHOD_NOT_ALLOWED, {'error': '只支持GET请求'}
+                    elif route is None:
+                        status, body = HTTPStatus.NOT_FOUND, {'error': f'未知的路径: {path}', 'routes': list(routes)}
+                    else:
+                        body = route(query)
+                        if asyncio.iscoroutine(body):
+                            body = await body
+                        status = HTTPStatus.OK
+                except ValueError as e:
+                    status, body = HTTPStatus.BAD_REQUEST, {'error': str(e)}
+                except LookupError as e:
+                    status, body = HTTPStatus.NOT_FOUND, {'error': str(e)}
+                except Exception as e:
+                    print(f"请求出错 {path}: {e!r}")
+                    status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+                writer.write(_response(status, body, keep_alive))
+                await writer.drain()
+                print(f"{method} {path} {status.value} {(time.perf_counter() - started) * 1000:.1f}ms")
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(data_file, host=HOST, port=PORT, unix_socket=None, cache_size=CACHE_SIZE, top_n=5):
+    """
+    启动查询服务，直到被中断
+
+    参数:
+        data_file (str): 数据文件路径
+        host (str), port (int): TCP监听地址
+        unix_socket (str): 改为监听Unix套接字
+        cache_size (int): 常驻的窗口结果数
+        top_n (int): 每个窗口参与统计的债券数
+    """
+    service = SpreadService(data_file, cache_size, top_n)
+    started = time.perf_counter()
+    await service.warm()
+    print(f"数据已加载: {data_file}（{time.perf_counter() - started:.2f}s）")
+    handler = make_handler(service)
+    if unix_socket:
+        server = await asyncio.start_unix_server(handler, path=unix_socket, limit=MAX_HEADER_BYTES)
+        print(f"利差查询服务已启动: unix:{unix_socket}")
+    else:
+        server = await asyncio.start_server(handler, host, port, limit=MAX_HEADER_BYTES)
+        print(f"利差查询服务已启动: http://{host}:{port}/health")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地利差查询服务：数据和派生结果常驻内存，以JSON返回')
+    parser.add_argument('data_file', nargs='?', default='利差分析四大行2年_final.csv', help='数据文件')
+    parser.add_argument('--host', default=HOST, help='监听地址')
+    parser.add_argument('--port', type=int, default=PORT, help='监听端口')
+    parser.add_argument('--unix', metavar='PATH', help='改为监听Unix套接字')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='常驻内存的窗口结果数')
+    parser.add_argument('--top-n', type=int, default=5, help='每个窗口参与统计的债券数')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.data_file, args.host, args.port, args.unix, args.cache_size, args.top_n))
+    except KeyboardInterrupt:
+        print("服务已停止")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
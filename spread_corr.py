@@ -1,163 +1,419 @@
-import pandas as pd
-import matplotlib
-import matplotlib.pyplot as plt
-import seaborn as sns
-import statsmodels.api as sm
-from pandas_market_calendars import get_calendar
-import func
-import numpy as np
-import scipy.stats as stats  # 新增导入
-
-
-
-# 设置中文字体和负号显示（解决中文乱码）
-plt.rcParams['font.sans-serif'] = ['SimHei']  # Windows系统可用
-# plt.rcParams['font.sans-serif'] = ['Arial Unicode MS']  # Mac系统可用
-plt.rcParams['axes.unicode_minus'] = False
-matplotlib.use('Agg')
-
-
-def plot_relationship(bond_pairs, df, trading_days_str, date_to_index, issuer, season, maturity):
-    """
-    绘制成交笔数比与价差的关系图（在一个大图中显示4个子图）
-    """
-    # 创建大图（2行2列）
-    fig, axes = plt.subplots(2, 2, figsize=(18, 12))
-    fig.suptitle(f'{issuer}-{season}-{maturity}年债券交易笔数比与价差分析', fontsize=16)
-    order = int(2)
-    for i, (bondA, bondB) in enumerate(bond_pairs):
-
-        # 准备数据
-        pair_df = df[df['标的债券代码'].isin([bondA, bondB])].copy()
-        pivot_df = pair_df.pivot(index='日期', columns='标的债券代码',
-                                 values=['到期收益率', '每日每券的成交笔数'])
-
-        # 计算指标
-        pivot_df['价差'] = (pivot_df[('到期收益率', bondA)] - pivot_df[('到期收益率', bondB)]) * 100
-        pivot_df['成交笔数比'] = pivot_df[('每日每券的成交笔数', bondA)] / pivot_df[('每日每券的成交笔数', bondB)]
-        pivot_df = pivot_df.replace([np.inf, -np.inf], np.nan).dropna()
-
-        if len(pivot_df) < 3:
-            print(f"警告：{bondA}-{bondB}的有效数据点不足，跳过绘图")
-            continue
-
-        # ========== 左上：散点图+回归线 ==========
-        ax = axes[0, 0] if i == 0 else axes[0, 1]
-        sns.regplot(
-            x='成交笔数比', y='价差', data=pivot_df,
-            scatter_kws={'alpha': 0.6, 'color': '#1f77b4'},
-            line_kws={'color': 'red', 'linewidth': 2},
-            ax=ax
-        )
-
-        # 计算Pearson相关系数
-        r, p_value = stats.pearsonr(pivot_df['成交笔数比'], pivot_df['价差'])
-
-        # 回归分析（确保在model被引用前执行）
-        X = sm.add_constant(pivot_df['成交笔数比'])
-        model = sm.OLS(pivot_df['价差'], X).fit()
-
-        # 添加统计信息（合并回归和相关系数）
-        stats_text = (
-            f'回归方程: y = {model.params[1]:.2f}x + {model.params[0]:.2f}\n'
-            f'R方 = {model.rsquared:.2f}\n'
-            f'回归p值 = {model.pvalues[1]:.3f}\n'
-            f'Pearson r = {r:.2f}\n'
-            f'相关p值 = {p_value:.3f}'
-        )
-
-        ax.text(0.05, 0.95, stats_text,
-                transform=ax.transAxes,
-                bbox=dict(facecolor='white', alpha=0.8),
-                fontsize=9)
-
-        ax.set_title(f'1-{order}: 成交笔数比 vs 价差')
-        ax.set_xlabel(f'成交笔数比({bondA}/{bondB})')
-        ax.set_ylabel('价差(bps)')
-        ax.grid(True, linestyle=':', alpha=0.6)
-        # ========== 下方：双轴折线图 ==========
-        ax = axes[1, 0] if i == 0 else axes[1, 1]
-
-        # 左轴：价差
-        ax.plot([date_to_index[d.strftime('%Y-%m-%d')] for d in pivot_df.index],
-                pivot_df['价差'], color='blue', label='价差(bps)')
-        ax.set_ylabel('价差(bps)', color='blue')
-        ax.tick_params(axis='y', labelcolor='blue')
-
-        # 右轴：成交笔数比
-        ax2 = ax.twinx()
-        ax2.plot([date_to_index[d.strftime('%Y-%m-%d')] for d in pivot_df.index],
-                 pivot_df['成交笔数比'], color='orange', linestyle='--', label='成交笔数比')
-        ax2.set_ylabel(f'成交笔数比({bondA}/{bondB})', color='orange')
-        ax2.tick_params(axis='y', labelcolor='orange')
-
-        # 设置x轴
-        ax.set_xticks(range(0, len(trading_days_str), 5))
-        ax.set_xticklabels([d[5:] for d in trading_days_str[::5]], rotation=45)
-        ax.set_xlabel('日期')
-        ax.set_title(f'{bondA}-{bondB} (1-{order}): 价差与成交笔数比的时间趋势')
-        ax.grid(True, linestyle=':', alpha=0.6)
-        order += 1
-
-        # 合并图例
-        lines, labels = ax.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax.legend(lines + lines2, labels + labels2, loc='upper right')
-
-    # 调整布局
-    plt.tight_layout()
-    plt.subplots_adjust(top=0.9, hspace=0.3, wspace=0.25)
-
-    # 保存图片
-    plt.savefig(f'spread_demo_corr/{issuer}-{season}-综合分析.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    print(f"综合分析图已保存至: spread_demo_corr/{issuer}-{season}-综合分析.png")
-
-
-# 主程序保持不变
-if __name__ == "__main__":
-    # 输入参数
-    data_file = "利差分析四大行2年_final.csv"
-    issuer = "中华人民共和国财政部"
-    min_maturity = 28.0
-    max_maturity = 30.0
-    maturity = int(max_maturity)
-    season = "2024S1"
-    start_date = "2024-01-01"
-    end_date = "2024-05-15"
-
-    #('2024S1', '2024-01-01', '2024-05-15'),
-    #('2024S2', '2024-05-16', '2024-07-25'),
-    #('2024S3', '2024-07-26', '2024-09-23'),
-    #('2024S4', '2024-09-24', '2025-01-16'),
-    #('2025S1', '2025-01-17', '2025-04-28'),
-    #('2025S2', '2025-04-29', '2025-08-06'),
-
-    # 获取债券列表
-    bond_list = func.select_bond(data_file, start_date, end_date, issuer, min_maturity, max_maturity)
-    print("分析的债券:", bond_list)
-
-    if len(bond_list) < 3:
-        print("需要至少3只债券进行分析")
-    else:
-        # 读取并筛选数据
-        df = pd.read_csv(data_file, parse_dates=['日期'])
-        df = df[(df['日期'] >= start_date) & (df['日期'] <= end_date)]
-        filtered_df = df[df['标的债券代码'].isin(bond_list)].copy()
-
-        if filtered_df.empty:
-            print("警告：未找到指定债券的数据！")
-        else:
-            # 获取交易日历
-            shsz_calendar = get_calendar('SSE')
-            trading_days = shsz_calendar.valid_days(start_date=start_date, end_date=end_date)
-            trading_days_str = [d.strftime('%Y-%m-%d') for d in trading_days]
-            date_to_index = {date_str: idx for idx, date_str in enumerate(trading_days_str)}
-
-            # 只保留交易日数据
-            filtered_df = filtered_df[filtered_df['日期'].astype(str).isin(trading_days_str)]
-
-            # 分析1-2和1-3的关系
-            bond_pairs = [(bond_list[0], bond_list[1]), (bond_list[0], bond_list[2])]
-            plot_relationship(bond_pairs, filtered_df, trading_days_str, date_to_index,
-                              issuer, season, maturity)
+import os
+
+import pandas as pd
+import matplotlib
+import matplotlib.pyplot as plt
+from trading_calendar import day_labels, is_trading_day, to_index, trading_days
+import func
+from panel import load_panel
+from preview import get_template, savefig_kwargs
+from profiling import profiled, span
+from regression import expanding_regression, rolling_regression
+from spreads import SpreadMatrix, pair_label
+import numpy as np
+
+
+
+# 设置中文字体和负号显示（解决中文乱码）
+plt.rcParams['font.sans-serif'] = ['SimHei']  # Windows系统可用
+# plt.rcParams['font.sans-serif'] = ['Arial Unicode MS']  # Mac系统可用
+plt.rcParams['axes.unicode_minus'] = False
+matplotlib.use('Agg')
+
+
+@profiled(issuer='issuer', period='season')
+def prepare_relationship(bond_pairs, df, days, issuer, season, maturity):
+    """
+    计算成交笔数比与价差关系图所需的序列和回归统计量
+
+    结果只包含数组、数值和标签，可直接发送给绘图进程。days为trading_calendar.trading_days返回的交易日序数。
+
+    返回:
+        dict: 绘图数据
+    """
+    # 统计依赖较重，只在需要回归时导入
+    import scipy.stats as stats
+    import statsmodels.api as sm
+
+    payload = {
+        'title': f'{issuer}-{season}-{maturity}年债券交易笔数比与价差分析',
+        'filename': f'{issuer}-{season}-{maturity}年综合分析.png',
+        'n_days': len(days),
+        'tick_labels': day_labels(days[::5]),
+        'pairs': [],
+    }
+    order = int(2)
+    for i, (bondA, bondB) in enumerate(bond_pairs):
+
+        # 准备数据
+        pair_df = df[df['标的债券代码'].isin([bondA, bondB])].copy()
+        pivot_df = pair_df.pivot(index='日期', columns='标的债券代码',
+                                 values=['到期收益率', '每日每券的成交笔数'])
+
+        # 计算指标
+        pivot_df['价差'] = (pivot_df[('到期收益率', bondA)] - pivot_df[('到期收益率', bondB)]) * 100
+        pivot_df['成交笔数比'] = pivot_df[('每日每券的成交笔数', bondA)] / pivot_df[('每日每券的成交笔数', bondB)]
+        pivot_df = pivot_df.replace([np.inf, -np.inf], np.nan).dropna()
+
+        if len(pivot_df) < 3:
+            print(f"警告：{bondA}-{bondB}的有效数据点不足，跳过绘图")
+            continue
+
+        # 计算Pearson相关系数
+        r, p_value = stats.pearsonr(pivot_df['成交笔数比'], pivot_df['价差'])
+
+        # 回归分析
+        X = sm.add_constant(pivot_df['成交笔数比'])
+        model = sm.OLS(pivot_df['价差'], X).fit()
+
+        payload['pairs'].append({
+            'index': i,
+            'order': order,
+            'bondA': bondA,
+            'bondB': bondB,
+            'ratio': pivot_df['成交笔数比'].to_numpy(dtype=np.float64),
+            'spread': pivot_df['价差'].to_numpy(dtype=np.float64),
+            'x': to_index(pivot_df.index, days),
+            'slope': model.params.iloc[1],
+            'intercept': model.params.iloc[0],
+            'rsquared': model.rsquared,
+            'reg_pvalue': model.pvalues.iloc[1],
+            'r': r,
+            'r_pvalue': p_value,
+        })
+        order += 1
+    return payload
+
+
+class RelationshipTemplate:
+    """
+    预览模式下2×2关系图的模板：画布、孪生坐标轴、图例和文本框每个进程只创建一次
+
+    每个时间段只替换散点位置、回归线与置信带、双轴折线的数据、刻度和统计文本后保存，
+    Agg画布在各时间段间复用。回归线取prepare_relationship的OLS结果，
+    置信带为回归均值的95%解析置信区间（与seaborn.regplot的自助法区间近似）；
+    出版模式仍用seaborn.regplot和tight_layout逐张绘制。
+    """
+
+    def __init__(self):
+        self.fig, axes = plt.subplots(2, 2, figsize=(18, 12))
+        self.fig.subplots_adjust(left=0.05, right=0.95, bottom=0.08, top=0.9, hspace=0.3, wspace=0.25)
+        self.title = self.fig.suptitle('', fontsize=16)
+        self.panels = []
+        for k in range(2):
+            top, bottom = axes[0, k], axes[1, k]
+            twin = bottom.twinx()
+            panel = {
+                'top': top,
+                'bottom': bottom,
+                'twin': twin,
+                'scatter': top.scatter([], [], alpha=0.6, color='#1f77b4'),
+                'fit': top.plot([], [], color='red', linewidth=2)[0],
+                'band': None,
+                'text': top.text(0.05, 0.95, '', transform=top.transAxes,
+                                 bbox=dict(facecolor='white', alpha=0.8), fontsize=9),
+                'spread': bottom.plot([], [], color='blue', label='价差(bps)')[0],
+                'ratio': twin.plot([], [], color='orange', linestyle='--', label='成交笔数比')[0],
+            }
+            top.set_ylabel('价差(bps)')
+            top.grid(True, linestyle=':', alpha=0.6)
+            bottom.set_ylabel('价差(bps)', color='blue')
+            bottom.tick_params(axis='y', labelcolor='blue')
+            twin.tick_params(axis='y', labelcolor='orange')
+            bottom.set_xlabel('日期')
+            bottom.grid(True, linestyle=':', alpha=0.6)
+            bottom.legend([panel['spread'], panel['ratio']], ['价差(bps)', '成交笔数比'], loc='upper right')
+            self.panels.append(panel)
+
+    @staticmethod
+    def _confidence_band(pair, grid):
+        """回归均值在grid处的95%置信区间"""
+        from scipy.stats import t
+
+        x, y = pair['ratio'], pair['spread']
+        n = len(x)
+        fitted = pair['intercept'] + pair['slope'] * grid
+        resid = y - (pair['intercept'] + pair['slope'] * x)
+        sxx = np.sum((x - x.mean()) ** 2)
+        se = np.sqrt(np.sum(resid ** 2) / (n - 2) * (1 / n + (grid - x.mean()) ** 2 / sxx))
+        width = t.ppf(0.975, n - 2) * se
+        return fitted - width, fitted + width
+
+    def _update(self, panel, pair, payload):
+        top, bottom, twin = panel['top'], panel['bottom'], panel['twin']
+        order, bondA, bondB = pair['order'], pair['bondA'], pair['bondB']
+        ratio, spread = pair['ratio'], pair['spread']
+
+        # 上方：散点、回归线与置信带
+        panel['scatter'].set_offsets(np.column_stack([ratio, spread]))
+        grid = np.linspace(ratio.min(), ratio.max(), 100)
+        panel['fit'].set_data(grid, pair['intercept'] + pair['slope'] * grid)
+        if panel['band'] is not None:
+            panel['band'].remove()
+        lower, upper = self._confidence_band(pair, grid)
+        panel['band'] = top.fill_between(grid, lower, upper, color='red', alpha=0.15, linewidth=0)
+        panel['text'].set_text(
+            f'回归方程: y = {pair["slope"]:.2f}x + {pair["intercept"]:.2f}\n'
+            f'R方 = {pair["rsquared"]:.2f}\n'
+            f'回归p值 = {pair["reg_pvalue"]:.3f}\n'
+            f'Pearson r = {pair["r"]:.2f}\n'
+            f'相关p值 = {pair["r_pvalue"]:.3f}'
+        )
+        top.set_title(f'1-{order}: 成交笔数比 vs 价差')
+        top.set_xlabel(f'成交笔数比({bondA}/{bondB})')
+        # 散点和填充区域不参与relim，直接按数据重设范围
+        top.ignore_existing_data_limits = True
+        top.update_datalim(np.column_stack([np.r_[ratio, grid, grid], np.r_[spread, lower, upper]]))
+        top.autoscale_view()
+
+        # 下方：双轴折线
+        panel['spread'].set_data(pair['x'], spread)
+        panel['ratio'].set_data(pair['x'], ratio)
+        twin.set_ylabel(f'成交笔数比({bondA}/{bondB})', color='orange')
+        bottom.set_xticks(range(0, payload['n_days'], 5))
+        bottom.set_xticklabels(payload['tick_labels'], rotation=45)
+        bottom.set_title(f'{bondA}-{bondB} (1-{order}): 价差与成交笔数比的时间趋势')
+        for ax in (bottom, twin):
+            ax.relim()
+            ax.autoscale_view()
+
+    def render(self, payload, save_path):
+        self.title.set_text(payload['title'])
+        pairs = {pair['index']: pair for pair in payload['pairs']}
+        for k, panel in enumerate(self.panels):
+            pair = pairs.get(k)
+            # 数据不足而跳过的组合：隐藏该列的全部内容
+            for ax in (panel['top'], panel['bottom'], panel['twin']):
+                ax.set_visible(pair is not None)
+            if pair is not None:
+                self._update(panel, pair, payload)
+        with span('savefig'):
+            self.fig.savefig(save_path, **savefig_kwargs(preview=True))
+
+
+@profiled('draw_corr')
+def draw_relationship(payload, save_path, preview=False):
+    """
+    根据prepare_relationship的结果绘制成交笔数比与价差的关系图（在一个大图中显示4个子图）
+
+    preview为True时复用进程内的RelationshipTemplate，以低分辨率保存，不做tight bbox排版
+    """
+    if preview:
+        get_template(RelationshipTemplate).render(payload, save_path)
+        print(f"综合分析图已保存至: {save_path}")
+        return
+
+    import seaborn as sns
+
+    # 创建大图（2行2列）
+    fig, axes = plt.subplots(2, 2, figsize=(18, 12))
+    fig.suptitle(payload['title'], fontsize=16)
+    for pair in payload['pairs']:
+        i, order = pair['index'], pair['order']
+        bondA, bondB = pair['bondA'], pair['bondB']
+
+        # ========== 左上：散点图+回归线 ==========
+        ax = axes[0, 0] if i == 0 else axes[0, 1]
+        sns.regplot(
+            x=pair['ratio'], y=pair['spread'],
+            scatter_kws={'alpha': 0.6, 'color': '#1f77b4'},
+            line_kws={'color': 'red', 'linewidth': 2},
+            ax=ax
+        )
+
+        # 添加统计信息（合并回归和相关系数）
+        stats_text = (
+            f'回归方程: y = {pair["slope"]:.2f}x + {pair["intercept"]:.2f}\n'
+            f'R方 = {pair["rsquared"]:.2f}\n'
+            f'回归p值 = {pair["reg_pvalue"]:.3f}\n'
+            f'Pearson r = {pair["r"]:.2f}\n'
+            f'相关p值 = {pair["r_pvalue"]:.3f}'
+        )
+
+        ax.text(0.05, 0.95, stats_text,
+                transform=ax.transAxes,
+                bbox=dict(facecolor='white', alpha=0.8),
+                fontsize=9)
+
+        ax.set_title(f'1-{order}: 成交笔数比 vs 价差')
+        ax.set_xlabel(f'成交笔数比({bondA}/{bondB})')
+        ax.set_ylabel('价差(bps)')
+        ax.grid(True, linestyle=':', alpha=0.6)
+        # ========== 下方：双轴折线图 ==========
+        ax = axes[1, 0] if i == 0 else axes[1, 1]
+
+        # 左轴：价差
+        ax.plot(pair['x'], pair['spread'], color='blue', label='价差(bps)')
+        ax.set_ylabel('价差(bps)', color='blue')
+        ax.tick_params(axis='y', labelcolor='blue')
+
+        # 右轴：成交笔数比
+        ax2 = ax.twinx()
+        ax2.plot(pair['x'], pair['ratio'], color='orange', linestyle='--', label='成交笔数比')
+        ax2.set_ylabel(f'成交笔数比({bondA}/{bondB})', color='orange')
+        ax2.tick_params(axis='y', labelcolor='orange')
+
+        # 设置x轴
+        ax.set_xticks(range(0, payload['n_days'], 5))
+        ax.set_xticklabels(payload['tick_labels'], rotation=45)
+        ax.set_xlabel('日期')
+        ax.set_title(f'{bondA}-{bondB} (1-{order}): 价差与成交笔数比的时间趋势')
+        ax.grid(True, linestyle=':', alpha=0.6)
+
+        # 合并图例
+        lines, labels = ax.get_legend_handles_labels()
+        lines2, labels2 = ax2.get_legend_handles_labels()
+        ax.legend(lines + lines2, labels + labels2, loc='upper right')
+
+    # 调整布局
+    plt.tight_layout()
+    plt.subplots_adjust(top=0.9, hspace=0.3, wspace=0.25)
+
+    # 保存图片
+    with span('savefig'):
+        plt.savefig(save_path, **savefig_kwargs(preview))
+    plt.close()
+    print(f"综合分析图已保存至: {save_path}")
+
+
+def plot_relationship(bond_pairs, df, days, issuer, season, maturity,
+                      output_dir='spread_demo_corr'):
+    """
+    绘制成交笔数比与价差的关系图（在一个大图中显示4个子图）
+    """
+    payload = prepare_relationship(bond_pairs, df, days, issuer, season, maturity)
+    draw_relationship(payload, os.path.join(output_dir, payload['filename']))
+
+
+@profiled('prepare_corr', issuer='issuer', period='season')
+def prepare_analysis(data_file, issuer, min_maturity, max_maturity, season, start_date, end_date,
+                     bond_list=None):
+    """
+    对最活跃券与次活跃券（1-2）、次次活跃券（1-3）做成交笔数比与价差的回归分析，返回绘图数据
+
+    参数：
+        data_file: 数据文件路径
+        issuer: 发行人名称
+        min_maturity: 最小剩余期限
+        max_maturity: 最大剩余期限
+        season: 时间段标签（用于标题和文件名）
+        start_date: 开始日期
+        end_date: 结束日期
+        bond_list: 按活跃度排序的债券列表，为None时调用func.select_bond选取
+
+    返回：
+        dict: prepare_relationship的结果，数据不足时返回None
+    """
+    maturity = int(max_maturity)
+
+    # 获取债券列表（批量运行时可直接传入已选好的列表）
+    if bond_list is None:
+        bond_list = func.select_bond(data_file, start_date, end_date, issuer, min_maturity, max_maturity)
+        print("分析的债券:", bond_list)
+
+    if not bond_list or len(bond_list) < 3:
+        print("需要至少3只债券进行分析")
+        return None
+
+    # 筛选数据（复用select_bond已加载的面板）
+    filtered_df = load_panel(data_file).select(start_date, end_date, bonds=bond_list).copy()
+
+    if filtered_df.empty:
+        print("警告：未找到指定债券的数据！")
+        return None
+
+    # 获取交易日历（记忆化），只保留交易日数据
+    days = trading_days(start_date, end_date)
+    filtered_df = filtered_df[is_trading_day(filtered_df['日期'], days)]
+
+    # 分析1-2和1-3的关系
+    bond_pairs = [(bond_list[0], bond_list[1]), (bond_list[0], bond_list[2])]
+    return prepare_relationship(bond_pairs, filtered_df, days, issuer, season, maturity)
+
+
+@profiled(issuer='issuer')
+def rolling_relationship(data_file, issuer, min_maturity, max_maturity, start_date, end_date,
+                         bond_list=None, window=60, pairs=None, expanding=False):
+    """
+    成交笔数比与价差的滚动（或扩张）窗口回归，用于跟踪流动性溢价随时间的变化
+
+    所有组合、所有窗口由累计和一次算出，不逐窗口拟合。
+
+    参数：
+        data_file至bond_list: 同prepare_analysis
+        window: 滚动窗口长度（交易日）
+        pairs: [(i, j), ...] 按排名的组合，默认为1-2、1-3
+        expanding: 为True时使用扩张窗口，忽略window
+
+    返回：
+        pd.DataFrame: 以日期为索引，列为 (组合, 指标)，指标为 n/slope/intercept/rsquared/r/pvalue；
+                      数据不足时返回None
+    """
+    if bond_list is None:
+        bond_list = func.select_bond(data_file, start_date, end_date, issuer, min_maturity, max_maturity)
+    if not bond_list or len(bond_list) < 2:
+        print("需要至少2只债券进行分析")
+        return None
+    if pairs is None:
+        pairs = [(0, j) for j in range(1, min(3, len(bond_list)))]
+    if not pairs:
+        print("需要至少2只债券进行分析")
+        return None
+
+    filtered_df = load_panel(data_file).select(start_date, end_date, bonds=bond_list)
+    days = trading_days(start_date, end_date)
+    filtered_df = filtered_df[is_trading_day(filtered_df['日期'], days)]
+    if filtered_df.empty:
+        print("警告：未找到指定债券的数据！")
+        return None
+
+    # 收益率与成交笔数对齐到同一 日期×债券 网格
+    spread_matrix = SpreadMatrix.from_frame(filtered_df, bond_list)
+    trades = filtered_df.pivot(index='日期', columns='标的债券代码', values='每日每券的成交笔数')
+    trades = trades.reindex(index=spread_matrix.dates, columns=bond_list).to_numpy(dtype=np.float64)
+
+    rows = [i for i, _ in pairs]
+    cols = [j for _, j in pairs]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = trades[:, rows] / trades[:, cols]
+    ratio[~np.isfinite(ratio)] = np.nan
+    spread = spread_matrix.tensor[:, rows, cols]
+
+    if expanding:
+        result = expanding_regression(ratio, spread)
+    else:
+        result = rolling_regression(ratio, spread, window)
+
+    labels = [pair_label(i, j) for i, j in pairs]
+    return pd.concat(
+        {label: pd.DataFrame({key: values[:, k] for key, values in result.items()}, index=spread_matrix.dates)
+         for k, label in enumerate(labels)},
+        axis=1,
+    )
+
+
+def analyze_relationship(data_file, issuer, min_maturity, max_maturity, season, start_date, end_date,
+                         bond_list=None, output_dir='spread_demo_corr'):
+    """
+    对最活跃券与次活跃券（1-2）、次次活跃券（1-3）做成交笔数比与价差的回归分析并绘图
+
+    参数同prepare_analysis，output_dir为图片保存目录
+    """
+    payload = prepare_analysis(data_file, issuer, min_maturity, max_maturity, season, start_date, end_date,
+                               bond_list)
+    if payload is not None:
+        draw_relationship(payload, os.path.join(output_dir, payload['filename']))
+
+
+if __name__ == "__main__":
+    # 输入参数
+    data_file = "利差分析四大行2年_final.csv"
+    issuer = "中华人民共和国财政部"
+    min_maturity = 28.0
+    max_maturity = 30.0
+    season = "2024S1"
+    start_date = "2024-01-01"
+    end_date = "2024-05-15"
+
+    # 其它时间段见periods.PERIODS，批量运行见batch.py
+    analyze_relationship(data_file, issuer, min_maturity, max_maturity, season, start_date, end_date)
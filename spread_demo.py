@@ -1,284 +1,417 @@
-import pandas as pd
-import matplotlib
-
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import matplotlib.ticker as ticker
-import func
-from pandas_market_calendars import get_calendar
-
-# 设置中文字体和负号显示
-plt.rcParams['font.sans-serif'] = ['SimHei']
-plt.rcParams['axes.unicode_minus'] = False
-
-
-def plot_spread_quantiles(bond_list, bond_ytms, date_to_index, save_path='spread_boxplot.png'):
-    """
-    用箱型图展示利差分位数（10/25/50/75/90分位）并单独保存
-
-    参数：
-        bond_list: 债券列表（如['bond1', 'bond2', 'bond3']）
-        bond_ytms: 字典，键为债券名称，值为YTM序列（pd.Series）
-        date_to_index: 日期到x轴坐标的映射字典（本函数未直接使用）
-        save_path: 图片保存路径
-    """
-    # 准备数据容器
-    spreads = {}
-
-    # 计算所有利差组合
-    if len(bond_ytms) >= 2:
-        bond1 = bond_list[0]
-        ytm1 = bond_ytms[bond1]
-
-        # 计算1-N利差
-        for i in range(1, len(bond_list)):
-            bondN = bond_list[i]
-            spread_name = f'1-{i + 1}'
-            spreads[spread_name] = (ytm1 - bond_ytms[bondN]) * 100  # 转为bps
-
-        # 计算2-3利差（如果存在）
-        if len(bond_list) >= 3:
-            spreads['2-3'] = (bond_ytms[bond_list[1]] - bond_ytms[bond_list[2]]) * 100
-
-    # 如果没有有效利差则退出
-    if not spreads:
-        print("警告：无有效利差数据！")
-        return
-
-    # 创建DataFrame
-    df_spreads = pd.DataFrame(spreads)
-
-    # 创建箱型图
-    fig, ax = plt.subplots(figsize=(10, 6))
-
-    # 绘制箱型图（显示均值、分位数和离群点）
-    boxprops = dict(linestyle='-', linewidth=1.5, color='#1f77b4')
-    medianprops = dict(linestyle='-', linewidth=2, color='red')
-    meanprops = dict(marker='D', markeredgecolor='black', markerfacecolor='green')
-
-    df_spreads.plot(kind='box',
-                    ax=ax,
-                    patch_artist=True,
-                    boxprops=boxprops,
-                    medianprops=medianprops,
-                    meanprops=meanprops,
-                    showmeans=True,
-                    whis=[10, 90],
-                    showfliers=False)  # 将须线设为10%和90%分位
-
-    # 设置图表属性
-    ax.set_title('债券利差分位数箱型图', fontsize=14)
-    ax.set_xlabel('利差组合', fontsize=12)
-    ax.set_ylabel('利差(bps)', fontsize=12)
-    ax.grid(True, linestyle=':', alpha=0.6)
-
-    # 添加参考线
-    ax.axhline(0, color='gray', linestyle='--', alpha=0.5)
-    ax.text(1.02, 0.5,
-            '箱型图说明：\n'
-            '箱体范围 = 25%-75%分位\n'
-            '须线范围 = 10%-90%分位\n'
-            '中位数 = 红线\n'
-            '均值 = 绿色菱形',
-            transform=ax.transAxes,
-            verticalalignment='center',
-            bbox=dict(facecolor='white', alpha=0.8))
-
-    # 调整布局并保存
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300, bbox_inches='tight')
-    plt.close()
-    print(f"箱型图已保存至：{save_path}")
-
-
-
-def get_quarter_dates(season):
-    """（原有函数保持不变）"""
-    if 'Q' in season:
-        year, quarter = season.split('Q')
-        year = int(year)
-        quarter = int(quarter)
-        first_month = 3 * quarter - 2
-        last_month = 3 * quarter
-        start_date = pd.Timestamp(year=year, month=first_month, day=1)
-        end_date = pd.Timestamp(year=year, month=last_month, day=1) + pd.offsets.QuarterEnd()
-    else:
-        year = int(season)
-        start_date = pd.Timestamp(year=year, month=1, day=1)
-        end_date = pd.Timestamp(year=year, month=12, day=31)
-    return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
-
-
-# 输入参数
-data_file = "利差分析四大行2年_final.csv"
-issuer = "中华人民共和国财政部"
-min_maturity = 28.0
-max_maturity = 30.0
-maturity = int(max_maturity)
-season = "2024"
-start_date = "2024-01-01"
-end_date = "2024-12-31"
-
-# ('2024S1', '2024-01-01', '2024-05-15'),
-# ('2024S2', '2024-05-16', '2024-07-25'),
-# ('2024S3', '2024-07-26', '2024-09-23'),
-# ('2024S4', '2024-09-24', '2025-01-16'),
-# ('2025S1', '2025-01-17', '2025-04-28'),
-# ('2025S2', '2025-04-29', '2025-08-06'),
-# 获取债券列表
-bond_list = func.select_bond(data_file, start_date, end_date, issuer, min_maturity, max_maturity)
-print(bond_list)
-
-# 读取并筛选数据
-df = pd.read_csv(data_file, parse_dates=['日期'])
-df = df[(df['日期'] >= start_date) & (df['日期'] <= end_date)]
-filtered_df = df[df['标的债券代码'].isin(bond_list)].copy()
-
-if filtered_df.empty:
-    print("警告：未找到指定债券的数据！请检查债券代码是否正确。")
-else:
-    # 获取中国交易日历并创建映射
-    shsz_calendar = get_calendar('SSE')
-    trading_days = shsz_calendar.valid_days(start_date=start_date, end_date=end_date)
-    trading_days_str = [d.strftime('%Y-%m-%d') for d in trading_days]
-    date_to_index = {date_str: idx for idx, date_str in enumerate(trading_days_str)}
-    filtered_df = filtered_df[filtered_df['日期'].astype(str).isin(trading_days_str)]
-
-    # 创建画布和子图
-    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 16), sharex=True)
-    fig.suptitle(f'{issuer}-{season}-{maturity}年债券利差分析', fontsize=14)
-
-    # 设置X轴（使用交易日索引）
-    day_indices = range(len(trading_days))
-    for ax in [ax1, ax2, ax3]:
-        ax.set_xticks(day_indices[::5])  # 每5个交易日显示一个标签
-        ax.set_xticklabels([trading_days[i].strftime('%m-%d') for i in day_indices[::5]])
-        ax.xaxis.set_minor_locator(ticker.AutoMinorLocator(5))
-
-    # ========== 修改1：在图1右侧添加中债YTM ==========
-    # 读取中债估值数据
-    ytm_df = pd.read_excel(
-        "30Y中债估值.xlsx",
-        header=None,  # 关键修改：文件无列名
-        names=['日期', 'YTM值'],  # 手动指定列名
-        parse_dates=['日期']  # 解析日期列
-    )
-
-    # 过滤日期范围
-    ytm_df = ytm_df[(ytm_df['日期'] >= pd.to_datetime(start_date)) &
-                    (ytm_df['日期'] <= pd.to_datetime(end_date))]
-    ytm_df = ytm_df[ytm_df['日期'].astype(str).isin(trading_days_str)]
-
-    # 创建右侧Y轴
-    ax1_right = ax1.twinx()
-    ytm_dates = [date_to_index[d.strftime('%Y-%m-%d')] for d in ytm_df['日期']]
-    ax1_right.plot(
-        ytm_dates,
-        ytm_df['YTM值'],  # 使用手动指定的列名
-        color='purple',
-        linestyle=':',
-        linewidth=2,
-        label='30Y中债YTM'
-    )
-    ax1_right.set_ylabel('中债YTM(%)', color='purple')
-    ax1_right.tick_params(axis='y', colors='purple')
-    ax1_right.legend(loc='upper right')
-
-    # 子图1：绘制利差曲线（原有逻辑）
-    bond_ytms = {}
-    for bond in bond_list:
-        bond_data = filtered_df[filtered_df['标的债券代码'] == bond]
-        if not bond_data.empty:
-            bond_ytms[bond] = bond_data.set_index('日期')['到期收益率']
-
-    if len(bond_ytms) >= 2:
-        bond1 = bond_list[0]
-        ytm1 = bond_ytms[bond1]
-        for i in range(1, len(bond_list)):
-            bondN = bond_list[i]
-            ytmN = bond_ytms[bondN]
-            spread = (ytm1 - ytmN) * 100
-            x_values = [date_to_index[d.strftime('%Y-%m-%d')] for d in spread.index]
-            ax1.plot(x_values, spread.values, label=f'1-{i + 1}')
-        if len(bond_list) >= 3:
-            ytm2 = bond_ytms[bond_list[1]]
-            ytm3 = bond_ytms[bond_list[2]]
-            spread_23 = (ytm2 - ytm3) * 100
-            x_values = [date_to_index[d.strftime('%Y-%m-%d')] for d in spread_23.index]
-            ax1.plot(x_values, spread_23.values, label='2-3')
-        ax1.axhline(y=0, color='red', linestyle='--', linewidth=0.8)
-        ax1.set_ylabel('利差(bps)', fontsize=10)
-        ax1.grid(True, linestyle='--', alpha=0.6)
-        ax1.legend(title='债券利差', bbox_to_anchor=(1.08, 0.5), loc='center left')
-        #plot_spread_quantiles(bond_list, bond_ytms, date_to_index, f'spread_demo_7_30/{issuer}-{season}-{maturity}年债券利差分位.png')
-    # ========== 修改2：将图二单位改为亿元 ==========
-    # 子图2：单券借贷余额和总借贷余额（单位改为亿元）
-    total_loan = filtered_df.groupby('日期')['单券借贷余额（百万元）'].sum().reset_index()
-    total_loan['单券借贷余额（亿元）'] = total_loan['单券借贷余额（百万元）'] / 100  # 百万元→亿元
-
-    ranks = ["1st", "2nd", "3rd", "4th", "5th"][:len(bond_list)]
-    for i, bond in enumerate(bond_list):
-        bond_data = filtered_df[filtered_df['标的债券代码'] == bond]
-        if not bond_data.empty:
-            bond_data = bond_data.copy()  # 避免SettingWithCopyWarning
-            bond_data['单券借贷余额（亿元）'] = bond_data['单券借贷余额（百万元）'] / 100  # 转换单位
-            x_values = [date_to_index[d.strftime('%Y-%m-%d')] for d in bond_data['日期']]
-            ax2.plot(
-                x_values,
-                bond_data['单券借贷余额（亿元）'],
-                linestyle='-',
-                marker='o',
-                markersize=4,
-                markeredgecolor='none',
-                alpha=0.8,
-                label=f'{bond}({ranks[i]})'
-            )
-
-    # 绘制总借贷余额曲线（亿元）
-    x_values_total = [date_to_index[d.strftime('%Y-%m-%d')] for d in total_loan['日期']]
-    ax2.plot(
-        x_values_total,
-        total_loan['单券借贷余额（亿元）'],
-        linestyle='-',
-        color='black',
-        linewidth=2,
-        label='总借贷余额'
-    )
-    ax2.set_ylabel('借贷余额(亿元)', fontsize=10)  # 单位改为亿元
-    ax2.grid(True, linestyle='--', alpha=0.6)
-    ax2.legend(title='债券代码', bbox_to_anchor=(1.02, 1), loc='upper left')
-
-    # 子图3：成交笔数曲线（保持不变）
-    line_styles = ['-', '-', '-', '-', '-']
-    line_widths = [2.0, 1.5, 1.5, 1.2, 1.2]
-    for i, bond in enumerate(bond_list):
-        bond_data = filtered_df[filtered_df['标的债券代码'] == bond]
-        if not bond_data.empty:
-            x_values = [date_to_index[d.strftime('%Y-%m-%d')] for d in bond_data['日期']]
-            ax3.plot(
-                x_values,
-                bond_data['每日每券的成交笔数'],
-                linestyle=line_styles[i] if i < len(line_styles) else '-',
-                linewidth=line_widths[i] if i < len(line_widths) else 1.0,
-                alpha=0.9,
-                label=f'{bond}({ranks[i]})'
-            )
-    ax3.set_xlabel('日期', fontsize=10)
-    ax3.set_ylabel('成交笔数', fontsize=10)
-    ax3.grid(True, linestyle='--', alpha=0.6)
-    ax3.legend(title='债券代码', bbox_to_anchor=(1.02, 1), loc='upper left')
-    plt.setp(ax3.get_xticklabels(), rotation=45)
-
-    # 调整布局
-    plt.tight_layout()
-    plt.subplots_adjust(top=0.92, hspace=0.15)
-
-    # 保存和显示
-    plt.savefig(
-        f'spread_demo_2y/{issuer}-{season}-{maturity}年债券利差分析.png',
-        dpi=300,
-        bbox_inches='tight'
-    )
-    plt.show()
-    plt.close()
+import os
+
+import numpy as np
+import pandas as pd
+import matplotlib
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import matplotlib.ticker as ticker
+import func
+from bond_matrix import BondMatrix
+from panel import load_panel
+from preview import get_template, savefig_kwargs
+from profiling import profiled, span
+from quantiles import bxp_stats, spread_quantiles
+from spreads import default_pairs, pair_label
+from trading_calendar import day_labels, is_trading_day, to_index, trading_days
+
+# 设置中文字体和负号显示
+plt.rcParams['font.sans-serif'] = ['SimHei']
+plt.rcParams['axes.unicode_minus'] = False
+
+
+def plot_spread_quantiles(spread_matrix, save_path='spread_boxplot.png'):
+    """
+    用箱型图展示利差分位数（10/25/50/75/90分位）并单独保存
+
+    参数：
+        spread_matrix: 利差矩阵（spreads.SpreadMatrix，债券按活跃度排序）
+        save_path: 图片保存路径
+    """
+    # 取1-N和2-3利差组合
+    df_spreads = spread_matrix.frame()
+
+    # 如果没有有效利差则退出
+    if spread_matrix.n_valid < 2 or df_spreads.empty:
+        print("警告：无有效利差数据！")
+        return
+
+    # 创建箱型图
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    # 绘制箱型图（显示均值和分位数，分位数一次算出）
+    boxprops = dict(linestyle='-', linewidth=1.5, color='#1f77b4')
+    medianprops = dict(linestyle='-', linewidth=2, color='red')
+    meanprops = dict(marker='D', markeredgecolor='black', markerfacecolor='green')
+
+    stats = spread_quantiles(df_spreads.to_numpy()[None])
+    ax.bxp(bxp_stats(stats, 0, list(df_spreads.columns)),
+           patch_artist=True,
+           boxprops=boxprops,
+           medianprops=medianprops,
+           meanprops=meanprops,
+           showmeans=True,
+           showfliers=False)  # 须线为10%和90%分位
+
+    # 设置图表属性
+    ax.set_title('债券利差分位数箱型图', fontsize=14)
+    ax.set_xlabel('利差组合', fontsize=12)
+    ax.set_ylabel('利差(bps)', fontsize=12)
+    ax.grid(True, linestyle=':', alpha=0.6)
+
+    # 添加参考线
+    ax.axhline(0, color='gray', linestyle='--', alpha=0.5)
+    ax.text(1.02, 0.5,
+            '箱型图说明：\n'
+            '箱体范围 = 25%-75%分位\n'
+            '须线范围 = 10%-90%分位\n'
+            '中位数 = 红线\n'
+            '均值 = 绿色菱形',
+            transform=ax.transAxes,
+            verticalalignment='center',
+            bbox=dict(facecolor='white', alpha=0.8))
+
+    # 调整布局并保存
+    plt.tight_layout()
+    plt.savefig(save_path, dpi=300, bbox_inches='tight')
+    plt.close()
+    print(f"箱型图已保存至：{save_path}")
+
+
+
+def get_quarter_dates(season):
+    """（原有函数保持不变）"""
+    if 'Q' in season:
+        year, quarter = season.split('Q')
+        year = int(year)
+        quarter = int(quarter)
+        first_month = 3 * quarter - 2
+        last_month = 3 * quarter
+        start_date = pd.Timestamp(year=year, month=first_month, day=1)
+        end_date = pd.Timestamp(year=year, month=last_month, day=1) + pd.offsets.QuarterEnd()
+    else:
+        year = int(season)
+        start_date = pd.Timestamp(year=year, month=1, day=1)
+        end_date = pd.Timestamp(year=year, month=12, day=31)
+    return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+
+
+@profiled('prepare_demo', issuer='issuer', period='season')
+def prepare_spread_demo(data_file, issuer, min_maturity, max_maturity, season, start_date, end_date,
+                        bond_list=None, benchmark_file=None):
+    """
+    计算利差、借贷余额和成交笔数三联分析图所需的全部序列
+
+    结果只包含数组和标签，不含DataFrame，可直接发送给绘图进程。
+
+    参数：
+        data_file: 数据文件路径
+        issuer: 发行人名称
+        min_maturity: 最小剩余期限
+        max_maturity: 最大剩余期限
+        season: 时间段标签（用于标题和文件名）
+        start_date: 开始日期
+        end_date: 结束日期
+        bond_list: 按活跃度排序的债券列表，为None时调用func.select_bond选取
+        benchmark_file: 中债估值YTM文件，默认为'{期限}Y中债估值.xlsx'
+
+    返回：
+        dict: 绘图数据，无可用数据时返回None
+    """
+    maturity = int(max_maturity)
+    if benchmark_file is None:
+        benchmark_file = f"{maturity}Y中债估值.xlsx"
+
+    # 获取债券列表（批量运行时可直接传入已选好的列表）
+    if bond_list is None:
+        bond_list = func.select_bond(data_file, start_date, end_date, issuer, min_maturity, max_maturity)
+        print(bond_list)
+    if not bond_list:
+        print("警告：未找到符合条件的债券！")
+        return None
+
+    # 筛选数据（复用select_bond已加载的面板）
+    filtered_df = load_panel(data_file).select(start_date, end_date, bonds=bond_list).copy()
+
+    if filtered_df.empty:
+        print("警告：未找到指定债券的数据！请检查债券代码是否正确。")
+        return None
+
+    # 获取中国交易日历（记忆化），日期按交易日序数映射为x坐标
+    days = trading_days(start_date, end_date)
+    # 交易日×债券 的紧凑矩阵，三张子图共用
+    matrix = BondMatrix.from_frame(filtered_df, bond_list, days)
+    observed = matrix.observed()
+
+    payload = {
+        'title': f'{issuer}-{season}-{maturity}年债券利差分析',
+        'filename': f'{issuer}-{season}-{maturity}年债券利差分析.png',
+        'n_days': len(days),
+        'tick_labels': day_labels(days[::5]),
+    }
+
+    # ========== 修改1：在图1右侧添加中债YTM ==========
+    # 读取中债估值数据
+    ytm_df = pd.read_excel(
+        benchmark_file,
+        header=None,  # 关键修改：文件无列名
+        names=['日期', 'YTM值'],  # 手动指定列名
+        parse_dates=['日期']  # 解析日期列
+    )
+
+    # 过滤日期范围
+    ytm_df = ytm_df[(ytm_df['日期'] >= pd.to_datetime(start_date)) &
+                    (ytm_df['日期'] <= pd.to_datetime(end_date))]
+    ytm_df = ytm_df[is_trading_day(ytm_df['日期'], days)]
+    payload['benchmark'] = (to_index(ytm_df['日期'], days), ytm_df['YTM值'].to_numpy(), f'{maturity}Y中债YTM')
+
+    # 子图1：利差曲线（直接在收益率矩阵上相减）
+    payload['spreads'] = []
+    if observed.any(axis=0).sum() >= 2:
+        for i, j in default_pairs(len(bond_list)):
+            x_values, spread = matrix.spread(i, j)
+            payload['spreads'].append((pair_label(i, j), x_values, spread))
+
+    # ========== 修改2：将图二单位改为亿元 ==========
+    # 子图2：单券借贷余额和总借贷余额（单位改为亿元）
+    loan_days = np.flatnonzero(observed.any(axis=1))
+    total_loan = np.nansum(matrix.balance[loan_days], axis=1, dtype=np.float64)
+    payload['total_loan'] = (loan_days, total_loan / 100)  # 百万元→亿元
+
+    # 子图2、3：各券借贷余额与成交笔数
+    ranks = ["1st", "2nd", "3rd", "4th", "5th"][:len(bond_list)]
+    payload['loans'] = []
+    payload['trades'] = []
+    for i, bond in enumerate(bond_list):
+        x_values = np.flatnonzero(observed[:, i])
+        if len(x_values):
+            label = f'{bond}({ranks[i]})'
+            payload['loans'].append((i, label, x_values, matrix.column('balance', bond)[x_values] / 100))
+            payload['trades'].append((i, label, x_values, matrix.column('trades', bond)[x_values]))
+    return payload
+
+
+@profiled('draw_demo')
+def draw_spread_demo(payload, save_path, show=False, preview=False):
+    """
+    根据prepare_spread_demo的结果绘制三联分析图并保存
+
+    参数：
+        payload: prepare_spread_demo返回的绘图数据
+        save_path: 图片保存路径
+        show: 是否调用plt.show()
+        preview: 快速预览模式，复用进程内的图形模板，只替换线条数据
+    """
+    if preview:
+        get_template(SpreadDemoTemplate).render(payload, save_path)
+        return
+
+    # 创建画布和子图
+    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 16), sharex=True)
+    fig.suptitle(payload['title'], fontsize=14)
+
+    # 设置X轴（使用交易日索引）
+    day_indices = range(payload['n_days'])
+    for ax in [ax1, ax2, ax3]:
+        ax.set_xticks(day_indices[::5])  # 每5个交易日显示一个标签
+        ax.set_xticklabels(payload['tick_labels'])
+        ax.xaxis.set_minor_locator(ticker.AutoMinorLocator(5))
+
+    # 图1右侧：中债YTM
+    ax1_right = ax1.twinx()
+    ytm_dates, ytm_values, ytm_label = payload['benchmark']
+    ax1_right.plot(
+        ytm_dates,
+        ytm_values,
+        color='purple',
+        linestyle=':',
+        linewidth=2,
+        label=ytm_label
+    )
+    ax1_right.set_ylabel('中债YTM(%)', color='purple')
+    ax1_right.tick_params(axis='y', colors='purple')
+    ax1_right.legend(loc='upper right')
+
+    # 子图1：利差曲线
+    if payload['spreads']:
+        for label, x_values, values in payload['spreads']:
+            ax1.plot(x_values, values, label=label)
+        ax1.axhline(y=0, color='red', linestyle='--', linewidth=0.8)
+        ax1.set_ylabel('利差(bps)', fontsize=10)
+        ax1.grid(True, linestyle='--', alpha=0.6)
+        ax1.legend(title='债券利差', bbox_to_anchor=(1.08, 0.5), loc='center left')
+
+    # 子图2：单券借贷余额和总借贷余额（亿元）
+    for i, label, x_values, values in payload['loans']:
+        ax2.plot(
+            x_values,
+            values,
+            linestyle='-',
+            marker='o',
+            markersize=4,
+            markeredgecolor='none',
+            alpha=0.8,
+            label=label
+        )
+
+    # 绘制总借贷余额曲线（亿元）
+    x_values_total, total_values = payload['total_loan']
+    ax2.plot(
+        x_values_total,
+        total_values,
+        linestyle='-',
+        color='black',
+        linewidth=2,
+        label='总借贷余额'
+    )
+    ax2.set_ylabel('借贷余额(亿元)', fontsize=10)  # 单位改为亿元
+    ax2.grid(True, linestyle='--', alpha=0.6)
+    ax2.legend(title='债券代码', bbox_to_anchor=(1.02, 1), loc='upper left')
+
+    # 子图3：成交笔数曲线（保持不变）
+    line_styles = ['-', '-', '-', '-', '-']
+    line_widths = [2.0, 1.5, 1.5, 1.2, 1.2]
+    for i, label, x_values, values in payload['trades']:
+        ax3.plot(
+            x_values,
+            values,
+            linestyle=line_styles[i] if i < len(line_styles) else '-',
+            linewidth=line_widths[i] if i < len(line_widths) else 1.0,
+            alpha=0.9,
+            label=label
+        )
+    ax3.set_xlabel('日期', fontsize=10)
+    ax3.set_ylabel('成交笔数', fontsize=10)
+    ax3.grid(True, linestyle='--', alpha=0.6)
+    ax3.legend(title='债券代码', bbox_to_anchor=(1.02, 1), loc='upper left')
+    plt.setp(ax3.get_xticklabels(), rotation=45)
+
+    # 调整布局
+    plt.tight_layout()
+    plt.subplots_adjust(top=0.92, hspace=0.15)
+
+    # 保存和显示
+    with span('savefig'):
+        plt.savefig(
+            save_path,
+            dpi=300,
+            bbox_inches='tight'
+        )
+    if show:
+        plt.show()
+    plt.close()
+
+
+class SpreadDemoTemplate:
+    """
+    三联分析图的预览模板：画布、坐标轴和线条只创建一次，之后每张图只用set_data替换数据
+
+    线条不画点标记并栅格化，保存时使用低分辨率且不做tight bbox排版。
+    """
+
+    def __init__(self):
+        self.fig, (self.ax1, self.ax2, self.ax3) = plt.subplots(3, 1, figsize=(12, 16), sharex=True)
+        self.fig.subplots_adjust(left=0.08, right=0.8, top=0.94, bottom=0.06, hspace=0.15)
+        self.title = self.fig.suptitle('', fontsize=14)
+        self.ax1_right = self.ax1.twinx()
+        self.benchmark, = self.ax1_right.plot([], [], color='purple', linestyle=':', linewidth=2,
+                                              rasterized=True)
+        self.ax1_right.set_ylabel('中债YTM(%)', color='purple')
+        self.ax1_right.tick_params(axis='y', colors='purple')
+        self.ax1.axhline(y=0, color='red', linestyle='--', linewidth=0.8)
+        self.total, = self.ax2.plot([], [], linestyle='-', color='black', linewidth=2, rasterized=True,
+                                    label='总借贷余额')
+        self.spreads, self.loans, self.trades = [], [], []
+        for ax in (self.ax1, self.ax2, self.ax3):
+            ax.grid(True, linestyle='--', alpha=0.6)
+            ax.xaxis.set_minor_locator(ticker.AutoMinorLocator(5))
+        self.ax1.set_ylabel('利差(bps)', fontsize=10)
+        self.ax2.set_ylabel('借贷余额(亿元)', fontsize=10)
+        self.ax3.set_xlabel('日期', fontsize=10)
+        self.ax3.set_ylabel('成交笔数', fontsize=10)
+
+    @staticmethod
+    def _update(ax, pool, series, style):
+        """按需补充线条（style(k)给出第k条线的样式），替换数据并隐藏多余的线条"""
+        while len(pool) < len(series):
+            k = len(pool)
+            line, = ax.plot([], [], color=f'C{k}', rasterized=True, **style(k))
+            pool.append(line)
+        for line, (label, x_values, values) in zip(pool, series):
+            line.set_data(x_values, values)
+            line.set_label(label)
+            line.set_visible(True)
+        for line in pool[len(series):]:
+            line.set_visible(False)
+        return pool[:len(series)]
+
+    def render(self, payload, save_path):
+        self.title.set_text(payload['title'])
+        ticks = np.arange(payload['n_days'])[::5]
+        self.ax3.set_xticks(ticks)
+        self.ax3.set_xticklabels(payload['tick_labels'], rotation=45)
+        self.ax3.set_xlim(-0.5, max(payload['n_days'], 1) - 0.5)
+
+        ytm_dates, ytm_values, ytm_label = payload['benchmark']
+        self.benchmark.set_data(ytm_dates, ytm_values)
+        self.benchmark.set_label(ytm_label)
+        self.ax1_right.legend(handles=[self.benchmark], loc='upper right')
+
+        widths = [2.0, 1.5, 1.5, 1.2, 1.2]
+        spreads = self._update(self.ax1, self.spreads, payload['spreads'], lambda k: {})
+        loans = self._update(self.ax2, self.loans, [item[1:] for item in payload['loans']],
+                             lambda k: {'alpha': 0.8})
+        trades = self._update(self.ax3, self.trades, [item[1:] for item in payload['trades']],
+                              lambda k: {'alpha': 0.9, 'linewidth': widths[k] if k < len(widths) else 1.0})
+        self.total.set_data(*payload['total_loan'])
+
+        self.ax1.legend(handles=spreads, title='债券利差', bbox_to_anchor=(1.08, 0.5), loc='center left')
+        self.ax2.legend(handles=loans + [self.total], title='债券代码', bbox_to_anchor=(1.02, 1),
+                        loc='upper left')
+        self.ax3.legend(handles=trades, title='债券代码', bbox_to_anchor=(1.02, 1), loc='upper left')
+        for ax in (self.ax1, self.ax1_right, self.ax2, self.ax3):
+            ax.relim(visible_only=True)
+            ax.autoscale_view(scalex=False)
+
+        with span('savefig'):
+            self.fig.savefig(save_path, **savefig_kwargs(preview=True))
+
+
+def plot_spread_demo(data_file, issuer, min_maturity, max_maturity, season, start_date, end_date,
+                     bond_list=None, benchmark_file=None, output_dir='spread_demo_2y', show=True):
+    """
+    生成利差、借贷余额和成交笔数的三联分析图
+
+    参数：
+        data_file: 数据文件路径
+        issuer: 发行人名称
+        min_maturity: 最小剩余期限
+        max_maturity: 最大剩余期限
+        season: 时间段标签（用于标题和文件名）
+        start_date: 开始日期
+        end_date: 结束日期
+        bond_list: 按活跃度排序的债券列表，为None时调用func.select_bond选取
+        benchmark_file: 中债估值YTM文件，默认为'{期限}Y中债估值.xlsx'
+        output_dir: 图片保存目录
+        show: 是否调用plt.show()
+    """
+    payload = prepare_spread_demo(data_file, issuer, min_maturity, max_maturity, season, start_date, end_date,
+                                  bond_list, benchmark_file)
+    if payload is None:
+        return
+    draw_spread_demo(payload, os.path.join(output_dir, payload['filename']), show)
+
+if __name__ == "__main__":
+    # 输入参数
+    data_file = "利差分析四大行2年_final.csv"
+    issuer = "中华人民共和国财政部"
+    min_maturity = 28.0
+    max_maturity = 30.0
+    season = "2024"
+    start_date = "2024-01-01"
+    end_date = "2024-12-31"
+
+    # 按活跃券切换划分的时间段见periods.PERIODS，批量运行见batch.py
+    plot_spread_demo(data_file, issuer, min_maturity, max_maturity, season, start_date, end_date)
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from profiling import profiled
+
+
+def default_pairs(n_bonds):
+    """
+    默认利差组合：1-N（最活跃券对其余各券）以及2-3
+
+    参数:
+        n_bonds (int): 债券数量（按活跃度排序）
+
+    返回:
+        list: [(i, j), ...]，i、j为从0开始的排名
+    """
+    pairs = [(0, j) for j in range(1, n_bonds)]
+    if n_bonds >= 3:
+        pairs.append((1, 2))
+    return pairs
+
+
+def pair_label(i, j):
+    """排名对的标签，如(0, 1) -> '1-2'"""
+    return f'{i + 1}-{j + 1}'
+
+
+class SpreadMatrix:
+    """
+    利差矩阵引擎：将收益率透视为 日期×债券 矩阵，一次广播得到全部 N×N 利差（bps）
+
+    参数:
+        dates (pd.DatetimeIndex): 日期轴
+        bonds (list): 债券代码（列顺序即排名顺序）
+        yields (np.ndarray): 日期×债券 的到期收益率矩阵，缺失为NaN
+    """
+
+    def __init__(self, dates, bonds, yields):
+        self.dates = dates
+        self.bonds = list(bonds)
+        self.yields = yields
+        # tensor[t, i, j] = (y_i - y_j) * 100，任一侧缺失即为NaN
+        self.tensor = (yields[:, :, None] - yields[:, None, :]) * 100
+
+    @classmethod
+    @profiled('spread_matrix')
+    def from_frame(cls, df, bond_list, value='到期收益率'):
+        """
+        由行情数据构建利差矩阵
+
+        参数:
+            df (pd.DataFrame): 含 日期、标的债券代码 和收益率列的数据
+            bond_list (list): 按活跃度排序的债券代码
+            value (str): 收益率列名
+        """
+        pivot = df.pivot(index='日期', columns='标的债券代码', values=value)
+        pivot = pivot.reindex(columns=bond_list).sort_index()
+        return cls(pivot.index, bond_list, pivot.to_numpy(dtype=np.float64))
+
+    @property
+    def n_valid(self):
+        """有数据的债券数量"""
+        return int((~np.isnan(self.yields)).any(axis=0).sum())
+
+    def pair(self, i, j):
+        """
+        取排名i、j两券的利差序列
+
+        与两条pd.Series相减的对齐方式一致：保留任一券有数据的日期，单侧缺失处为NaN。
+
+        返回:
+            pd.Series: 以日期为索引的利差(bps)
+        """
+        present = ~(np.isnan(self.yields[:, i]) & np.isnan(self.yields[:, j]))
+        return pd.Series(self.tensor[present, i, j], index=self.dates[present])
+
+    def frame(self, pairs=None):
+        """
+        将多个利差组合整理为DataFrame（列为组合标签），跳过无数据债券参与的组合
+
+        参数:
+            pairs (list): [(i, j), ...]，默认为default_pairs
+
+        返回:
+            pd.DataFrame: 日期×组合 的利差(bps)
+        """
+        if pairs is None:
+            pairs = default_pairs(len(self.bonds))
+        has_data = (~np.isnan(self.yields)).any(axis=0)
+        pairs = [(i, j) for i, j in pairs if has_data[i] and has_data[j]]
+        return pd.DataFrame(
+            {pair_label(i, j): self.tensor[:, i, j] for i, j in pairs},
+            index=self.dates,
+        )
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# 只在分析/绘图路径中使用的重依赖
+HEAVY_MODULES = ['pandas_market_calendars', 'statsmodels', 'seaborn', 'scipy']
+
+# 各入口模块的导入耗时预算（秒）及导入后不应加载的模块
+STARTUP_BUDGETS = {
+    'func': (1.5, HEAVY_MODULES + ['matplotlib']),
+    'periods': (1.5, HEAVY_MODULES + ['matplotlib']),
+    'batch': (1.5, HEAVY_MODULES + ['matplotlib']),
+    'incremental': (1.5, HEAVY_MODULES + ['matplotlib']),
+    'curve': (1.5, HEAVY_MODULES + ['matplotlib']),
+    'cross_issuer': (1.5, HEAVY_MODULES + ['matplotlib']),
+    'service': (1.5, HEAVY_MODULES + ['matplotlib']),
+    'spread_demo': (3.0, HEAVY_MODULES),
+    'spread_corr': (3.0, HEAVY_MODULES),
+    'spread_boxplots': (3.0, HEAVY_MODULES),
+}
+
+# 入口模块所在目录（探测进程在此目录下导入模块）
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, forbidden, repeat=3):
+    """在新进程中导入模块，返回 (耗时中位数, 被加载的禁止模块)"""
+    times, loaded = [], set()
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, forbidden=forbidden)],
+                             capture_output=True, text=True, check=True, cwd=ROOT).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        times.append(result['elapsed'])
+        loaded.update(result['loaded'])
+    return statistics.median(times), sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='检查各入口模块的启动耗时和重依赖是否按需导入')
+    parser.add_argument('--repeat', type=int, default=3, help='每个模块的测量次数')
+    parser.add_argument('--scale', type=float, default=1.0, help='预算缩放系数（较慢的机器上可调大）')
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for module, (budget, forbidden) in STARTUP_BUDGETS.items():
+        elapsed, loaded = measure(module, forbidden, args.repeat)
+        budget *= args.scale
+        ok = elapsed <= budget and not loaded
+        failed += not ok
+        note = f"，提前加载了 {loaded}" if loaded else ""
+        print(f"{'通过' if ok else '失败'} {module:<16} {elapsed:.2f}s / 预算 {budget:.2f}s{note}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from quantiles import spread_quantiles, stack_series
+from spread_boxplots import draw_spread_boxplots, prepare_spread_boxplots
+
+PERIODS = [('P1', '2024-01-01', '2024-01-31'), ('P2', '2024-02-01', '2024-02-29')]
+
+
+def test_spread_quantiles_accepts_empty_stack():
+    stats = spread_quantiles(stack_series([]))
+    assert stats['mean'].shape == (0, 0)
+    assert stats['quantiles'].shape == (0, 5, 0)
+
+    # 有时间段和组合但没有日期
+    stats = spread_quantiles(np.empty((2, 0, 3)))
+    assert stats['count'].tolist() == [[0, 0, 0], [0, 0, 0]]
+    assert np.isnan(stats['mean']).all()
+
+
+def test_no_matching_bonds_draws_empty_figure(tmp_path):
+    path = tmp_path / 'panel.csv'
+    pd.DataFrame({
+        '日期': pd.bdate_range('2024-01-02', periods=30), '标的债券代码': 'B1.IB', '债务主体': '主体A',
+        '剩余期限': 9.0, '到期收益率': 2.0, '每日每券的成交笔数': 10.0, '单券借贷余额（百万元）': 1.0,
+    }).to_csv(path, index=False)
+
+    # 每个时间段只有1只债券，没有可统计的利差组合
+    payload = prepare_spread_boxplots(str(path), '主体A', 8.0, 10.0, PERIODS)
+    assert payload['panels'] == []
+    draw_spread_boxplots(payload, str(tmp_path / 'boxplots.png'), preview=True)
+    assert (tmp_path / 'boxplots.png').exists()
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cross_issuer import ISSUER_TAX_RATES, IssuerSpreads, after_tax
+from curve import CURVE_TENORS
+from func import select_bonds_by_period
+from quantiles import QUANTILES
+from trading_calendar import trading_days
+
+PERIODS = [('P1', '2024-01-01', '2024-02-15'), ('P2', '2024-02-20', '2024-04-30')]
+ISSUERS = ['中华人民共和国财政部', '国家开发银行', '中国进出口银行']
+TENORS = {name: CURVE_TENORS[name] for name in ['3Y', '10Y']}
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    """三个主体在两个档位内各有若干只债券，部分交易日缺失，并含交易所休市日的行情"""
+    rng = np.random.default_rng(0)
+    # 含周末，检验非交易日的行情不进入共同网格
+    dates = pd.date_range('2024-01-02', '2024-04-30')
+    frames = []
+    for i, issuer in enumerate(ISSUERS):
+        for k, maturity in enumerate([2.5, 2.8, 2.9, 9.0, 9.5, 9.9]):
+            present = rng.random(len(dates)) > 0.2
+            days = dates[present]
+            frames.append(pd.DataFrame({
+                '日期': days,
+                '标的债券代码': f'{i}{k:02d}.IB',
+                '债务主体': issuer,
+                '剩余期限': maturity - (days - dates[0]).days / 365.0,
+                '到期收益率': 1.8 + 0.1 * i + 0.05 * maturity + rng.normal(scale=0.02, size=len(days)),
+                '每日每券的成交笔数': rng.integers(0, 6, size=len(days)).astype(float),
+                '单券借贷余额（百万元）': 1.0,
+            }))
+    path = tmp_path / 'panel.csv'
+    pd.concat(frames).sort_values('日期').to_csv(path, index=False)
+    return str(path)
+
+
+def direct_spread(data_file, tenor, period, issuer_a, issuer_b, tax=False):
+    """逐主体取select_bonds_by_period的最活跃券，在原始行情上直接计算交易日的利差(bps)"""
+    raw = pd.read_csv(data_file, parse_dates=['日期'])
+    name, start, end = period
+    days = pd.to_datetime(trading_days(start, end).astype('datetime64[D]'))
+    legs = []
+    for issuer in (issuer_a, issuer_b):
+        bonds = select_bonds_by_period(data_file, [period], issuer, *TENORS[tenor], top_n=1).get(name)
+        if not bonds:
+            return None, pd.Series(dtype=float)
+        rows = raw[(raw['标的债券代码'] == bonds[0]) & raw['日期'].isin(days)]
+        ytm = rows.set_index('日期')['到期收益率']
+        if tax:
+            ytm = ytm * (1 - ISSUER_TAX_RATES[issuer])
+        legs.append((bonds[0], ytm))
+    (bond_a, ytm_a), (bond_b, ytm_b) = legs
+    return (bond_a, bond_b), ((ytm_a - ytm_b) * 100).dropna()
+
+
+@pytest.mark.parametrize('tax', [False, True])
+def test_summary_matches_direct_computation(data_file, tax):
+    engine = IssuerSpreads.from_panel(data_file, ISSUERS, PERIODS, TENORS, tax=after_tax if tax else None)
+    table = engine.summary()
+
+    checked = 0
+    for tenor in TENORS:
+        for period in PERIODS:
+            for a in range(len(ISSUERS)):
+                for b in range(a + 1, len(ISSUERS)):
+                    bonds, spread = direct_spread(data_file, tenor, period, ISSUERS[a], ISSUERS[b], tax)
+                    row = table[(table['期限'] == tenor) & (table['时间段'] == period[0]) &
+                                (table['主体A'] == ISSUERS[a]) & (table['主体B'] == ISSUERS[b])]
+                    if spread.empty:
+                        assert row.empty
+                        continue
+                    row = row.iloc[0]
+                    assert (row['债券A'], row['债券B']) == bonds
+                    assert row['count'] == len(spread)
+                    # 面板中的收益率为float32，利差只在1e-4 bps以内一致
+                    expected = [spread.mean(), spread.min(), spread.max()] + list(np.percentile(spread, QUANTILES))
+                    actual = [row['mean'], row['min'], row['max']] + [
+                        row['median' if q == 50 else f'q{q}'] for q in QUANTILES]
+                    np.testing.assert_allclose(actual, expected, atol=1e-4)
+
+                    # 反向取利差变号
+                    pair = engine.pair(tenor, ISSUERS[b], ISSUERS[a])
+                    period_pair = pair[(pair.index >= period[1]) & (pair.index <= period[2])]
+                    np.testing.assert_allclose(period_pair.to_numpy(), -spread.sort_index().to_numpy(), atol=1e-4)
+                    checked += 1
+    assert checked == len(TENORS) * len(PERIODS) * 3
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from curve import CURVE_TENORS, curve_spreads
+from func import select_bonds_by_period
+
+PERIODS = [('P1', '2024-01-01', '2024-02-15'), ('P2', '2024-02-20', '2024-04-30')]
+ISSUERS = ['主体A', '主体B']
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    """两个主体、跨多个期限档位的合成行情：剩余期限逐日缩短，部分债券会移出档位，部分交易日缺失；
+    相邻两只债券的成交笔数完全相同，排名时出现并列"""
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2024-01-02', '2024-04-30')
+    frames = []
+    for issuer in ISSUERS:
+        for k, maturity in enumerate(rng.uniform(0.6, 30.0, size=20)):
+            present = rng.random(len(dates)) > 0.15
+            days = dates[present]
+            trades = rng.integers(0, 4, size=len(days)).astype(float)
+            # 代码顺序与生成顺序相反，并列时须按代码而不是出现顺序排列
+            for twin, code in enumerate([f'{issuer[-1]}{2 * k + 1:03d}.IB', f'{issuer[-1]}{2 * k:03d}.IB']):
+                frames.append(pd.DataFrame({
+                    '日期': days,
+                    '标的债券代码': code,
+                    '债务主体': issuer,
+                    '剩余期限': maturity + 0.01 * twin - (days - dates[0]).days / 365.0,
+                    '到期收益率': 2.0 + 0.05 * maturity + rng.normal(scale=0.02, size=len(days)),
+                    '每日每券的成交笔数': trades,
+                    '单券借贷余额（百万元）': 1.0,
+                }))
+    path = tmp_path / 'panel.csv'
+    pd.concat(frames).sort_values('日期').to_csv(path, index=False)
+    return str(path)
+
+
+def direct_spreads(data_file, issuer, tenor, top_n):
+    """逐档位调用select_bonds_by_period，再在原始行情上逐组合直接计算利差统计"""
+    raw = pd.read_csv(data_file, parse_dates=['日期'])
+    min_maturity, max_maturity = CURVE_TENORS[tenor]
+    bond_lists = select_bonds_by_period(data_file, PERIODS, issuer, min_maturity, max_maturity, top_n)
+    rows = []
+    for name, start, end in PERIODS:
+        bonds = bond_lists.get(name, [])
+        period = raw[(raw['债务主体'] == issuer) & raw['日期'].between(start, end)]
+        ytm = period.pivot(index='日期', columns='标的债券代码', values='到期收益率')
+        for j in range(1, len(bonds)):
+            spread = ((ytm[bonds[0]] - ytm[bonds[j]]) * 100).dropna()
+            if spread.empty:
+                continue
+            rows.append({'时间段': name, '组合': f'1-{j + 1}', '债券A': bonds[0], '债券B': bonds[j],
+                         'mean': spread.mean(), 'median': spread.median(), 'std': spread.std(),
+                         'min': spread.min(), 'max': spread.max(), 'count': len(spread)})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('top_n', [3, 5])
+def test_curve_spreads_match_per_tenor_selection(data_file, top_n):
+    table = curve_spreads(data_file, periods=PERIODS, top_n=top_n)
+    assert set(table['主体']) == set(ISSUERS)
+
+    checked = 0
+    for issuer in ISSUERS:
+        for tenor in CURVE_TENORS:
+            expected = direct_spreads(data_file, issuer, tenor, top_n)
+            actual = table[(table['主体'] == issuer) & (table['期限'] == tenor)]
+            assert len(actual) == len(expected)
+            if expected.empty:
+                continue
+            actual = actual.reset_index(drop=True)[expected.columns]
+            # 面板中的收益率为float32，利差只在1e-4 bps以内一致
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False, atol=1e-4)
+            checked += len(expected)
+    assert checked > 0
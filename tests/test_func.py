@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import func
+from curve import curve_rows, rank_bonds
+from panel import clean_frame
+
+ISSUER = '主体A'
+PERIODS = [('P1', '2024-01-01', '2024-01-31'), ('P2', '2024-02-01', '2024-02-29')]
+BONDS = [f'B{k:02d}.IB' for k in range(40)]
+
+
+def tied_rows():
+    """40只债券，平均成交笔数只有两档（大量并列）；行的顺序与代码顺序相反"""
+    rows = []
+    for date in pd.bdate_range('2024-01-02', '2024-02-29'):
+        for k, bond in reversed(list(enumerate(BONDS))):
+            rows.append({'日期': date, '标的债券代码': bond, '债务主体': ISSUER, '剩余期限': 9.0,
+                         '到期收益率': 2.0, '每日每券的成交笔数': 20.0 if k % 2 else 10.0,
+                         '单券借贷余额（百万元）': 1.0})
+    return pd.DataFrame(rows)
+
+
+def test_ties_break_by_bond_code(tmp_path):
+    path = str(tmp_path / 'panel.csv')
+    tied_rows().to_csv(path, index=False)
+    expected = BONDS[1:10:2]
+
+    by_period = func.select_bonds_by_period(path, PERIODS, ISSUER, 8.0, 10.0)
+    for name, start, end in PERIODS:
+        assert func.select_bond(path, start, end, ISSUER, 8.0, 10.0) == expected
+        assert func.select_bond_fromstart(path, start, end, ISSUER, 8.0, 10.0) == expected
+        assert by_period[name] == expected
+
+    # curve模式：类别编码与代码顺序相反时同样按代码排列
+    df = clean_frame(tied_rows())
+    df['标的债券代码'] = df['标的债券代码'].cat.reorder_categories(BONDS[::-1])
+    top = rank_bonds(curve_rows(df, PERIODS, {'10Y': (8.0, 10.0)}))
+    names = np.asarray(df['标的债券代码'].cat.categories)
+    for period, group in top.groupby('period'):
+        assert names[group['bond']].tolist() == expected
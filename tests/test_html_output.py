@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from html_output import downsample
+
+
+@pytest.mark.parametrize('gap_every', [2, 5, 50])
+def test_downsample_respects_max_points_on_gappy_series(gap_every):
+    rng = np.random.default_rng(0)
+    x = np.arange(5000, dtype=np.float64)
+    y = rng.normal(size=5000)
+    y[::gap_every] = np.nan
+
+    ds_x, ds_y = downsample(x, y, max_points=100)
+    assert len(ds_x) == len(ds_y) <= 100
+    # 保留的点都取自原序列，横坐标递增
+    finite = np.isfinite(ds_y)
+    assert np.isin(ds_x[finite], x).all()
+    assert (np.diff(ds_x[finite]) > 0).all()
+
+
+def test_downsample_keeps_short_series():
+    x = np.arange(10, dtype=np.float64)
+    y = np.where(x % 3 == 0, np.nan, x)
+    ds_x, ds_y = downsample(x, y, max_points=100)
+    assert np.array_equal(ds_x, x)
+    assert np.array_equal(ds_y, y, equal_nan=True)
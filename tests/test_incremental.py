@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from incremental import IncrementalStore
+from panel import clean_frame
+from spreads import SpreadMatrix, default_pairs
+
+BONDS = ['B1.IB', 'B2.IB', 'B3.IB']
+
+
+def make_rows(dates, issuer='主体A', bonds=BONDS, maturity=9.0, decay=0.0, seed=0):
+    """每个交易日每只债券一行的合成行情，剩余期限每天减少decay年"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for day, date in enumerate(pd.to_datetime(dates)):
+        for k, bond in enumerate(bonds):
+            rows.append({
+                '日期': date,
+                '标的债券代码': bond,
+                '债务主体': issuer,
+                '剩余期限': maturity - k * 0.1 - decay * day,
+                '到期收益率': 2.0 + 0.01 * k + rng.normal(0, 0.01),
+                '每日每券的成交笔数': float(rng.integers(1, 50)),
+                '单券借贷余额（百万元）': 100.0,
+            })
+    return pd.DataFrame(rows)
+
+
+def tracked_store(state_dir, batches):
+    store = IncrementalStore(str(state_dir))
+    store.track('A-10Y', '主体A', 8.0, 10.0, BONDS)
+    for batch in batches:
+        store.append(batch)
+    return store
+
+
+def test_append_ignores_other_issuers(tmp_path):
+    dates = pd.bdate_range('2024-01-02', periods=35)
+    own = make_rows(dates[:20])
+    new = make_rows(dates[20:30], seed=1)
+    # 同代码但属于其它主体的行
+    other_issuer = make_rows(dates[30:], issuer='主体B', seed=2)
+
+    expected = tracked_store(tmp_path / 'clean', [own, new]).summary('A-10Y')
+    result = tracked_store(tmp_path / 'mixed', [own, new, other_issuer]).summary('A-10Y')
+
+    # 其它主体的行情日期仍是交易日，会推动滚动窗口，只比较累计结果
+    assert [(row['债券代码'], row['平均成交笔数']) for row in result['activity']] == \
+        [(row['债券代码'], row['平均成交笔数']) for row in expected['activity']]
+    assert result['quantiles'] == expected['quantiles']
+    for label, reg in expected['regression'].items():
+        assert result['regression'][label] == reg
+
+
+def test_matches_full_recompute_across_band_boundary(tmp_path):
+    dates = pd.bdate_range('2024-01-02', periods=40)
+    # 剩余期限从8.3年逐日下降，跟踪期间先后移出8-10年档位
+    data = make_rows(dates, maturity=8.3, decay=0.02)
+    batches = [data[data['日期'].isin(chunk)] for chunk in np.array_split(dates, 4)]
+    store = tracked_store(tmp_path / 'state', batches)
+    summary = store.summary('A-10Y')
+
+    # 全量重算：与批量运行一样按主体和债券列表取数
+    df = clean_frame(data)
+    df = df[(df['债务主体'] == '主体A') & df['标的债券代码'].isin(BONDS)]
+    matrix = SpreadMatrix.from_frame(df, BONDS)
+    expected = matrix.frame(default_pairs(len(BONDS)))
+    spreads = store.spreads('A-10Y')
+    np.testing.assert_allclose(spreads.to_numpy(), expected.to_numpy())
+    assert list(spreads.columns) == list(expected.columns)
+
+    means = df.groupby('标的债券代码', observed=True)['每日每券的成交笔数'].mean()
+    for row in summary['activity']:
+        assert row['平均成交笔数'] == means[row['债券代码']]
+
+    trades = df.pivot(index='日期', columns='标的债券代码', values='每日每券的成交笔数')[BONDS].to_numpy()
+    for j in (1, 2):
+        x, y = trades[:, 0] / trades[:, j], matrix.tensor[:, 0, j]
+        slope, intercept = np.polyfit(x, y, 1)
+        reg = summary['regression'][f'1-{j + 1}']
+        assert reg['n'] == len(x)
+        np.testing.assert_allclose([reg['slope'], reg['intercept']], [slope, intercept], rtol=1e-6)
+
+
+def test_rolling_window_counts_trading_days(tmp_path):
+    dates = pd.bdate_range('2024-01-02', periods=50)
+    data = make_rows(dates)
+    # B3隔日无行情：滚动窗口仍按最近20个交易日计，只含其中有行情的10天
+    data = data[~((data['标的债券代码'] == 'B3.IB') & (data['日期'].isin(dates[::2])))]
+    batches = [data[data['日期'].isin(chunk)] for chunk in np.array_split(dates, 3)]
+    summary = tracked_store(tmp_path / 'state', batches).summary('A-10Y')
+
+    recent = data[data['日期'] >= dates[-20]]
+    expected = recent.groupby('标的债券代码')['每日每券的成交笔数'].mean()
+    assert (recent['标的债券代码'] == 'B3.IB').sum() == 10
+    for row in summary['activity']:
+        assert row['滚动平均成交笔数'] == expected[row['债券代码']]
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from panel import clean_frame, read_csv_filtered
+from spreads import SpreadMatrix
+
+
+def quotes():
+    """两只债券三天的行情，B1在第二天有一行重复（后一行为更正后的报价）"""
+    rows = [
+        ('2024-01-02', 'B1.IB', 2.00), ('2024-01-02', 'B2.IB', 2.10),
+        ('2024-01-03', 'B1.IB', 2.01), ('2024-01-03', 'B2.IB', 2.11),
+        ('2024-01-04', 'B1.IB', 2.02), ('2024-01-04', 'B2.IB', 2.12),
+        ('2024-01-03', 'B1.IB', 2.05),
+    ]
+    return pd.DataFrame({
+        '日期': pd.to_datetime([r[0] for r in rows]),
+        '标的债券代码': [r[1] for r in rows],
+        '债务主体': '主体A',
+        '剩余期限': 9.0,
+        '到期收益率': [r[2] for r in rows],
+        '每日每券的成交笔数': 10.0,
+        '单券借贷余额（百万元）': 100.0,
+    })
+
+
+def test_clean_frame_keeps_last_duplicate():
+    df = clean_frame(quotes())
+    assert len(df) == 6
+    row = df[(df['标的债券代码'] == 'B1.IB') & (df['日期'] == '2024-01-03')]
+    np.testing.assert_allclose(row['到期收益率'], 2.05)
+
+
+def test_duplicates_across_csv_chunks(tmp_path):
+    path = tmp_path / 'panel.csv'
+    quotes().to_csv(path, index=False)
+    # 每块2行，重复行与原行落在不同的块中
+    df = read_csv_filtered(str(path), chunksize=2)
+    matrix = SpreadMatrix.from_frame(df, ['B1.IB', 'B2.IB'])
+    np.testing.assert_allclose(matrix.pair(0, 1).to_numpy(), [-10.0, -6.0, -10.0], atol=1e-4)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from quantiles import QUANTILES, QuantileSketch, bxp_stats, spread_quantiles, stack_series
+
+
+def make_blocks(seed=0):
+    rng = np.random.default_rng(seed)
+    blocks = []
+    for n_dates, n_pairs in [(40, 3), (7, 1), (25, 2)]:
+        block = rng.normal(10, 5, size=(n_dates, n_pairs))
+        block[rng.random(block.shape) < 0.2] = np.nan
+        blocks.append(block)
+    return blocks
+
+
+def test_spread_quantiles_match_per_period_percentiles():
+    blocks = make_blocks()
+    stats = spread_quantiles(stack_series(blocks))
+    for p, block in enumerate(blocks):
+        for k in range(block.shape[1]):
+            column = block[:, k][~np.isnan(block[:, k])]
+            np.testing.assert_allclose(stats['quantiles'][p, :, k], np.percentile(column, QUANTILES))
+            assert stats['count'][p, k] == len(column)
+            assert stats['mean'][p, k] == pytest.approx(column.mean())
+            assert (stats['min'][p, k], stats['max'][p, k]) == (column.min(), column.max())
+            lo, hi = np.percentile(column, [10, 90])
+            assert stats['whislo'][p, k] == column[column >= lo].min()
+            assert stats['whishi'][p, k] == column[column <= hi].max()
+        # 补齐的组合没有样本
+        assert (stats['count'][p, block.shape[1]:] == 0).all()
+
+    boxes = bxp_stats(stats, 0, ['a', 'b', 'c'])
+    assert [box['label'] for box in boxes] == ['a', 'b', 'c']
+    assert all(box['whislo'] <= box['q1'] <= box['med'] <= box['q3'] <= box['whishi'] for box in boxes)
+
+
+def test_sketch_is_exact_below_capacity():
+    values = np.random.default_rng(1).normal(size=150)
+    sketch = QuantileSketch().update(values)
+    np.testing.assert_allclose(sketch.quantiles(), np.percentile(values, QUANTILES))
+
+
+@pytest.mark.parametrize('k', [100, 200])
+def test_sketch_rank_error_bound(k):
+    rng = np.random.default_rng(2)
+    values = rng.standard_t(3, size=100000)
+    # 分批追加、合并并经过序列化，与增量存储的用法一致
+    sketch = QuantileSketch(k)
+    for chunk in np.array_split(values, 37)[:20]:
+        sketch.update(chunk)
+    other = QuantileSketch(k)
+    for chunk in np.array_split(values, 37)[20:]:
+        other = QuantileSketch.from_dict(other.update(chunk).to_dict())
+    sketch.merge(other)
+
+    assert sketch.n == len(values)
+    assert sketch.mean == pytest.approx(values.mean())
+    levels = np.linspace(1, 99, 99)
+    ranks = np.searchsorted(np.sort(values), sketch.quantiles(levels)) / len(values)
+    # 相对秩误差约为 2.5/k^0.94，留出25%余量
+    assert np.abs(ranks - levels / 100).max() < 1.25 * 2.5 / k ** 0.94
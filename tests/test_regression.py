@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from regression import SufficientStats, expanding_regression, grouped_regression, rolling_regression
+
+
+def make_data(n=300, n_pairs=3, seed=0):
+    rng = np.random.default_rng(seed)
+    # 加上较大的常数项，检验中心化累加的精度
+    x = rng.lognormal(size=(n, n_pairs)) + 1000.0
+    y = 2.5 * x + rng.normal(scale=3.0, size=(n, n_pairs)) - 2000.0
+    x[rng.random((n, n_pairs)) < 0.1] = np.nan
+    y[rng.random((n, n_pairs)) < 0.1] = np.nan
+    return x, y
+
+
+def direct(x, y, min_periods=3):
+    """逐窗口直接拟合：返回 n, slope, intercept, r, pvalue"""
+    valid = np.isfinite(x) & np.isfinite(y)
+    x, y = x[valid], y[valid]
+    if len(x) < min_periods:
+        return len(x), np.nan, np.nan, np.nan, np.nan
+    slope, intercept = np.polyfit(x, y, 1)
+    fit = stats.linregress(x, y)
+    return len(x), slope, intercept, fit.rvalue, fit.pvalue
+
+
+def assert_matches(result, t, k, expected):
+    n, slope, intercept, r, pvalue = expected
+    assert result['n'][t, k] == n
+    np.testing.assert_allclose(
+        [result['slope'][t, k], result['intercept'][t, k], result['r'][t, k], result['pvalue'][t, k]],
+        [slope, intercept, r, pvalue], rtol=1e-6, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('window', [5, 20, 60])
+def test_rolling_matches_polyfit(window):
+    x, y = make_data()
+    result = rolling_regression(x, y, window)
+    for t in range(len(x)):
+        lo = max(0, t - window + 1)
+        for k in range(x.shape[1]):
+            assert_matches(result, t, k, direct(x[lo:t + 1, k], y[lo:t + 1, k]))
+
+
+def test_expanding_matches_polyfit():
+    x, y = make_data()
+    result = expanding_regression(x, y, min_periods=10)
+    for t in range(len(x)):
+        for k in range(x.shape[1]):
+            assert_matches(result, t, k, direct(x[:t + 1, k], y[:t + 1, k], min_periods=10))
+
+
+def test_grouped_and_sufficient_stats_match_polyfit():
+    x, y = make_data(n_pairs=1)
+    x, y = x[:, 0], y[:, 0]
+    groups = np.arange(len(x)) % 7
+    result = grouped_regression(x, y, groups, 8)
+    for g in range(8):
+        n, slope, intercept, r, pvalue = direct(x[groups == g], y[groups == g])
+        assert result['n'][g] == n
+        np.testing.assert_allclose([result['slope'][g], result['intercept'][g], result['pvalue'][g]],
+                                   [slope, intercept, pvalue], rtol=1e-6, equal_nan=True)
+
+    # 分批累加与一次拟合一致
+    acc = SufficientStats()
+    for chunk in np.array_split(np.arange(len(x)), 5):
+        acc.update(x[chunk], y[chunk])
+    n, slope, intercept, r, _ = direct(x, y)
+    res = acc.result()
+    assert res['n'] == n
+    np.testing.assert_allclose([res['slope'], res['intercept'], res['r']], [slope, intercept, r], rtol=1e-6)
@@ -0,0 +1,65 @@
+import asyncio
+import json
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from service import SpreadService, make_handler
+
+ISSUER = '国家开发银行'
+
+
+def write_panel(path):
+    """三只10Y债券两个月的合成行情"""
+    rng = np.random.default_rng(0)
+    rows = []
+    for date in pd.bdate_range('2024-03-01', '2024-04-30'):
+        for k, bond in enumerate(['B1.IB', 'B2.IB', 'B3.IB']):
+            rows.append({
+                '日期': date.strftime('%Y-%m-%d'),
+                '标的债券代码': bond,
+                '债务主体': ISSUER,
+                '剩余期限': 9.5 - k * 0.5,
+                '到期收益率': 2.0 + 0.01 * k + rng.normal(0, 0.01),
+                '每日每券的成交笔数': 30 - 10 * k + int(rng.integers(0, 5)),
+                '单券借贷余额（百万元）': 100.0,
+            })
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+async def request(port, target):
+    """发送原始请求行（不做任何转义），返回 (状态码, JSON)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {target} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode('utf-8'))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_raw_utf8_query(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_panel('panel.csv')
+    query = 'issuer={}&tenor=10Y&start=2024-03-01&end=2024-04-30'
+
+    async def run():
+        service = SpreadService('panel.csv')
+        await service.warm()
+        server = await asyncio.start_server(make_handler(service), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            raw = await request(port, '/rankings?' + query.format(ISSUER))
+            encoded = await request(port, '/rankings?' + query.format(quote(ISSUER)))
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+        return raw, encoded
+
+    (status, body), encoded = asyncio.run(run())
+    assert status == 200
+    assert body['issuer'] == ISSUER
+    assert [row['bond'] for row in body['bonds']] == ['B1.IB', 'B2.IB', 'B3.IB']
+    assert encoded == (status, body)
@@ -0,0 +1,15 @@
+import pytest
+
+from startup_check import HEAVY_MODULES, STARTUP_BUDGETS, measure
+
+
+def test_heavy_modules_are_listed():
+    assert set(HEAVY_MODULES) >= {'statsmodels', 'scipy', 'seaborn', 'pandas_market_calendars'}
+
+
+@pytest.mark.parametrize('module', list(STARTUP_BUDGETS))
+def test_entry_module_imports_lazily(module):
+    # 耗时受机器负载影响，只检查重依赖是否被提前导入；耗时预算由startup_check.py单独检查
+    _, forbidden = STARTUP_BUDGETS[module]
+    _, loaded = measure(module, forbidden, repeat=1)
+    assert loaded == []
@@ -0,0 +1,116 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+import panel
+from profiling import profiled
+
+
+def _to_ordinal(dates):
+    """日期（标量或序列）转为自1970-01-01起的天数（int64）"""
+    if isinstance(dates, (pd.Series, pd.Index)):
+        dates = dates.to_numpy()
+    return np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+
+
+def _calendar_file(exchange):
+    return os.path.join(panel.cache_dir(), f'calendar-{exchange}.npz')
+
+
+@profiled('calendar_fetch')
+def _fetch_days(exchange, start, end):
+    """从pandas_market_calendars获取[start, end]内的交易日序数"""
+    from pandas_market_calendars import get_calendar
+
+    days = get_calendar(exchange).valid_days(start_date=start, end_date=end)
+    return _to_ordinal(days.tz_localize(None))
+
+
+# 进程内的交易日历：交易所 -> (起始序数, 结束序数, 交易日序数)
+_calendars = {}
+
+
+def _load_days(exchange, start, end):
+    """
+    返回覆盖[start, end]（日期序数）的全部交易日序数
+
+    交易日历持久化在数据文件同级的缓存目录下（见panel.cache_dir），进程内按交易所只保留一份；
+    请求区间超出已有范围时按整年扩展、重新获取，并只替换该交易所的日历。
+    """
+    cached = _calendars.get(exchange)
+    path = _calendar_file(exchange)
+    if cached is None and os.path.exists(path):
+        data = np.load(path)
+        cached = int(data['lo']), int(data['hi']), data['days']
+    if cached is not None:
+        lo, hi, days = cached
+        if lo <= start and end <= hi:
+            _calendars[exchange] = cached
+            return days
+        start, end = min(start, lo), max(end, hi)
+
+    # 扩展到整年，减少后续重新获取
+    first = np.datetime64(np.datetime64(start, 'D'), 'Y')
+    last = np.datetime64(np.datetime64(end, 'D'), 'Y') + 1
+    lo = int(first.astype('datetime64[D]').astype(np.int64))
+    hi = int(last.astype('datetime64[D]').astype(np.int64)) - 1
+    days = _fetch_days(exchange, str(np.datetime64(lo, 'D')), str(np.datetime64(hi, 'D')))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, lo=lo, hi=hi, days=days)
+    except OSError as e:
+        print(f"写入交易日历缓存失败: {e}")
+    _calendars[exchange] = lo, hi, days
+    return days
+
+
+@functools.lru_cache(maxsize=256)
+@profiled()
+def trading_days(start_date, end_date, exchange='SSE'):
+    """
+    获取区间内的交易日（进程内记忆化，并持久化到磁盘）
+
+    参数:
+        start_date (str): 开始日期
+        end_date (str): 结束日期
+        exchange (str): pandas_market_calendars中的交易所代码
+
+    返回:
+        np.ndarray: 交易日序数（int64，自1970-01-01起的天数），只读
+    """
+    start = int(_to_ordinal(pd.Timestamp(start_date)))
+    end = int(_to_ordinal(pd.Timestamp(end_date)))
+    days = _load_days(exchange, start, end)
+    days = days[np.searchsorted(days, start):np.searchsorted(days, end, side='right')].copy()
+    days.flags.writeable = False
+    return days
+
+
+def to_index(dates, days):
+    """
+    将日期向量化映射为交易日下标（即x轴坐标），非交易日为-1
+
+    参数:
+        dates: 日期序列
+        days (np.ndarray): trading_days返回的交易日序数
+
+    返回:
+        np.ndarray: int64下标
+    """
+    ordinals = _to_ordinal(dates)
+    idx = np.searchsorted(days, ordinals)
+    hit = idx < len(days)
+    hit[hit] = days[idx[hit]] == ordinals[hit]
+    return np.where(hit, idx, -1)
+
+
+def is_trading_day(dates, days):
+    """判断日期是否为区间内的交易日"""
+    return to_index(dates, days) >= 0
+
+
+def day_labels(days, fmt='%m-%d'):
+    """交易日序数转为刻度标签"""
+    return [d.strftime(fmt) for d in pd.to_datetime(days.astype('datetime64[D]'))]